@@ -0,0 +1,123 @@
+"""
+Registration and revenue rollups.
+
+Every registration increments a handful of small rollup documents (its UTC
+day, its event, its ticket type, and its event-day) in one ``bulk_write`` of
+``$inc`` upserts. Analytics endpoints then read a few hundred rollup
+documents instead of scanning millions of registrations. Revenue is the
+booked ``payment_amount``.
+
+Rollups survive archival (they count archived registrations too) and can
+be rebuilt from scratch, e.g. after a backfill, with one ``$group``
+aggregation per rollup kind over the live and archived registrations:
+    python analytics.py rebuild
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# kind -> the registration dimensions it is keyed by
+ROLLUP_KINDS = {
+    "day": ("day",),
+    "event": ("event_id",),
+    "ticket_type": ("ticket_type",),
+    "event_day": ("event_id", "day"),
+}
+
+
+def rollup_id(kind, keys):
+    return kind + ":" + "|".join(str(keys[field]) for field in ROLLUP_KINDS[kind])
+
+
+def registration_day(value):
+    """UTC calendar day of a registration date (datetime or stored ISO string)."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).date().isoformat()
+    return str(value)[:10]
+
+
+def _dimensions(registration):
+    return {
+        "day": registration_day(registration.get("registration_date")),
+        "event_id": registration.get("event_id"),
+        "ticket_type": registration.get("ticket_type") or "standard",
+    }
+
+
+def increments(registration):
+    """Yield ``(id, kind, keys, registrations, revenue)`` for every rollup a
+    registration contributes to."""
+    dimensions = _dimensions(registration)
+    amount = registration.get("payment_amount") or 0
+    for kind, fields in ROLLUP_KINDS.items():
+        keys = {field: dimensions[field] for field in fields}
+        yield rollup_id(kind, keys), kind, keys, 1, amount
+
+
+# ==================== REBUILD ====================
+
+def _group_key(field):
+    if field == "day":
+        # registration_date is stored as a UTC ISO-8601 string
+        return {"$substrCP": ["$registration_date", 0, 10]}
+    if field == "ticket_type":
+        return {"$ifNull": ["$ticket_type", "standard"]}
+    return "$" + field
+
+
+async def aggregate_rollups(collection, kind):
+    """Yield rollup totals of ``kind`` for a Motor registrations collection."""
+    pipeline = [{"$group": {
+        "_id": {field: _group_key(field) for field in ROLLUP_KINDS[kind]},
+        "registrations": {"$sum": 1},
+        "revenue": {"$sum": {"$ifNull": ["$payment_amount", 0]}},
+    }}]
+    async for doc in collection.aggregate(pipeline, allowDiskUse=True):
+        yield {**doc["_id"], "registrations": doc["registrations"], "revenue": doc["revenue"]}
+
+
+async def rollups_from_docs(docs, kind):
+    """Pure-Python equivalent of ``aggregate_rollups``."""
+    totals = {}
+    for doc in docs:
+        dimensions = _dimensions(doc)
+        key = tuple(dimensions[field] for field in ROLLUP_KINDS[kind])
+        count, revenue = totals.get(key, (0, 0))
+        totals[key] = (count + 1, revenue + (doc.get("payment_amount") or 0))
+    for key, (count, revenue) in totals.items():
+        yield {**dict(zip(ROLLUP_KINDS[kind], key)), "registrations": count, "revenue": revenue}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Registration and revenue rollups.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="recompute every rollup from live and archived registrations")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    # Imported here: repositories imports this module for the rollup definitions
+    from database import MongoSettings, create_client
+    from repositories import motor_repositories
+
+    parse_args(argv)
+    settings = MongoSettings.from_env()
+    client = create_client(settings)
+    try:
+        repos = motor_repositories(client[settings.db_name])
+        await repos.registration_rollups.ensure_indexes()
+        written = await repos.registration_rollups.rebuild([repos.registrations, repos.registrations_archive])
+        print(f"Rebuilt {written:,} rollup documents")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""
+Archival of registrations and nominations that are no longer live.
+
+Registrations of completed events and nominations of announced awards are
+moved, in batches, from the live collections into ``registrations_archive``
+and ``nominations_archive`` once the parent has been finished for
+``grace_days``. The live collections (and their indexes, which MongoDB wants
+in RAM) then stay proportional to the conferences and awards still running,
+while ``Repository.find_with_archive`` keeps history readable.
+
+Archived parents are stamped with ``archived_at`` so each is moved once.
+Runs in the API lifespan every ``ARCHIVE_INTERVAL_SECONDS``, or by hand:
+    python archive.py --grace-days 30
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from dotenv import load_dotenv
+from pathlib import Path
+
+from database import MongoSettings, create_client
+from repositories import motor_repositories
+from scheduler import PeriodicJob
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# (parent collection, finished status, date it finished by, live collection, field referencing the parent)
+ARCHIVE_POLICIES = [
+    ("events", "completed", "end_date", "registrations", "event_id"),
+    ("awards", "announced", "nomination_end", "nominations", "award_id"),
+]
+
+
+class Archiver(PeriodicJob):
+    name = "Archival"
+
+    def __init__(self, repos, interval_seconds=3600.0, grace_days=30, batch_size=1000, parents_per_pass=100):
+        super().__init__(interval_seconds)
+        self.repos = repos
+        self.grace_days = grace_days
+        self.batch_size = batch_size
+        self.parents_per_pass = parents_per_pass
+
+    async def archive_parent(self, live, field, parent_id):
+        moved = 0
+        while True:
+            n = await live.move_batch({field: parent_id}, live.archive, self.batch_size)
+            moved += n
+            if n < self.batch_size:
+                return moved
+            await asyncio.sleep(0)
+
+    async def run_once(self, now=None):
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=self.grace_days)
+        totals = {}
+        for parent, status, date_field, collection, field in ARCHIVE_POLICIES:
+            parents = self.repos.by_collection(parent)
+            live = self.repos.by_collection(collection)
+            query = {
+                "status": status,
+                date_field: {"$lte": parents.encode({date_field: cutoff})[date_field]},
+                "archived_at": {"$exists": False},
+            }
+            moved = 0
+            while batch := await parents.find(query, limit=self.parents_per_pass, projection=["id"]):
+                for doc in batch:
+                    moved += await self.archive_parent(live, field, doc["id"])
+                    await parents.update(doc["id"], {"archived_at": now})
+            totals[collection] = moved
+            if moved:
+                logger.info("Archived %d %s", moved, collection)
+        return totals
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Move registrations of completed events and nominations of announced awards into archive collections.")
+    parser.add_argument("--grace-days", type=int, default=30, help="days after an event ends / nominations close before archiving")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    settings = MongoSettings.from_env()
+    client = create_client(settings)
+    try:
+        repos = motor_repositories(client[settings.db_name])
+        for archive in (repos.registrations_archive, repos.nominations_archive):
+            await archive.ensure_indexes()
+        totals = await Archiver(repos, grace_days=args.grace_days, batch_size=args.batch_size).run_once()
+        for collection, n in totals.items():
+            print(f"Archived {n:,} {collection}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
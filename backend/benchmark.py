@@ -0,0 +1,318 @@
+"""
+Benchmarks for TCPWorld hot paths.
+
+Database benchmarks run against a database populated by seed_data.py, e.g.:
+    python seed_data.py --drop --events 10000 --speakers 5000 --sessions-per-event 20 --awards 500
+    python benchmark.py search --requests 2000 --concurrency 32
+
+The api benchmark needs no database: it seeds the in-memory backend and
+drives the ASGI app in process.
+    python benchmark.py api --events 2000 --requests 5000
+
+The inserts benchmark compares one insert_one per request with write-behind
+batching, against MongoDB (a scratch collection) or the in-memory backend
+with a simulated round-trip:
+    python benchmark.py inserts --requests 20000 --concurrency 200
+    python benchmark.py inserts --backend memory --latency-ms 1
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from database import MongoSettings, create_client
+from repositories import InquiryRepository, MemoryCollection, MotorCollection, motor_repositories
+from search import SEARCH_TYPES, search_catalog
+from writebehind import WriteBehindBuffer
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+DEFAULT_QUERIES = ["zero trust", "cloud security", "ransomware", "machine learning", "\"incident response\"", "governance"]
+
+
+# ==================== HARNESS ====================
+
+async def run_load(operation, requests, concurrency):
+    """Call ``operation(i)`` ``requests`` times with ``concurrency`` callers
+    and return per-call latencies in seconds plus the wall-clock duration."""
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            await operation(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+def report(label, latencies, elapsed):
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+    print(
+        f"{label:<28} {len(ordered):>7,} req  {len(ordered) / elapsed:>9,.0f} req/s  "
+        f"p50 {pct(0.50):7.2f}ms  p95 {pct(0.95):7.2f}ms  p99 {pct(0.99):7.2f}ms  "
+        f"mean {statistics.fmean(ordered) * 1000:7.2f}ms"
+    )
+
+
+def connect():
+    settings = MongoSettings.from_env()
+    client = create_client(settings)
+    return client, client[settings.db_name]
+
+
+# ==================== SEARCH ====================
+
+async def _regex_scan(db, repos, q, types, limit):
+    """What clients did before /api/search: case-insensitive scans of every
+    text field, with no ranking."""
+    pattern = re.compile(re.escape(q.strip('"')), re.IGNORECASE)
+
+    async def scan(collection):
+        fields = repos.by_collection(collection).text_weights
+        query = {"$or": [{field: pattern} for field in fields]}
+        return await db[collection].find(query, {"_id": 0, "id": 1}).limit(limit).to_list(limit)
+
+    return await asyncio.gather(*(scan(collection) for collection in types))
+
+
+async def bench_search(args):
+    client, db = connect()
+    repos = motor_repositories(db)
+    await repos.ensure_indexes()
+    sizes = {c: await repos.by_collection(c).count() for c in SEARCH_TYPES}
+    print("Catalog size: " + ", ".join(f"{c}={n:,}" for c, n in sizes.items()))
+
+    queries = args.queries or DEFAULT_QUERIES
+    types = args.types.split(',') if args.types else SEARCH_TYPES
+    skip = (args.page - 1) * args.page_size
+
+    async def text_search(i):
+        await search_catalog(repos, queries[i % len(queries)], types, skip, args.page_size)
+
+    async def regex_scan(i):
+        await _regex_scan(db, repos, queries[i % len(queries)], types, args.page * args.page_size)
+
+    await run_load(text_search, min(args.requests, 50), args.concurrency)  # warm caches
+    report("text index (/api/search)", *await run_load(text_search, args.requests, args.concurrency))
+    if args.baseline:
+        report("regex scan (baseline)", *await run_load(regex_scan, args.baseline, args.concurrency))
+
+    client.close()
+
+
+# ==================== API (in-memory backend) ====================
+
+async def asgi_get(app, path, query="", headers=()):
+    """Issue one GET against an ASGI app without a network or HTTP client
+    and return the response status."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "root_path": "",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": [(b"host", b"benchmark"), *headers],
+        "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return response["status"]
+
+
+async def bench_api(args):
+    # Background jobs would move data (archival, lifecycle) mid-measurement
+    os.environ.update({
+        "DATA_BACKEND": "memory",
+        "LIFECYCLE_INTERVAL_SECONDS": "0",
+        "ARCHIVE_INTERVAL_SECONDS": "0",
+        "OUTBOX_WORKERS": "0",
+    })
+    import seed_data
+    import server
+
+    async with server.lifespan(server.app):
+        repos = server.app.state.repos
+        data = seed_data.SyntheticData(seed_data.parse_args([
+            "--events", str(args.events), "--users", str(args.users), "--registrations", str(args.registrations),
+            "--speakers", str(args.speakers), "--awards", str(args.awards), "--nominations", str(args.nominations),
+        ]))
+        started = time.perf_counter()
+        for name in seed_data.COLLECTIONS:
+            await repos.by_collection(name).collection.insert_many(list(data.stream(name)))
+        await repos.ensure_indexes()
+        print(f"Seeded in-memory backend in {time.perf_counter() - started:.1f}s")
+
+        event_ids = [data.event(i)["id"] for i in range(min(args.events, 100))]
+        user_id = data.user_identity(0)[0]
+        auth = [(b"authorization", f"Bearer {server.create_access_token({'sub': user_id})}".encode())]
+
+        scenarios = {
+            "GET /events/{id}": lambda i: asgi_get(server.app, f"/api/events/{event_ids[i % len(event_ids)]}"),
+            "GET /events?featured=true": lambda i: asgi_get(server.app, "/api/events", "featured=true"),
+            "GET /events?city=...": lambda i: asgi_get(server.app, "/api/events", "city=Boston,London&price_band=free"),
+            "GET /events/facets": lambda i: asgi_get(server.app, "/api/events/facets", "month=2026-01"),
+            "GET /speakers?expertise": lambda i: asgi_get(server.app, "/api/speakers", "expertise=Zero%20Trust"),
+            "GET /sessions?event_id": lambda i: asgi_get(server.app, "/api/sessions", f"event_id={event_ids[i % len(event_ids)]}"),
+            "GET /registrations/my": lambda i: asgi_get(server.app, "/api/registrations/my", headers=auth),
+            "GET /search": lambda i: asgi_get(server.app, "/api/search", "q=zero%20trust&page_size=10"),
+        }
+        for label, request in scenarios.items():
+            if args.only and not any(fragment in label for fragment in args.only):
+                continue
+
+            async def call(i, request=request):
+                status = await request(i)
+                if status != 200:
+                    raise RuntimeError(f"{label} returned {status}")
+
+            await run_load(call, min(args.requests, 20), args.concurrency)
+            report(label, *await run_load(call, args.requests, args.concurrency))
+
+        routes = server.single_flight.metrics()["routes"]
+        if routes:
+            print("Coalesced reads: " + ", ".join(
+                f"{route}={stats['collapsed']:,}/{stats['calls']:,}" for route, stats in routes.items()
+            ))
+
+
+# ==================== INSERTS (write-behind) ====================
+
+class RoundTripCollection:
+    """In-memory collection where every call holds one of ``pool_size``
+    connections for ``latency`` seconds, as a stand-in for round-trips to
+    MongoDB through the driver's pool."""
+
+    def __init__(self, collection, latency, pool_size):
+        self.collection = collection
+        self.name = collection.name
+        self.latency = latency
+        self.pool = asyncio.Semaphore(pool_size)
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        async def call(*args, **kwargs):
+            async with self.pool:
+                await asyncio.sleep(self.latency)
+                return await method(*args, **kwargs)
+
+        return call
+
+
+def _inquiry(i):
+    return {
+        "id": str(uuid.uuid4()), "name": f"Visitor {i}", "email": f"visitor{i}@example.com",
+        "subject": "Keynote follow-up", "message": "Please send the slides.", "status": "new",
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+async def bench_inserts(args):
+    client = None
+    if args.backend == "mongo":
+        client, db = connect()
+        await db["benchmark_inquiries"].drop()
+        collection = MotorCollection(db["benchmark_inquiries"])
+    else:
+        collection = RoundTripCollection(
+            MemoryCollection("benchmark_inquiries"), args.latency_ms / 1000, args.pool_size,
+        )
+    repo = InquiryRepository(collection)
+    await repo.ensure_indexes()
+
+    async def insert_one(i):
+        await repo.insert(_inquiry(i))
+
+    await run_load(insert_one, min(args.requests, 100), args.concurrency)  # warm up
+    report("insert_one per request", *await run_load(insert_one, args.requests, args.concurrency))
+
+    for mode in ("durable", "async"):
+        buffer = WriteBehindBuffer(
+            repo, durable=mode == "durable", max_batch=args.max_batch, max_delay_seconds=args.max_delay_ms / 1000,
+        )
+        buffer.start()
+
+        async def add(i, buffer=buffer):
+            await buffer.add(_inquiry(i))
+
+        started = time.perf_counter()
+        latencies, _ = await run_load(add, args.requests, args.concurrency)
+        await buffer.stop()
+        # Elapsed includes draining the buffer, so throughput counts documents written
+        report(f"write-behind ({mode})", latencies, time.perf_counter() - started)
+        print(f"{'':<28} {buffer.stats['batches']:,} batches, largest {buffer.stats['largest_batch']:,}")
+
+    expected = min(args.requests, 100) + 3 * args.requests
+    written = await repo.count()
+    if written != expected:
+        raise RuntimeError(f"expected {expected:,} documents, found {written:,}")
+    if client is not None:
+        await db["benchmark_inquiries"].drop()
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TCPWorld hot paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="full-text search across the catalog")
+    search.add_argument("--requests", type=int, default=1000)
+    search.add_argument("--concurrency", type=int, default=16)
+    search.add_argument("--queries", nargs="+", help="query strings to cycle through")
+    search.add_argument("--types", help="comma-separated collections to search")
+    search.add_argument("--page", type=int, default=1)
+    search.add_argument("--page-size", type=int, default=20)
+    search.add_argument("--baseline", type=int, default=100,
+                        help="requests to spend on the unindexed regex-scan baseline (0 to skip)")
+    search.set_defaults(run=bench_search)
+
+    api = commands.add_parser("api", help="in-process API throughput on the in-memory backend")
+    api.add_argument("--requests", type=int, default=2000, help="requests per endpoint")
+    api.add_argument("--concurrency", type=int, default=16)
+    api.add_argument("--events", type=int, default=1000)
+    api.add_argument("--users", type=int, default=5000)
+    api.add_argument("--registrations", type=int, default=20000)
+    api.add_argument("--speakers", type=int, default=300)
+    api.add_argument("--awards", type=int, default=20)
+    api.add_argument("--nominations", type=int, default=2000)
+    api.add_argument("--only", nargs="+", help="only run scenarios whose label contains one of these strings")
+    api.set_defaults(run=bench_api)
+
+    inserts = commands.add_parser("inserts", help="insert_one per request vs write-behind batching")
+    inserts.add_argument("--requests", type=int, default=10000)
+    inserts.add_argument("--concurrency", type=int, default=200)
+    inserts.add_argument("--backend", choices=["mongo", "memory"], default="mongo")
+    inserts.add_argument("--latency-ms", type=float, default=1.0, help="simulated round-trip for --backend memory")
+    inserts.add_argument("--pool-size", type=int, default=100, help="simulated connection pool for --backend memory")
+    inserts.add_argument("--max-batch", type=int, default=500)
+    inserts.add_argument("--max-delay-ms", type=float, default=2)
+    inserts.set_defaults(run=bench_inserts)
+
+    args = parser.parse_args(argv)
+    asyncio.run(args.run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+In-process cache for derived read results (facet counts and the like).
+
+Entries live in namespaces named after the collection they were computed
+from, so a write handler can drop everything it may have made stale with a
+single ``invalidate`` call. The TTL bounds staleness across workers, which
+each keep their own cache.
+
+A result computed while its namespace was invalidated is stale on arrival:
+callers read ``generation()`` before querying and pass it to ``set``, which
+then drops the write.
+"""
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class QueryCache:
+    def __init__(self, ttl_seconds=60.0, max_entries=1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (namespace, key) -> (expires_at, value)
+        self._generations = {}         # namespace -> number of invalidations
+
+    def get(self, namespace, key):
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[(namespace, key)]
+            return MISSING
+        self._entries.move_to_end((namespace, key))
+        return value
+
+    def generation(self, namespace):
+        return self._generations.get(namespace, 0)
+
+    def set(self, namespace, key, value, generation=None):
+        if generation is not None and generation != self.generation(namespace):
+            return
+        self._entries[(namespace, key)] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end((namespace, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self._generations[namespace] = self.generation(namespace) + 1
+        for entry_key in [k for k in self._entries if k[0] in namespaces]:
+            del self._entries[entry_key]
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,29 @@
+"""
+iCalendar (.ics) rendering of events, shared by the calendar export endpoint
+and the registration confirmation email.
+"""
+
+
+def event_calendar(event):
+    """Return the ``.ics`` bytes for one event document."""
+    # Imported on first export rather than at boot; most workers never need it
+    from icalendar import Calendar, Event as ICalEvent
+
+    cal = Calendar()
+    cal.add('prodid', '-//TCPWorld Conference//tcpworld.ai//')
+    cal.add('version', '2.0')
+    
+    ical_event = ICalEvent()
+    ical_event.add('summary', event['title'])
+    ical_event.add('dtstart', event['start_date'])
+    ical_event.add('dtend', event['end_date'])
+    ical_event.add('description', event['description'])
+    ical_event.add('location', f"{event['venue']}, {event['city']}, {event['country']}")
+    ical_event.add('uid', event['id'])
+    
+    cal.add_component(ical_event)
+    return cal.to_ical()
+
+
+def calendar_filename(event):
+    return f"{event['title'].replace(' ', '_')}.ics"
@@ -0,0 +1,207 @@
+"""
+Cascading cleanup of documents that belong to a deleted parent.
+
+Registrations (live and archived), sessions and waiting-room state belong to
+an event, nominations to an award. Deleting a parent only removes the parent
+document; its dependents are removed afterwards by a background
+``CascadeCleaner`` in bounded batches, so deleting an event with tens of
+thousands of registrations returns immediately and never holds one long
+``delete_many`` on the primary.
+
+Queued cascades live in process and are lost on restart; the sweeper picks
+up whatever they leave behind, along with orphans that predate cascading.
+It also removes repeated registrations of one user for one event, which
+predate the unique (event_id, user_id) index and keep it from being built:
+    python cleanup.py --dry-run     # report orphans and duplicates per collection
+    python cleanup.py               # delete them
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+from dotenv import load_dotenv
+from pathlib import Path
+
+from database import MongoSettings, create_client
+from repositories import motor_repositories
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# parent collection -> [(dependent collection, field referencing the parent id)]
+DEPENDENTS = {
+    "events": [
+        ("registrations", "event_id"), ("registrations_archive", "event_id"), ("sessions", "event_id"),
+        ("waiting_rooms", "id"), ("waiting_room_entries", "event_id"),
+    ],
+    "awards": [("nominations", "award_id"), ("nominations_archive", "award_id")],
+}
+
+
+async def _delete_in_batches(repo, query, batch_size, pause_seconds=0.0):
+    total = 0
+    while True:
+        n = await repo.delete_batch(query, batch_size)
+        total += n
+        if n < batch_size:
+            return total
+        await asyncio.sleep(pause_seconds)
+
+
+async def purge_dependents(repos, parent, parent_id, batch_size=1000, pause_seconds=0.0):
+    """Delete every document that references ``parent_id``, ``batch_size``
+    at a time, and return ``{collection: deleted}``."""
+    deleted = {}
+    for collection, field in DEPENDENTS[parent]:
+        repo = repos.by_collection(collection)
+        deleted[collection] = await _delete_in_batches(repo, {field: parent_id}, batch_size, pause_seconds)
+    return deleted
+
+
+class CascadeCleaner:
+    """Single background worker draining a queue of deleted parents."""
+
+    def __init__(self, repos, batch_size=1000, pause_seconds=0.0):
+        self.repos = repos
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def enqueue(self, parent, parent_id):
+        if parent not in DEPENDENTS:
+            raise KeyError(parent)
+        self._queue.put_nowait((parent, parent_id))
+
+    async def _run(self):
+        while True:
+            parent, parent_id = await self._queue.get()
+            try:
+                deleted = await purge_dependents(
+                    self.repos, parent, parent_id, self.batch_size, self.pause_seconds,
+                )
+                logger.info("Cascade for %s %s removed %s", parent, parent_id, deleted)
+            except Exception:
+                logger.exception("Cascade for %s %s failed; the orphan sweeper will retry it", parent, parent_id)
+            finally:
+                self._queue.task_done()
+
+    async def join(self):
+        """Wait until every queued cascade has been processed."""
+        await self._queue.join()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# ==================== ORPHAN SWEEPER ====================
+
+def _chunks(values, size):
+    iterator = iter(values)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+async def find_orphans(repos, chunk_size=1000):
+    """Return ``{(parent, collection, field): [missing parent ids]}``.
+
+    Works from the distinct referenced ids (served by the foreign-key
+    indexes) rather than scanning dependent documents.
+    """
+    orphans = {}
+    for parent, dependents in DEPENDENTS.items():
+        parent_repo = repos.by_collection(parent)
+        for collection, field in dependents:
+            referenced = [v for v in await repos.by_collection(collection).distinct(field) if v is not None]
+            existing = set()
+            for chunk in _chunks(referenced, chunk_size):
+                existing |= await parent_repo.existing_ids(chunk)
+            orphans[(parent, collection, field)] = [v for v in referenced if v not in existing]
+    return orphans
+
+
+async def sweep_orphans(repos, batch_size=1000, dry_run=False):
+    """Delete (or with ``dry_run`` only count) orphaned documents and return
+    ``{collection: n}``."""
+    totals = {}
+    for (parent, collection, field), missing in (await find_orphans(repos)).items():
+        repo = repos.by_collection(collection)
+        n = 0
+        for chunk in _chunks(missing, 1000):
+            query = {field: {"$in": chunk}}
+            if dry_run:
+                n += await repo.count(query)
+            else:
+                n += await _delete_in_batches(repo, query, batch_size)
+        totals[collection] = totals.get(collection, 0) + n
+    return totals
+
+
+# ==================== DUPLICATE REGISTRATIONS ====================
+
+async def remove_duplicate_registrations(repos, dry_run=False):
+    """Keep the earliest registration of each repeated (event, user) pair and
+    delete the others, returning their seats to the event while it is live.
+    Returns ``{collection: n}`` deleted, or with ``dry_run`` found."""
+    totals = {}
+    for repo in (repos.registrations, repos.registrations_archive):
+        n = 0
+        for ids in await repo.duplicates():
+            docs = await repo.find(
+                {"id": {"$in": ids}}, sort=[("registration_date", 1), ("id", 1)], limit=len(ids),
+                projection=["id", "event_id"],
+            )
+            extra = [doc["id"] for doc in docs[1:]]
+            if not dry_run:
+                await repo.collection.delete_many({"id": {"$in": extra}})
+                if repo is repos.registrations:
+                    await repos.events.adjust_seats(docs[0]["event_id"], len(extra))
+            n += len(extra)
+        totals[repo.collection_name] = n
+    return totals
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Remove registrations, sessions and nominations whose parent no longer exists, and duplicate registrations.")
+    parser.add_argument("--dry-run", action="store_true", help="only report how many orphans each collection has")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    settings = MongoSettings.from_env()
+    client = create_client(settings)
+    try:
+        repos = motor_repositories(client[settings.db_name])
+        totals = await sweep_orphans(repos, args.batch_size, args.dry_run)
+        verb = "Found" if args.dry_run else "Deleted"
+        for collection, n in totals.items():
+            print(f"{verb} {n:,} orphaned {collection}")
+        duplicates = await remove_duplicate_registrations(repos, args.dry_run)
+        for collection, n in duplicates.items():
+            print(f"{verb} {n:,} duplicate {collection}")
+        if any(duplicates.values()) and not args.dry_run:
+            print("Rebuild the rollups with `python analytics.py rebuild`; the API builds the unique index on its next start")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
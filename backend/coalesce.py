@@ -0,0 +1,96 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight call and its
+result instead of each querying the database: when a featured event goes
+live, a burst of identical ``GET /events/{id}`` requests costs one query.
+Nothing is cached once the call completes; the next caller starts a new one.
+
+The shared call runs in its own task, so a caller that disconnects (and is
+cancelled) does not cancel the work the other callers are waiting on.
+"""
+import asyncio
+from collections import OrderedDict
+
+
+class FlightStats:
+    __slots__ = ("calls", "executions", "collapsed", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+        self.errors = 0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "errors": self.errors,
+        }
+
+
+class SingleFlight:
+    def __init__(self, max_tracked_keys=1000):
+        self.max_tracked_keys = max_tracked_keys
+        self._inflight = {}
+        self._by_route = {}
+        self._by_key = OrderedDict()
+
+    def _stats(self, route, key):
+        route_stats = self._by_route.setdefault(route, FlightStats())
+        key_stats = self._by_key.get((route, key))
+        if key_stats is None:
+            key_stats = self._by_key[(route, key)] = FlightStats()
+            while len(self._by_key) > self.max_tracked_keys:
+                self._by_key.popitem(last=False)
+        else:
+            self._by_key.move_to_end((route, key))
+        return route_stats, key_stats
+
+    async def do(self, route, key, fetch):
+        """Return ``await fetch()``, sharing the call with any concurrent
+        caller that passed the same ``(route, key)``."""
+        stats = self._stats(route, key)
+        for s in stats:
+            s.calls += 1
+
+        task = self._inflight.get((route, key))
+        if task is None:
+            for s in stats:
+                s.executions += 1
+            task = asyncio.ensure_future(fetch())
+            self._inflight[(route, key)] = task
+            task.add_done_callback(lambda done: self._finished(route, key, done))
+        else:
+            for s in stats:
+                s.collapsed += 1
+
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            for s in stats:
+                s.errors += 1
+            raise
+
+    def _finished(self, route, key, task):
+        self._inflight.pop((route, key), None)
+        if not task.cancelled():
+            # Mark the exception retrieved in case every waiter was cancelled
+            task.exception()
+
+    def metrics(self, top=20):
+        keys = sorted(self._by_key.items(), key=lambda item: -item[1].collapsed)[:top]
+        return {
+            "in_flight": len(self._inflight),
+            "routes": {route: stats.as_dict() for route, stats in self._by_route.items()},
+            "top_keys": [
+                {"route": route, "key": key, **stats.as_dict()}
+                for (route, key), stats in keys if stats.collapsed
+            ],
+        }
+
+    def reset(self):
+        self._by_route.clear()
+        self._by_key.clear()
@@ -0,0 +1,117 @@
+"""
+MongoDB client lifecycle and read routing.
+
+The client is created inside the application lifespan with an explicit
+connection pool, warmed up before traffic arrives, and closed on shutdown.
+Two database handles are exposed: the primary handle for authentication,
+registrations and every write, and a catalog handle for anonymous catalog
+reads that may be served by secondaries within a bounded staleness.
+"""
+import asyncio
+import os
+from typing import Optional
+
+from pydantic import BaseModel
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# MongoDB rejects maxStalenessSeconds below 90.
+MIN_MAX_STALENESS_SECONDS = 90
+
+
+class MongoSettings(BaseModel):
+    url: str
+    db_name: str
+    max_pool_size: int = 100
+    min_pool_size: int = 10
+    max_idle_time_ms: int = 300_000
+    connect_timeout_ms: int = 5_000
+    server_selection_timeout_ms: int = 5_000
+    socket_timeout_ms: Optional[int] = None
+    wait_queue_timeout_ms: Optional[int] = 2_000
+    catalog_read_preference: str = "secondaryPreferred"
+    catalog_max_staleness_seconds: int = 120
+
+    @classmethod
+    def from_env(cls):
+        def optional_int(name, default):
+            value = os.environ.get(name)
+            if value is None:
+                return default
+            return int(value) if value else None
+
+        return cls(
+            url=os.environ['MONGO_URL'],
+            db_name=os.environ['DB_NAME'],
+            max_pool_size=int(os.environ.get('MONGO_MAX_POOL_SIZE', 100)),
+            min_pool_size=int(os.environ.get('MONGO_MIN_POOL_SIZE', 10)),
+            max_idle_time_ms=int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 300_000)),
+            connect_timeout_ms=int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5_000)),
+            server_selection_timeout_ms=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5_000)),
+            socket_timeout_ms=optional_int('MONGO_SOCKET_TIMEOUT_MS', None),
+            wait_queue_timeout_ms=optional_int('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2_000),
+            catalog_read_preference=os.environ.get('MONGO_CATALOG_READ_PREFERENCE', 'secondaryPreferred'),
+            catalog_max_staleness_seconds=int(os.environ.get('MONGO_CATALOG_MAX_STALENESS_SECONDS', 120)),
+        )
+
+    def catalog_read_preference_instance(self):
+        if self.catalog_read_preference not in READ_PREFERENCES:
+            raise ValueError(
+                f"Unknown MONGO_CATALOG_READ_PREFERENCE {self.catalog_read_preference!r}; "
+                f"expected one of {', '.join(READ_PREFERENCES)}"
+            )
+        preference = READ_PREFERENCES[self.catalog_read_preference]
+        if preference is Primary:
+            return Primary()
+        staleness = self.catalog_max_staleness_seconds
+        if staleness != -1:
+            staleness = max(staleness, MIN_MAX_STALENESS_SECONDS)
+        return preference(max_staleness=staleness)
+
+
+def create_client(settings):
+    # Deferred: only the Mongo backend needs motor, and it is slow to import
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    options = {
+        "maxPoolSize": settings.max_pool_size,
+        "minPoolSize": settings.min_pool_size,
+        "maxIdleTimeMS": settings.max_idle_time_ms,
+        "connectTimeoutMS": settings.connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.server_selection_timeout_ms,
+    }
+    if settings.socket_timeout_ms:
+        options["socketTimeoutMS"] = settings.socket_timeout_ms
+    if settings.wait_queue_timeout_ms:
+        options["waitQueueTimeoutMS"] = settings.wait_queue_timeout_ms
+    return AsyncIOMotorClient(settings.url, **options)
+
+
+def database_handles(client, settings):
+    """Return ``(primary_db, catalog_db)``."""
+    db = client[settings.db_name]
+    catalog_db = db.with_options(read_preference=settings.catalog_read_preference_instance())
+    return db, catalog_db
+
+
+async def warm_up(client, settings):
+    """Fail fast if the deployment is unreachable, then check out
+    ``min_pool_size`` connections concurrently so the first requests after a
+    deploy don't pay for TCP/TLS handshakes and authentication."""
+    await client.admin.command("ping")
+    connections = max(settings.min_pool_size, 1)
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(connections)))
+
+    catalog_preference = settings.catalog_read_preference_instance()
+    if not isinstance(catalog_preference, Primary):
+        db = client[settings.db_name]
+        await asyncio.gather(*(
+            db.command("ping", read_preference=catalog_preference) for _ in range(connections)
+        ))
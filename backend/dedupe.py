@@ -0,0 +1,249 @@
+"""
+Duplicate nomination detection.
+
+Nominations are normalized on the way in (case-folded emails without
+``+tags``, accent- and honorific-free names, organizations without legal
+suffixes) and given a few *blocking keys*. A new nomination is only compared
+with earlier nominations for the same award that share a blocking key, found
+through an index. It is a duplicate of one with the same nominee email, or
+with a name and organization that score as similar by trigrams; it then joins
+that nomination's cluster. Variant spellings of a name (Jon and John Smith,
+Katherine and Kathrine Johnson) count, except between two different
+mailboxes at the same domain: Michael and Michelle Chen at techcorp.com are
+two colleagues, and hiding one from the judges is worse than showing a
+duplicate. Cost per nomination is one indexed lookup per blocking key over
+a bounded candidate block, never a pairwise pass over the award.
+
+Nominations submitted before detection existed can be clustered with
+    python dedupe.py [--award-id ID]
+"""
+import argparse
+import asyncio
+import itertools
+import re
+import unicodedata
+from dotenv import load_dotenv
+from pathlib import Path
+
+from database import MongoSettings, create_client
+from repositories import motor_repositories
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Score at or above which two nominations are considered the same nominee; even
+# equal names need some organization overlap, and with equal organizations the
+# names need a trigram score of about 0.65
+DUPLICATE_THRESHOLD = 0.75
+NAME_WEIGHT, ORGANIZATION_WEIGHT = 0.7, 0.3
+# Upper bound on the candidates taken from each block
+MAX_CANDIDATES = 200
+
+_HONORIFICS = {"dr", "mr", "mrs", "ms", "miss", "prof", "sir", "jr", "sr", "ii", "iii", "phd", "md"}
+_ORG_SUFFIXES = {"inc", "llc", "ltd", "limited", "corp", "corporation", "co", "company", "gmbh", "plc", "sa", "ag", "bv"}
+_GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _fold(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _tokens(text, drop=()):
+    return [t for t in _NON_WORD.split(_fold(text)) if t and t not in drop]
+
+
+def normalize_email(email):
+    local, _, domain = (email or "").strip().lower().partition("@")
+    local = local.split("+", 1)[0]
+    if domain in _GMAIL_DOMAINS:
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}"
+
+
+def normalize_name(name):
+    return " ".join(_tokens(name, _HONORIFICS))
+
+
+def normalize_organization(organization):
+    return " ".join(_tokens(organization, _ORG_SUFFIXES))
+
+
+def _name_tokens(name):
+    """Name tokens in any order, without middle initials."""
+    return sorted(token for token in name.split() if len(token) > 1)
+
+
+def blocking_keys(normalized):
+    """Keys under which likely duplicates collide: the same email, the same
+    name tokens in any order (middle initials aside), or the same surname and
+    first initial, which catches variant spellings of the first name."""
+    keys = [f"e:{normalized['email']}"]
+    tokens = normalized["name"].split()
+    if tokens:
+        keys.append("n:" + " ".join(_name_tokens(normalized["name"])))
+        keys.append(f"i:{tokens[-1]}|{tokens[0][0]}")
+    return keys
+
+
+def annotate(nomination):
+    """Normalized fields and blocking keys to store with a nomination."""
+    normalized = {
+        "email": normalize_email(nomination["nominee_email"]),
+        "name": normalize_name(nomination["nominee_name"]),
+        "organization": normalize_organization(nomination.get("nominee_organization")),
+    }
+    return {"normalized": normalized, "dedupe_keys": blocking_keys(normalized)}
+
+
+def _trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a, b):
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    ta, tb = _trigrams(a), _trigrams(b)
+    return 2 * len(ta & tb) / (len(ta) + len(tb))
+
+
+def _colleagues(a, b):
+    """Two different mailboxes at the same domain."""
+    local_a, _, domain_a = a["email"].partition("@")
+    local_b, _, domain_b = b["email"].partition("@")
+    return bool(domain_a) and domain_a == domain_b and local_a != local_b
+
+
+def similarity(a, b):
+    """Score two normalized nominees in [0, 1]: 1 for the same email, else the
+    weighted trigram similarity of name and organization. Names that are only
+    similar score 0 between colleagues."""
+    if a["email"] == b["email"]:
+        return 1.0
+    name_a, name_b = " ".join(_name_tokens(a["name"])), " ".join(_name_tokens(b["name"]))
+    if not name_a or (name_a != name_b and _colleagues(a, b)):
+        return 0.0
+    return NAME_WEIGHT * _dice(name_a, name_b) + ORGANIZATION_WEIGHT * _dice(a["organization"], b["organization"])
+
+
+def best_match(normalized, candidates):
+    """Return ``(candidate, score)`` for the most similar candidate at or
+    above the threshold, or ``(None, 0.0)``."""
+    best, best_score = None, 0.0
+    for candidate in candidates:
+        score = similarity(normalized, candidate["normalized"])
+        if score >= DUPLICATE_THRESHOLD and score > best_score:
+            best, best_score = candidate, score
+    return best, best_score
+
+
+async def _block(repo, award_id, key):
+    return await repo.find(
+        {"award_id": award_id, "dedupe_keys": key},
+        sort=[("created_at", 1), ("id", 1)], limit=MAX_CANDIDATES, projection=["id", "cluster_id", "normalized"],
+    )
+
+
+async def assign_cluster(repo, nomination):
+    """Annotate ``nomination`` in place with its normalized fields and the
+    cluster it belongs to among earlier nominations for the same award."""
+    nomination.update(annotate(nomination))
+    # One query per block, so a crowded one (a common surname and initial)
+    # cannot push an exact email or name match out of the candidate window
+    blocks = await asyncio.gather(*(
+        _block(repo, nomination["award_id"], key) for key in nomination["dedupe_keys"]
+    ))
+    candidates = {c["id"]: c for c in itertools.chain.from_iterable(blocks) if c.get("normalized")}
+    match, score = best_match(nomination["normalized"], candidates.values())
+    if match is None:
+        nomination["cluster_id"] = nomination["id"]
+        nomination["is_duplicate"] = False
+    else:
+        nomination["cluster_id"] = match.get("cluster_id") or match["id"]
+        nomination["is_duplicate"] = True
+        nomination["duplicate_score"] = round(score, 3)
+    return nomination
+
+
+class ClusterIndex:
+    """In-memory block index for clustering one award's nominations in
+    submission order, without a query per nomination."""
+
+    def __init__(self):
+        self.blocks = {}    # blocking key -> its first candidates in submission order, as assign_cluster reads them
+
+    def assign(self, nomination):
+        """Return the dedupe fields for ``nomination``, the next one submitted."""
+        fields = annotate(nomination)
+        candidates = {}
+        for key in fields["dedupe_keys"]:
+            for candidate in self.blocks.get(key, ()):
+                candidates.setdefault(candidate["id"], candidate)
+        match, score = best_match(fields["normalized"], candidates.values())
+        if match is None:
+            fields.update(cluster_id=nomination["id"], is_duplicate=False)
+        else:
+            fields.update(cluster_id=match["cluster_id"], is_duplicate=True, duplicate_score=round(score, 3))
+        candidate = {"id": nomination["id"], "cluster_id": fields["cluster_id"], "normalized": fields["normalized"]}
+        for key in fields["dedupe_keys"]:
+            block = self.blocks.setdefault(key, [])
+            # Later nominations never see past the first MAX_CANDIDATES
+            if len(block) < MAX_CANDIDATES:
+                block.append(candidate)
+        return fields
+
+
+async def rebuild_clusters(repo, award_id, batch_size=1000):
+    """Recluster every nomination for ``award_id`` in submission order;
+    return ``(nominations, duplicates)``."""
+    index = ClusterIndex()
+    seen = duplicates = 0
+    query = {"award_id": award_id}
+    while batch := await repo.collection.find(
+        query, sort=[("created_at", 1), ("id", 1)], limit=batch_size,
+        projection=["id", "created_at", "nominee_name", "nominee_email", "nominee_organization"],
+    ):
+        updates = []
+        for doc in batch:
+            fields = index.assign(doc)
+            duplicates += fields["is_duplicate"]
+            updates.append(repo.collection.update_one({"id": doc["id"]}, {"$set": fields}))
+        await asyncio.gather(*updates)
+        seen += len(batch)
+        # Keyset pagination on the raw (ISO string) created_at
+        last = batch[-1]
+        query = {"award_id": award_id, "$or": [
+            {"created_at": {"$gt": last["created_at"]}},
+            {"created_at": last["created_at"], "id": {"$gt": last["id"]}},
+        ]}
+    return seen, duplicates
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cluster duplicate nominations per award.")
+    parser.add_argument("--award-id", help="only this award (default: every award)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    settings = MongoSettings.from_env()
+    client = create_client(settings)
+    try:
+        repos = motor_repositories(client[settings.db_name])
+        await repos.nominations.ensure_indexes()
+        award_ids = [args.award_id] if args.award_id else await repos.nominations.distinct("award_id")
+        for award_id in award_ids:
+            seen, duplicates = await rebuild_clusters(repos.nominations, award_id, args.batch_size)
+            print(f"Award {award_id}: {seen:,} nominations, {duplicates:,} duplicates")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
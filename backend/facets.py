@@ -0,0 +1,191 @@
+"""
+Faceted filtering for the event and speaker catalogs.
+
+A facet is a filterable dimension (event type, city, month, price band,
+expertise, ...). The same definitions drive both the list filters and the
+facet counts, which come from a single ``$facet`` aggregation. Counts are
+disjunctive: each facet is counted with every selection applied except its
+own, so a sidebar can offer the other values of a facet the user already
+narrowed.
+"""
+import re
+
+MAX_FACET_VALUES = 50
+
+# Price bands as [low, high) ticket_price ranges; ``None`` is unbounded.
+PRICE_BANDS = {
+    "free": (0, 1),
+    "under_250": (1, 250),
+    "250_to_1000": (250, 1000),
+    "over_1000": (1000, None),
+}
+
+_MONTH = re.compile(r"^(\d{4})-(0[1-9]|1[0-2])$")
+
+EVENT_FACETS = {
+    "event_type": {"kind": "value", "field": "event_type"},
+    "city": {"kind": "value", "field": "city"},
+    "country": {"kind": "value", "field": "country"},
+    "month": {"kind": "month", "field": "start_date"},
+    "price_band": {"kind": "price", "field": "ticket_price"},
+}
+
+SPEAKER_FACETS = {
+    "expertise": {"kind": "multikey", "field": "expertise"},
+    "organization": {"kind": "value", "field": "organization"},
+}
+
+
+def parse_selection(facets, params):
+    """Turn comma-separated query parameters into ``{facet: [values]}``.
+
+    Raises ValueError for malformed months or unknown price bands.
+    """
+    selection = {}
+    for name, spec in facets.items():
+        raw = params.get(name)
+        if not raw:
+            continue
+        values = list(dict.fromkeys(v.strip() for v in raw.split(',') if v.strip()))
+        if not values:
+            continue
+        if spec["kind"] == "month":
+            bad = [v for v in values if not _MONTH.match(v)]
+            if bad:
+                raise ValueError(f"Invalid month {bad[0]!r}; expected YYYY-MM")
+        elif spec["kind"] == "price":
+            bad = [v for v in values if v not in PRICE_BANDS]
+            if bad:
+                raise ValueError(f"Unknown price band {bad[0]!r}. Allowed: {', '.join(PRICE_BANDS)}")
+        selection[name] = values
+    return selection
+
+
+def _next_month(month):
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + 1}-01" if mon == 12 else f"{year}-{mon + 1:02d}"
+
+
+def _clause(spec, values):
+    field = spec["field"]
+    if spec["kind"] in ("value", "multikey"):
+        return {field: {"$in": values}}
+    if spec["kind"] == "month":
+        # Dates are stored as ISO-8601 strings, so a month is a string range.
+        ranges = [{field: {"$gte": v, "$lt": _next_month(v)}} for v in values]
+    else:
+        ranges = []
+        for band in values:
+            low, high = PRICE_BANDS[band]
+            bounds = {"$gte": low}
+            if high is not None:
+                bounds["$lt"] = high
+            ranges.append({field: bounds})
+    return ranges[0] if len(ranges) == 1 else {"$or": ranges}
+
+
+def build_query(base, facets, selection, exclude=None):
+    """Combine the plain equality filters in ``base`` with facet selections."""
+    clauses = [{k: v} for k, v in base.items()]
+    clauses += [_clause(facets[name], values) for name, values in selection.items() if name != exclude]
+    if not clauses:
+        return {}
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def _facet_pipeline(name, spec, facets, selection):
+    field = "$" + spec["field"]
+    stages = []
+    others = build_query({}, facets, selection, exclude=name)
+    if others:
+        stages.append({"$match": others})
+    if spec["kind"] == "multikey":
+        stages.append({"$unwind": field})
+    if spec["kind"] == "price":
+        # Only numeric, non-negative prices belong to a band; $bucket would put
+        # anything else (negative, null, a string) in its default, over_1000
+        stages.append({"$match": {spec["field"]: {"$gte": 0}}})
+        lows = sorted(low for low, _ in PRICE_BANDS.values())
+        stages.append({"$bucket": {
+            "groupBy": field,
+            "boundaries": lows,
+            "default": max(lows),
+            "output": {"count": {"$sum": 1}},
+        }})
+    else:
+        group_key = {"$substrCP": [field, 0, 7]} if spec["kind"] == "month" else field
+        stages.append({"$group": {"_id": group_key, "count": {"$sum": 1}}})
+    stages.append({"$sort": {"count": -1, "_id": 1}})
+    stages.append({"$limit": MAX_FACET_VALUES})
+    return stages
+
+
+def _band_name(low):
+    for name, (band_low, _) in PRICE_BANDS.items():
+        if band_low == low:
+            return name
+    return str(low)
+
+
+async def facet_counts(collection, base, facets, selection):
+    """Return ``{"total": n, "facets": {name: [{"value", "count"}]}}`` using
+    one aggregation. ``base`` filters (status, featured, ...) apply to every
+    facet and are matched up front, where they can use an index."""
+    branches = {name: _facet_pipeline(name, spec, facets, selection) for name, spec in facets.items()}
+    selected = build_query({}, facets, selection)
+    branches["_total"] = ([{"$match": selected}] if selected else []) + [{"$count": "n"}]
+
+    pipeline = []
+    if base:
+        pipeline.append({"$match": base})
+    pipeline.append({"$facet": branches})
+
+    result = (await collection.aggregate(pipeline).to_list(1))[0]
+
+    counts = {}
+    for name, spec in facets.items():
+        buckets = [b for b in result[name] if b["_id"] is not None]
+        if spec["kind"] == "price":
+            counts[name] = [{"value": _band_name(b["_id"]), "count": b["count"]} for b in buckets]
+        else:
+            counts[name] = [{"value": str(b["_id"]), "count": b["count"]} for b in buckets]
+    total = result["_total"][0]["n"] if result["_total"] else 0
+    return {"total": total, "facets": counts}
+
+
+def _price_band(price):
+    for name, (low, high) in PRICE_BANDS.items():
+        if isinstance(price, (int, float)) and not isinstance(price, bool) and price >= low and (high is None or price < high):
+            return name
+    return None
+
+
+def facet_counts_from_docs(docs, facets, selection, matches):
+    """Pure-Python equivalent of ``facet_counts`` for documents already
+    filtered by the base query; ``matches(doc, query)`` evaluates a filter."""
+    counts = {}
+    for name, spec in facets.items():
+        others = build_query({}, facets, selection, exclude=name)
+        tally = {}
+        for doc in docs:
+            if others and not matches(doc, others):
+                continue
+            value = doc.get(spec["field"])
+            if spec["kind"] == "multikey":
+                values = value or []
+            elif spec["kind"] == "month":
+                values = [value[:7]] if isinstance(value, str) else []
+            elif spec["kind"] == "price":
+                values = [_price_band(value)]
+            else:
+                values = [value]
+            for v in values:
+                if v is not None:
+                    tally[v] = tally.get(v, 0) + 1
+        ranked = sorted(tally.items(), key=lambda item: (-item[1], str(item[0])))[:MAX_FACET_VALUES]
+        counts[name] = [{"value": str(v), "count": n} for v, n in ranked]
+    selected = build_query({}, facets, selection)
+    total = sum(1 for doc in docs if not selected or matches(doc, selected))
+    return {"total": total, "facets": counts}
@@ -0,0 +1,114 @@
+"""
+``Idempotency-Key`` support for POST endpoints that clients retry.
+
+The first request with a given key (per user) executes and its response,
+success or client error, is stored for ``IDEMPOTENCY_TTL_HOURS``. A retry
+with the same key gets the stored response back without touching the
+business path. A concurrent duplicate waits for the first request to finish
+instead of executing twice. Reusing a key for a different request is
+rejected with 422. Checks on credentials that change between retries (a
+waiting-room admission token) belong in ``authorize``, not in the payload:
+they run only when the request is about to execute, so a retry is replayed
+however its credentials have changed since.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timezone, timedelta
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(route, payload):
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{route}\n{body}".encode()).hexdigest()
+
+
+class IdempotencyGuard:
+    def __init__(self, lock_timeout_seconds=30.0, wait_seconds=10.0, poll_seconds=0.05):
+        # An in-progress claim older than this is treated as abandoned
+        self.lock_timeout_seconds = lock_timeout_seconds
+        # How long a concurrent duplicate waits for the original to finish
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+
+    @staticmethod
+    def _replay(record):
+        if record["status_code"] >= 400:
+            raise HTTPException(
+                status_code=record["status_code"], detail=record["body"].get("detail"),
+                headers={"Idempotent-Replayed": "true"},
+            )
+        return JSONResponse(
+            content=record["body"], status_code=record["status_code"],
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    async def _wait_for_owner(self, repo, user_id, key, route, digest):
+        """Return the stored response of the request that owns ``key``, or
+        None once we have taken over an abandoned claim."""
+        deadline = time.monotonic() + self.wait_seconds
+        delay = self.poll_seconds
+        while True:
+            record = await repo.lookup(user_id, key)
+            if record is None:
+                # The owner failed and released the key; try to claim it ourselves
+                if await repo.claim(user_id, key, route, digest, datetime.now(timezone.utc)):
+                    return None
+                continue
+            if record["fingerprint"] != digest:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            if record["state"] == "completed":
+                return record
+            now = datetime.now(timezone.utc)
+            if await repo.take_over(user_id, key, now - timedelta(seconds=self.lock_timeout_seconds), now):
+                return None
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=409, detail="A request with this Idempotency-Key is still in progress",
+                    headers={"Retry-After": "1"},
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    async def run(self, repo, user_id, key, route, payload, execute, authorize=None):
+        """Execute ``execute()`` at most once per ``(user_id, key)`` and
+        return its result, or replay the stored response. ``authorize()``
+        runs after the key is claimed; if it raises, the key is released
+        rather than storing the refusal."""
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+        digest = fingerprint(route, payload)
+
+        if not await repo.claim(user_id, key, route, digest, datetime.now(timezone.utc)):
+            record = await self._wait_for_owner(repo, user_id, key, route, digest)
+            if record is not None:
+                return self._replay(record)
+
+        if authorize is not None:
+            try:
+                authorize()
+            except BaseException:
+                await repo.release(user_id, key)
+                raise
+
+        try:
+            result = await execute()
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await repo.release(user_id, key)
+            else:
+                # Deterministic client errors (no seats, already registered) are replayed too
+                await repo.complete(user_id, key, e.status_code, {"detail": e.detail})
+            raise
+        except BaseException:
+            # Let the client retry with the same key
+            await repo.release(user_id, key)
+            raise
+        await repo.complete(user_id, key, 200, jsonable_encoder(result))
+        return result
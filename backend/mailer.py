@@ -0,0 +1,113 @@
+"""
+Outgoing email: message builders and delivery sinks.
+
+``SmtpSink`` delivers through an SMTP relay (``MAIL_BACKEND=smtp``);
+``FileSink`` writes each message as an ``.eml`` file, a local stand-in for
+development and tests (``MAIL_BACKEND=file``) that nothing cleans up. Both are
+only ever called from the outbox worker, never on the request path. Neither is
+a default: with ``MAIL_BACKEND`` unset there is no sink, and messages wait in
+the outbox until a configured worker delivers them.
+"""
+import asyncio
+import os
+import smtplib
+import uuid
+from email.message import EmailMessage
+from pathlib import Path
+
+from calendars import calendar_filename, event_calendar
+
+DEFAULT_SENDER = "TCPWorld <no-reply@tcpworld.ai>"
+
+
+def confirmation_email(sender, registration, event):
+    """Registration confirmation with the event attached as ``.ics``."""
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = registration["user_email"]
+    message["Subject"] = f"You're registered: {event['title']}"
+    message.set_content(
+        f"Hi {registration['user_name']},\n\n"
+        f"You're registered for {event['title']}.\n"
+        f"When: {event['start_date']:%d %b %Y %H:%M} UTC\n"
+        f"Where: {event['venue']}, {event['city']}, {event['country']}\n\n"
+        "Add it to your calendar with the attached invitation.\n"
+    )
+    message.add_attachment(
+        event_calendar(event), maintype="text", subtype="calendar", filename=calendar_filename(event),
+    )
+    return message
+
+
+def receipt_email(sender, registration, event):
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = registration["user_email"]
+    message["Subject"] = f"Receipt for {event['title']}"
+    message.set_content(
+        f"Registration: {registration['id']}\n"
+        f"Event: {event['title']}\n"
+        f"Ticket: {registration['ticket_type']}\n"
+        f"Amount: {registration['payment_amount']:.2f}\n"
+        f"Payment status: {registration['payment_status']}\n"
+    )
+    return message
+
+
+class FileSink:
+    """Writes each message to ``directory`` as ``<uuid>.eml``."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _write(self, message):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{uuid.uuid4()}.eml"
+        path.write_bytes(message.as_bytes())
+        return path
+
+    async def send(self, message):
+        await asyncio.to_thread(self._write, message)
+
+
+class SmtpSink:
+    """Blocking ``smtplib`` delivery, run in a thread."""
+
+    def __init__(self, host, port=587, username=None, password=None, starttls=True, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def _send(self, message):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+    async def send(self, message):
+        await asyncio.to_thread(self._send, message)
+
+
+def sink_from_env(root_dir):
+    """The sink ``MAIL_BACKEND`` selects, or None if it is unset."""
+    backend = os.environ.get("MAIL_BACKEND")
+    if not backend:
+        return None
+    if backend == "smtp":
+        if not os.environ.get("SMTP_HOST"):
+            raise ValueError("MAIL_BACKEND=smtp needs SMTP_HOST")
+        return SmtpSink(
+            os.environ["SMTP_HOST"],
+            int(os.environ.get("SMTP_PORT", "587")),
+            os.environ.get("SMTP_USERNAME") or None,
+            os.environ.get("SMTP_PASSWORD") or None,
+            os.environ.get("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes"),
+        )
+    if backend == "file":
+        return FileSink(os.environ.get("MAIL_FILE_DIR") or root_dir / "mail")
+    raise ValueError(f"Unknown MAIL_BACKEND {backend!r}; expected 'file' or 'smtp'")
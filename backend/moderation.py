@@ -0,0 +1,120 @@
+"""
+Bulk status moderation for nominations and inquiries.
+
+A review cycle changes the status of hundreds or thousands of documents at
+once. Each batch costs one read of the current states, one unordered
+``bulk_write`` for the documents, and, for nomination winners, one
+``bulk_write`` that records the winner on the awards. Every item comes back
+with its own result, so a client can retry only the ones that did not apply.
+
+Item results:
+    updated       the status was changed
+    unchanged     the document already had that status
+    not_found     no document with that id
+    conflict      the document changed concurrently; re-read and retry
+"""
+
+
+class ModerationError(ValueError):
+    """The batch as a whole is invalid (e.g. two winners for one award)."""
+
+
+def _check_unique_ids(changes):
+    ids = [change["id"] for change in changes]
+    if len(set(ids)) != len(ids):
+        raise ModerationError("Each id may appear only once per request")
+    return ids
+
+
+async def _apply(repo, changes, current, update_for):
+    """Bulk-apply status changes guarded by each document's current status
+    and return per-item results."""
+    results, operations = {}, []
+    for change in changes:
+        doc = current.get(change["id"])
+        if doc is None:
+            results[change["id"]] = "not_found"
+        elif doc["status"] == change["status"]:
+            results[change["id"]] = "unchanged"
+        else:
+            # Guarding on the status we read keeps a concurrent moderator's change intact
+            operations.append(("update_one", {"id": change["id"], "status": doc["status"]}, update_for(change)))
+            results[change["id"]] = "updated"
+
+    modified = await repo.bulk_write(operations)
+    if modified < len(operations):
+        targets = {change["id"]: change["status"] for change in changes if results[change["id"]] == "updated"}
+        after = await repo.find({"id": {"$in": list(targets)}}, projection=["id", "status"], limit=len(targets))
+        applied = {doc["id"] for doc in after if doc["status"] == targets[doc["id"]]}
+        for doc_id in targets:
+            if doc_id not in applied:
+                results[doc_id] = "conflict"
+    return results
+
+
+async def set_nomination_statuses(repos, changes):
+    """Apply ``[{"id", "status"}]`` to nominations. A nomination set to
+    ``winner`` becomes its award's ``winner_id``/``winner_name`` and the
+    award is announced; a previous winner of that award is moved back to
+    ``approved``. Returns ``{id: result}``."""
+    ids = _check_unique_ids(changes)
+    docs = await repos.nominations.find(
+        {"id": {"$in": ids}}, projection=["id", "status", "award_id", "nominee_name"], limit=len(ids),
+    )
+    current = {doc["id"]: doc for doc in docs}
+
+    winners = {}
+    for change in changes:
+        doc = current.get(change["id"])
+        if doc is not None and change["status"] == "winner":
+            if doc["award_id"] in winners:
+                raise ModerationError(f"More than one winner for award {doc['award_id']}")
+            winners[doc["award_id"]] = doc
+
+    demoted = []
+    if winners:
+        awards = await repos.awards.find(
+            {"id": {"$in": list(winners)}}, projection=["id", "winner_id"], limit=len(winners),
+        )
+        requested = {change["id"] for change in changes}
+        demoted = [
+            award["winner_id"] for award in awards
+            if award.get("winner_id") and award["winner_id"] != winners[award["id"]]["id"]
+            and award["winner_id"] not in requested
+        ]
+
+    results = await _apply(repos.nominations, changes, current, lambda change: {"$set": {"status": change["status"]}})
+
+    award_operations = []
+    for award_id, doc in winners.items():
+        if results[doc["id"]] in ("updated", "unchanged"):
+            award_operations.append(("update_one", {"id": award_id}, {"$set": {
+                "winner_id": doc["id"], "winner_name": doc["nominee_name"], "status": "announced",
+            }}))
+    for change in changes:
+        doc = current.get(change["id"])
+        if doc is not None and doc["status"] == "winner" and change["status"] != "winner" \
+                and results[change["id"]] == "updated" and doc["award_id"] not in winners:
+            # The award's winner was withdrawn
+            award_operations.append(("update_one", {"id": doc["award_id"], "winner_id": doc["id"]}, {
+                "$set": {"status": "closed"}, "$unset": {"winner_id": "", "winner_name": ""},
+            }))
+    await repos.awards.bulk_write(award_operations)
+    if demoted:
+        await repos.nominations.bulk_write([
+            ("update_one", {"id": nomination_id, "status": "winner"}, {"$set": {"status": "approved"}})
+            for nomination_id in demoted
+        ])
+    return results
+
+
+async def set_inquiry_statuses(repos, changes, now):
+    """Apply ``[{"id", "status"}]`` to inquiries; resolving stamps
+    ``resolved_at`` for the retention TTL. Returns ``{id: result}``."""
+    ids = _check_unique_ids(changes)
+    docs = await repos.inquiries.find({"id": {"$in": ids}}, projection=["id", "status"], limit=len(ids))
+    current = {doc["id"]: doc for doc in docs}
+    return await _apply(
+        repos.inquiries, changes, current,
+        lambda change: repos.inquiries.status_update(change["status"], now),
+    )
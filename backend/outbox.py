@@ -0,0 +1,186 @@
+"""
+Transactional outbox for registration side effects.
+
+A registration and its outgoing messages (confirmation email with the event
+as ``.ics``, receipt) are written together, in one transaction where the
+deployment supports it, so a committed registration always has its messages
+and the request never waits on mail delivery. ``OutboxWorker`` tasks claim
+due messages one at a time with ``find_one_and_update`` and deliver them.
+
+Message states:
+    pending      waiting to be sent, not before ``available_at``
+    processing   claimed by a worker; reclaimed if its lock goes stale
+    sent         delivered; removed by a TTL index after the retention period
+    discarded    its registration or event no longer exists
+    dead         failed ``max_attempts`` times; retry by hand from the admin API
+
+Failures are retried with exponential backoff and jitter. Workers run in
+the API lifespan (``OUTBOX_WORKERS``) or as a separate process:
+    python outbox.py --workers 8
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timezone, timedelta
+from dotenv import load_dotenv
+from pathlib import Path
+
+from database import MongoSettings, create_client
+from mailer import DEFAULT_SENDER, confirmation_email, receipt_email, sink_from_env
+from repositories import motor_repositories
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# message kind -> builder(sender, registration, event)
+MESSAGE_BUILDERS = {
+    "registration_confirmation": confirmation_email,
+    "registration_receipt": receipt_email,
+}
+
+
+def registration_messages(registration, now):
+    """Outbox messages to write together with ``registration``."""
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "registration_id": registration["id"],
+            "event_id": registration["event_id"],
+            "state": "pending",
+            "attempts": 0,
+            "created_at": now,
+            "available_at": now,
+        }
+        for kind in MESSAGE_BUILDERS
+    ]
+
+
+class OutboxWorker:
+    """``concurrency`` tasks delivering outbox messages through ``sink``."""
+
+    def __init__(self, repos, sink, sender, concurrency=4, max_attempts=8, base_backoff_seconds=5.0,
+                 max_backoff_seconds=3600.0, lock_timeout_seconds=300.0, poll_seconds=1.0):
+        self.repos = repos
+        self.sink = sink
+        self.sender = sender
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        # A processing message locked longer than this is assumed abandoned
+        self.lock_timeout_seconds = lock_timeout_seconds
+        # Idle workers re-check this often; notify() wakes them sooner
+        self.poll_seconds = poll_seconds
+        self._wake = asyncio.Event()
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers because new messages were written."""
+        self._wake.set()
+
+    def backoff(self, attempts):
+        delay = min(self.base_backoff_seconds * 2 ** (attempts - 1), self.max_backoff_seconds)
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    async def _build(self, message):
+        registration = await self.repos.registrations.get(message["registration_id"])
+        event = await self.repos.events.get(message["event_id"])
+        if registration is None or event is None:
+            return None
+        return MESSAGE_BUILDERS[message["kind"]](self.sender, registration, event)
+
+    async def deliver(self, message):
+        """Send one claimed message and record the outcome."""
+        outbox = self.repos.outbox
+        try:
+            email = await self._build(message)
+            if email is None:
+                await outbox.finish(message, "discarded")
+                return
+            await self.sink.send(email)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if message["attempts"] >= self.max_attempts:
+                logger.error("Outbox message %s is dead after %d attempts: %s", message["id"], message["attempts"], error)
+                await outbox.finish(message, "dead", error)
+            else:
+                retry_at = datetime.now(timezone.utc) + self.backoff(message["attempts"])
+                await outbox.retry_later(message, retry_at, error)
+            return
+        await outbox.finish(message, "sent")
+
+    async def run_once(self):
+        """Deliver one due message; False if there was none."""
+        message = await self.repos.outbox.claim(
+            datetime.now(timezone.utc), timedelta(seconds=self.lock_timeout_seconds),
+        )
+        if message is None:
+            return False
+        await self.deliver(message)
+        return True
+
+    async def _run(self):
+        while True:
+            # Cleared before looking, so a notify() during the claim is not lost
+            self._wake.clear()
+            try:
+                if await self.run_once():
+                    continue
+            except Exception:
+                logger.exception("Outbox worker failed; retrying in %ss", self.poll_seconds)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        # A message interrupted mid-delivery stays processing and is
+        # reclaimed once its lock goes stale
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Deliver outbox messages until interrupted.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-attempts", type=int, default=8)
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    sink = sink_from_env(ROOT_DIR)
+    if sink is None:
+        raise SystemExit("Set MAIL_BACKEND to smtp (with SMTP_HOST) or file")
+    settings = MongoSettings.from_env()
+    client = create_client(settings)
+    repos = motor_repositories(client[settings.db_name])
+    await repos.outbox.ensure_indexes()
+    sender = os.environ.get("MAIL_FROM", DEFAULT_SENDER)
+    worker = OutboxWorker(repos, sink, sender, concurrency=args.workers, max_attempts=args.max_attempts)
+    worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await worker.stop()
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,1293 @@
+"""
+Data-access layer.
+
+Handlers talk to one repository per collection instead of the Motor database
+directly. Repositories own the collection's date encoding (datetimes are
+stored as UTC ISO-8601 strings), its indexes and any query that deserves to be
+optimized in one place.
+
+Repositories sit on top of a small collection interface with two backends:
+
+* ``MotorCollection`` wraps a Motor collection (production).
+* ``MemoryCollection`` keeps documents in process with hash indexes on the
+  declared index fields, for tests, benchmarks and running the API without
+  MongoDB (``DATA_BACKEND=memory``).
+
+Both accept the same subset of the MongoDB query language: equality (including
+array membership), ``$in``, ``$nin``, ``$ne``, ``$gt``/``$gte``/``$lt``/``$lte``,
+``$exists``, ``$and`` and ``$or``; updates support ``$set``, ``$inc``,
+``$unset``, ``$push`` and ``$setOnInsert``, singly or through ``bulk_write``.
+"""
+import heapq
+import itertools
+import logging
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+import analytics
+from facets import facet_counts, facet_counts_from_docs
+
+logger = logging.getLogger(__name__)
+
+TEXT_INDEX_NAME = "search_text"
+
+_MISSING = object()
+
+# bulk_write operations are (kind, filter, update) tuples
+_BULK_OPERATIONS = {
+    "update_one": UpdateOne,
+    "update_many": UpdateMany,
+    "upsert_one": lambda query, update: UpdateOne(query, update, upsert=True),
+}
+
+
+# ==================== DATE ENCODING ====================
+
+def encode_dates(doc, fields):
+    """Store datetimes as UTC ISO-8601 strings so they sort and range-compare
+    correctly as plain strings."""
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            doc[field] = value.astimezone(timezone.utc).isoformat()
+    return doc
+
+
+def decode_dates(doc, fields):
+    for field in fields:
+        if isinstance(doc.get(field), str):
+            doc[field] = datetime.fromisoformat(doc[field])
+    return doc
+
+
+def _utc(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+    return value
+
+
+def index(*fields, **options):
+    """Index declaration: ``index("event_id", "user_id", unique=True)``."""
+    return {"keys": [(field, 1) for field in fields], **options}
+
+
+# ==================== QUERY MATCHING (memory backend) ====================
+
+def _values(doc, field):
+    value = doc
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _equals(value, target):
+    if value is _MISSING:
+        return target is None
+    if isinstance(value, list) and not isinstance(target, list):
+        return target in value
+    return value == target
+
+
+def _compare(value, target, op):
+    candidates = value if isinstance(value, list) else [value]
+    for candidate in candidates:
+        if candidate is _MISSING or candidate is None:
+            continue
+        try:
+            if op(candidate, target):
+                return True
+        except TypeError:
+            continue
+    return False
+
+
+_OPERATORS = {
+    "$in": lambda v, arg: any(_equals(v, t) for t in arg),
+    "$nin": lambda v, arg: not any(_equals(v, t) for t in arg),
+    "$ne": lambda v, arg: not _equals(v, arg),
+    "$gt": lambda v, arg: _compare(v, arg, lambda a, b: a > b),
+    "$gte": lambda v, arg: _compare(v, arg, lambda a, b: a >= b),
+    "$lt": lambda v, arg: _compare(v, arg, lambda a, b: a < b),
+    "$lte": lambda v, arg: _compare(v, arg, lambda a, b: a <= b),
+    "$exists": lambda v, arg: (v is not _MISSING) == bool(arg),
+}
+
+
+def _is_operator_dict(cond):
+    return isinstance(cond, dict) and cond and all(k.startswith('$') for k in cond)
+
+
+def matches(doc, query):
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif _is_operator_dict(cond):
+            value = _values(doc, key)
+            for op, arg in cond.items():
+                if op not in _OPERATORS:
+                    raise NotImplementedError(f"Memory backend does not support {op}")
+                if not _OPERATORS[op](value, arg):
+                    return False
+        elif not _equals(_values(doc, key), cond):
+            return False
+    return True
+
+
+def apply_update(doc, update, inserting=False):
+    for op, fields in update.items():
+        if op == "$set":
+            doc.update(fields)
+        elif op == "$setOnInsert":
+            if inserting:
+                doc.update(fields)
+        elif op == "$inc":
+            for field, amount in fields.items():
+                doc[field] = doc.get(field, 0) + amount
+        elif op == "$unset":
+            for field in fields:
+                doc.pop(field, None)
+        elif op == "$push":
+            for field, value in fields.items():
+                doc.setdefault(field, []).append(value)
+        else:
+            raise NotImplementedError(f"Memory backend does not support {op}")
+    return doc
+
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    return {k: doc[k] for k in projection if k in doc}
+
+
+def _sort_docs(docs, sort):
+    for field, direction in reversed(sort or []):
+        present = [d for d in docs if d.get(field) is not None]
+        absent = [d for d in docs if d.get(field) is None]
+        present.sort(key=lambda d: d[field], reverse=direction < 0)
+        # Mongo orders missing/null values before everything else ascending.
+        docs = absent + present if direction > 0 else present + absent
+    return docs
+
+
+# ==================== TEXT SEARCH (memory backend) ====================
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = {"a", "an", "and", "the", "of", "in", "on", "for", "to", "with", "at", "by", "is", "are"}
+
+
+def _stem(word):
+    return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+
+
+def tokenize(text):
+    if isinstance(text, list):
+        text = " ".join(str(t) for t in text)
+    return [_stem(w) for w in _WORD.findall(str(text or "").lower()) if w not in _STOP_WORDS]
+
+
+def parse_text_query(q):
+    phrases = [p.lower() for p in re.findall(r'"([^"]+)"', q)]
+    rest = re.sub(r'"[^"]*"', " ", q)
+    negated = {_stem(w) for w in re.findall(r"(?:^|\s)-([a-z0-9]+)", rest.lower())}
+    rest = re.sub(r"(?:^|\s)-[a-z0-9]+", " ", rest.lower())
+    terms = set(tokenize(rest)) | {t for p in phrases for t in tokenize(p)}
+    return terms, phrases, negated
+
+
+# ==================== BACKENDS ====================
+
+class MotorCollection:
+    def __init__(self, collection, transactions=True):
+        self.collection = collection
+        self.name = collection.name
+        # Multi-document writes use a transaction while this is set
+        self.transactions = transactions
+
+    @staticmethod
+    def _projection(projection):
+        if projection is None:
+            return {"_id": 0}
+        return {"_id": 0, **{field: 1 for field in projection}}
+
+    async def create_index(self, keys, **options):
+        try:
+            await self.collection.create_index(keys, **options)
+        except OperationFailure as e:
+            # IndexOptionsConflict: a TTL changed since the index was built
+            if e.code != 85 or "expireAfterSeconds" not in options:
+                raise
+            await self.collection.database.command(
+                "collMod", self.name,
+                index={"keyPattern": dict(keys), "expireAfterSeconds": options["expireAfterSeconds"]},
+            )
+
+    async def find_one(self, query, projection=None):
+        return await self.collection.find_one(query, self._projection(projection))
+
+    async def find(self, query, sort=None, skip=0, limit=None, projection=None):
+        cursor = self.collection.find(query, self._projection(projection))
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(limit)
+
+    async def count(self, query):
+        if not query:
+            return await self.collection.estimated_document_count()
+        return await self.collection.count_documents(query)
+
+    async def distinct(self, field, query=None):
+        return await self.collection.distinct(field, query or {})
+
+    async def count_by(self, field, query):
+        pipeline = [{"$match": query}, {"$group": {"_id": "$" + field, "n": {"$sum": 1}}}]
+        return {doc["_id"]: doc["n"] async for doc in self.collection.aggregate(pipeline)}
+
+    async def duplicate_groups(self, fields):
+        pipeline = [
+            {"$group": {"_id": {field: "$" + field for field in fields}, "ids": {"$push": "$id"}, "n": {"$sum": 1}}},
+            {"$match": {"n": {"$gt": 1}}},
+        ]
+        return [doc["ids"] async for doc in self.collection.aggregate(pipeline, allowDiskUse=True)]
+
+    async def lowest_ratio(self, query, numerator, denominator, limit, projection=None):
+        ratio = {"$cond": [
+            {"$gt": ["$" + denominator, 0]}, {"$divide": ["$" + numerator, "$" + denominator]}, 1,
+        ]}
+        # $sort followed by $limit keeps only the top ``limit`` in memory
+        pipeline = [
+            {"$match": query},
+            {"$addFields": {"_ratio": ratio}},
+            {"$sort": {"_ratio": 1, "id": 1}},
+            {"$limit": limit},
+            {"$project": self._projection(projection) if projection else {"_id": 0, "_ratio": 0}},
+        ]
+        return [doc async for doc in self.collection.aggregate(pipeline)]
+
+    async def insert_one(self, doc):
+        await self.collection.insert_one(doc)
+        doc.pop("_id", None)
+
+    async def insert_many(self, docs):
+        if docs:
+            await self.collection.insert_many(docs, ordered=False)
+            for doc in docs:
+                doc.pop("_id", None)
+
+    async def update_one(self, query, update, upsert=False):
+        result = await self.collection.update_one(query, update, upsert=upsert)
+        return result.matched_count > 0
+
+    async def update_many(self, query, update):
+        result = await self.collection.update_many(query, update)
+        return result.modified_count
+
+    async def bulk_write(self, operations):
+        """Apply ``(kind, filter, update)`` operations in one unordered
+        round-trip and return the number of documents modified."""
+        if not operations:
+            return 0
+        requests = [_BULK_OPERATIONS[kind](query, update) for kind, query, update in operations]
+        result = await self.collection.bulk_write(requests, ordered=False)
+        return result.modified_count
+
+    async def find_one_and_update(self, query, update, sort=None, upsert=False, projection=None):
+        return await self.collection.find_one_and_update(
+            query, update, projection=self._projection(projection), sort=sort,
+            upsert=upsert, return_document=ReturnDocument.AFTER,
+        )
+
+    async def delete_one(self, query):
+        result = await self.collection.delete_one(query)
+        return result.deleted_count > 0
+
+    async def delete_many(self, query):
+        result = await self.collection.delete_many(query)
+        return result.deleted_count
+
+    async def text_search(self, q, weights, limit, projection):
+        projection = self._projection(projection)
+        projection["score"] = {"$meta": "textScore"}
+        cursor = self.collection.find({"$text": {"$search": q}}, projection)
+        cursor = cursor.sort([("score", {"$meta": "textScore"})]).limit(limit)
+        return await cursor.to_list(limit)
+
+    async def text_count(self, q, weights):
+        return await self.collection.count_documents({"$text": {"$search": q}})
+
+    async def facet_counts(self, base, facets, selection):
+        return await facet_counts(self.collection, base, facets, selection)
+
+    def group_rollups(self, kind):
+        return analytics.aggregate_rollups(self.collection, kind)
+
+    async def _insert_together(self, doc, other, other_docs, session=None):
+        await self.collection.insert_one(doc, session=session)
+        await other.collection.insert_many(other_docs, session=session)
+
+    async def insert_with(self, doc, other, other_docs):
+        """Insert ``doc`` here and ``other_docs`` into ``other`` in one
+        transaction, or one after the other on deployments without
+        transactions (standalone servers) or with ``transactions`` off."""
+        if self.transactions:
+            try:
+                async with await self.collection.database.client.start_session() as session:
+                    await session.with_transaction(
+                        lambda session: self._insert_together(doc, other, other_docs, session)
+                    )
+            except OperationFailure as e:
+                # IllegalOperation: transactions need a replica set or mongos
+                if e.code != 20:
+                    raise
+                self.transactions = False
+            else:
+                return self._strip_ids(doc, other_docs)
+        await self._insert_together(doc, other, other_docs)
+        self._strip_ids(doc, other_docs)
+
+    @staticmethod
+    def _strip_ids(doc, other_docs):
+        for inserted in (doc, *other_docs):
+            inserted.pop("_id", None)
+
+
+class MemoryCollection:
+    """In-process collection with hash indexes on every declared index field
+    (array fields are indexed per element, like a multikey index)."""
+
+    def __init__(self, name):
+        self.name = name
+        self._docs = {}
+        self._keys = itertools.count()
+        self._indexes = {}      # field -> value -> {key}
+        self._unindexed = {}    # field -> {key} whose value is unhashable
+        self._unique = []       # [(fields, {values: key})]
+        self._text_weights = None
+        self._postings = {}     # term -> {key: weighted term frequency}
+
+    # ---------- indexes ----------
+
+    async def create_index(self, keys, unique=False, **options):
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        fields = tuple(field for field, direction in keys if direction != "text")
+        if not fields:
+            return
+        if fields[0] not in self._indexes:
+            self._indexes[fields[0]] = {}
+            self._unindexed[fields[0]] = set()
+            for key, doc in self._docs.items():
+                self._index_field(fields[0], key, doc)
+        if unique and all(fields != existing for existing, _ in self._unique):
+            seen = {}
+            for key, doc in self._docs.items():
+                values = tuple(doc.get(f) for f in fields)
+                if values in seen:
+                    raise DuplicateKeyError(f"E11000 duplicate key on {self.name} {fields}")
+                seen[values] = key
+            self._unique.append((fields, seen))
+
+    def _index_field(self, field, key, doc):
+        value = doc.get(field)
+        for item in (value if isinstance(value, list) else [value]):
+            try:
+                self._indexes[field].setdefault(item, set()).add(key)
+            except TypeError:
+                self._unindexed[field].add(key)
+
+    def _unindex_field(self, field, key, doc):
+        value = doc.get(field)
+        for item in (value if isinstance(value, list) else [value]):
+            try:
+                bucket = self._indexes[field].get(item)
+            except TypeError:
+                continue
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._indexes[field][item]
+        self._unindexed[field].discard(key)
+
+    def _check_unique(self, doc, key=None):
+        for fields, seen in self._unique:
+            owner = seen.get(tuple(doc.get(f) for f in fields))
+            if owner is not None and owner != key:
+                raise DuplicateKeyError(f"E11000 duplicate key on {self.name} {fields}")
+
+    def _add(self, doc):
+        self._check_unique(doc)
+        key = next(self._keys)
+        self._docs[key] = doc
+        for field in self._indexes:
+            self._index_field(field, key, doc)
+        for fields, seen in self._unique:
+            seen[tuple(doc.get(f) for f in fields)] = key
+        self._post(key, doc)
+        return key
+
+    def _remove(self, key):
+        doc = self._docs.pop(key)
+        for field in self._indexes:
+            self._unindex_field(field, key, doc)
+        for fields, seen in self._unique:
+            seen.pop(tuple(doc.get(f) for f in fields), None)
+        self._unpost(key, doc)
+
+    def _replace(self, key, new_doc):
+        old_doc = self._docs[key]
+        self._check_unique(new_doc, key)
+        for field in self._indexes:
+            self._unindex_field(field, key, old_doc)
+            self._index_field(field, key, new_doc)
+        for fields, seen in self._unique:
+            seen.pop(tuple(old_doc.get(f) for f in fields), None)
+            seen[tuple(new_doc.get(f) for f in fields)] = key
+        self._unpost(key, old_doc)
+        self._docs[key] = new_doc
+        self._post(key, new_doc)
+
+    def _index_buckets(self, query):
+        """Yield ``(size, buckets)`` for every equality or ``$in`` clause at the
+        top level of ``query`` (or inside its ``$and``) that can use an index;
+        the clause matches the union of its buckets."""
+        for field, cond in query.items():
+            if field == "$and":
+                for clause in cond:
+                    yield from self._index_buckets(clause)
+                continue
+            if field not in self._indexes:
+                continue
+            if _is_operator_dict(cond):
+                if set(cond) != {"$in"}:
+                    continue
+                targets = cond["$in"]
+            elif isinstance(cond, (dict, list)):
+                continue
+            else:
+                targets = [cond]
+            try:
+                buckets = [self._indexes[field].get(t, ()) for t in targets]
+            except TypeError:
+                continue
+            buckets.append(self._unindexed[field])
+            yield sum(len(b) for b in buckets), buckets
+
+    def _index_lookup(self, query):
+        """Keys selected by the most selective indexable clause of ``query``,
+        or None if no clause can use an index. Sizes are compared before any
+        bucket is copied, so a broad clause costs nothing next to a narrow one."""
+        best = min(self._index_buckets(query), key=lambda candidate: candidate[0], default=None)
+        if best is None:
+            return None
+        return set().union(*best[1])
+
+    def _candidates(self, query):
+        keys = self._index_lookup(query)
+        return self._docs.keys() if keys is None else sorted(keys)
+
+    def _matching(self, query):
+        for key in list(self._candidates(query)):
+            doc = self._docs.get(key)
+            if doc is not None and matches(doc, query):
+                yield key, doc
+
+    # ---------- reads ----------
+
+    async def find_one(self, query, projection=None):
+        for _, doc in self._matching(query):
+            return _project(doc, projection)
+        return None
+
+    async def find(self, query, sort=None, skip=0, limit=None, projection=None):
+        docs = [doc for _, doc in self._matching(query)]
+        if sort:
+            docs = _sort_docs(docs, sort)
+        docs = docs[skip:skip + limit] if limit else docs[skip:]
+        return [_project(doc, projection) for doc in docs]
+
+    async def count(self, query):
+        if not query:
+            return len(self._docs)
+        return sum(1 for _ in self._matching(query))
+
+    async def count_by(self, field, query):
+        return dict(Counter(doc.get(field) for _, doc in self._matching(query)))
+
+    async def duplicate_groups(self, fields):
+        groups = {}
+        for doc in self._docs.values():
+            groups.setdefault(tuple(doc.get(field) for field in fields), []).append(doc["id"])
+        return [ids for ids in groups.values() if len(ids) > 1]
+
+    async def lowest_ratio(self, query, numerator, denominator, limit, projection=None):
+        def key(doc):
+            ratio = doc[numerator] / doc[denominator] if doc.get(denominator, 0) > 0 else 1
+            return ratio, doc["id"]
+        docs = heapq.nsmallest(limit, (doc for _, doc in self._matching(query)), key=key)
+        return [_project(doc, projection) for doc in docs]
+
+    async def distinct(self, field, query=None):
+        values = []
+        for _, doc in self._matching(query or {}):
+            value = doc.get(field)
+            for item in (value if isinstance(value, list) else [value]):
+                if item not in values:
+                    values.append(item)
+        return values
+
+    # ---------- writes ----------
+
+    async def insert_one(self, doc):
+        self._add(dict(doc))
+
+    async def insert_many(self, docs):
+        for doc in docs:
+            self._add(dict(doc))
+
+    async def insert_with(self, doc, other, other_docs):
+        # No await in between, so no other task sees one without the other
+        self._add(dict(doc))
+        for other_doc in other_docs:
+            other._add(dict(other_doc))
+
+    async def update_one(self, query, update, upsert=False):
+        for key, doc in self._matching(query):
+            self._replace(key, apply_update(dict(doc), update))
+            return True
+        if upsert:
+            seed = {k: v for k, v in query.items() if not k.startswith('$') and not _is_operator_dict(v)}
+            self._add(apply_update(seed, update, inserting=True))
+        return False
+
+    async def update_many(self, query, update):
+        modified = 0
+        for key, doc in list(self._matching(query)):
+            updated = apply_update(dict(doc), update)
+            if updated != doc:
+                self._replace(key, updated)
+                modified += 1
+        return modified
+
+    async def bulk_write(self, operations):
+        modified = 0
+        for kind, query, update in operations:
+            if kind not in _BULK_OPERATIONS:
+                raise NotImplementedError(f"Memory backend does not support {kind}")
+            matched = False
+            for key, doc in list(self._matching(query)):
+                matched = True
+                updated = apply_update(dict(doc), update)
+                if updated != doc:
+                    self._replace(key, updated)
+                    modified += 1
+                if kind != "update_many":
+                    break
+            if kind == "upsert_one" and not matched:
+                seed = {k: v for k, v in query.items() if not k.startswith('$') and not _is_operator_dict(v)}
+                self._add(apply_update(seed, update, inserting=True))
+        return modified
+
+    async def find_one_and_update(self, query, update, sort=None, upsert=False, projection=None):
+        found = list(self._matching(query))
+        if sort:
+            order = {id(doc): key for key, doc in found}
+            found = [(order[id(doc)], doc) for doc in _sort_docs([doc for _, doc in found], sort)]
+        if found:
+            key, doc = found[0]
+            updated = apply_update(dict(doc), update)
+            self._replace(key, updated)
+            return _project(updated, projection)
+        if upsert:
+            seed = {k: v for k, v in query.items() if not k.startswith('$') and not _is_operator_dict(v)}
+            doc = apply_update(seed, update, inserting=True)
+            self._add(doc)
+            return _project(doc, projection)
+        return None
+
+    async def delete_one(self, query):
+        for key, _ in self._matching(query):
+            self._remove(key)
+            return True
+        return False
+
+    async def delete_many(self, query):
+        keys = [key for key, _ in self._matching(query)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    # ---------- search & facets ----------
+
+    def _post(self, key, doc):
+        if self._text_weights is None:
+            return
+        for field, weight in self._text_weights.items():
+            for term, n in Counter(tokenize(doc.get(field))).items():
+                postings = self._postings.setdefault(term, {})
+                postings[key] = postings.get(key, 0) + weight * n
+
+    def _unpost(self, key, doc):
+        if self._text_weights is None:
+            return
+        for term in {t for field in self._text_weights for t in tokenize(doc.get(field))}:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _text_matches(self, q, weights):
+        if self._text_weights != weights:
+            # Build the inverted index on first use; writes keep it current.
+            self._text_weights = dict(weights)
+            self._postings = {}
+            for key, doc in self._docs.items():
+                self._post(key, doc)
+
+        terms, phrases, negated = parse_text_query(q)
+        scores = {}
+        for term in terms:
+            for key, score in self._postings.get(term, {}).items():
+                scores[key] = scores.get(key, 0) + score
+        excluded = set().union(*(self._postings.get(t, {}).keys() for t in negated)) if negated else set()
+
+        for key, score in scores.items():
+            if key in excluded:
+                continue
+            doc = self._docs[key]
+            if phrases:
+                text = " ".join(str(doc.get(f) or "") for f in weights).lower()
+                if not all(p in text for p in phrases):
+                    continue
+            yield doc, float(score)
+
+    async def text_search(self, q, weights, limit, projection):
+        ranked = sorted(self._text_matches(q, weights), key=lambda hit: -hit[1])[:limit]
+        return [{**_project(doc, projection), "score": score} for doc, score in ranked]
+
+    async def text_count(self, q, weights):
+        return sum(1 for _ in self._text_matches(q, weights))
+
+    async def facet_counts(self, base, facets, selection):
+        docs = [doc for _, doc in self._matching(base)]
+        return facet_counts_from_docs(docs, facets, selection, matches)
+
+    def group_rollups(self, kind):
+        return analytics.rollups_from_docs(list(self._docs.values()), kind)
+
+
+# ==================== REPOSITORIES ====================
+
+class Repository:
+    collection_name = None
+    date_fields = ()
+    # Datetimes kept as BSON dates rather than strings; TTL indexes need them
+    native_date_fields = ()
+    indexes = []
+    # {field: weight} for the collection's text index, if searchable
+    text_weights = None
+    search_projection = None
+    # Repository holding this collection's archived documents, if any
+    archive = None
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("id", 1)], unique=True)
+        for spec in self.indexes:
+            spec = dict(spec)
+            await self.collection.create_index(spec.pop("keys"), **spec)
+        if self.text_weights:
+            await self.collection.create_index(
+                [(field, "text") for field in self.text_weights],
+                weights=self.text_weights,
+                name=TEXT_INDEX_NAME,
+                default_language="english",
+            )
+
+    def encode(self, doc):
+        for field in self.native_date_fields:
+            if field in doc:
+                doc[field] = _utc(doc[field])
+        return encode_dates(doc, self.date_fields)
+
+    def decode(self, doc):
+        if doc is None:
+            return None
+        for field in self.native_date_fields:
+            if field in doc:
+                doc[field] = _utc(doc[field])
+        return decode_dates(doc, self.date_fields)
+
+    async def get(self, doc_id, projection=None):
+        return self.decode(await self.collection.find_one({"id": doc_id}, projection))
+
+    async def exists(self, query):
+        return await self.collection.find_one(query, ["id"]) is not None
+
+    async def find(self, query=None, sort=None, skip=0, limit=1000, projection=None):
+        docs = await self.collection.find(query or {}, sort=sort, skip=skip, limit=limit, projection=projection)
+        return [self.decode(doc) for doc in docs]
+
+    async def count(self, query=None):
+        return await self.collection.count(query or {})
+
+    async def distinct(self, field, query=None):
+        return await self.collection.distinct(field, query)
+
+    async def existing_ids(self, ids):
+        docs = await self.collection.find({"id": {"$in": list(ids)}}, projection=["id"])
+        return {doc["id"] for doc in docs}
+
+    async def insert(self, doc):
+        await self.collection.insert_one(self.encode(doc))
+
+    async def insert_many(self, docs):
+        await self.collection.insert_many([self.encode(doc) for doc in docs])
+
+    async def insert_with(self, doc, other, other_docs):
+        """Insert ``doc`` and ``other_docs`` into the ``other`` repository
+        atomically where the backend allows."""
+        await self.collection.insert_with(
+            self.encode(doc), other.collection, [other.encode(other_doc) for other_doc in other_docs],
+        )
+
+    async def bulk_write(self, operations):
+        return await self.collection.bulk_write(operations)
+
+    async def update(self, doc_id, fields):
+        """Apply ``$set`` of ``fields`` and return the updated document, or
+        None if it does not exist."""
+        updated = await self.collection.find_one_and_update({"id": doc_id}, {"$set": self.encode(dict(fields))})
+        return self.decode(updated)
+
+    async def delete(self, doc_id):
+        return await self.collection.delete_one({"id": doc_id})
+
+    async def find_with_archive(self, query=None, sort=None, limit=1000):
+        """Read-through over the live collection and its archive, for
+        historical queries."""
+        live = await self.find(query, sort=sort, limit=limit)
+        if self.archive is None or len(live) >= limit:
+            return live
+        archived = await self.archive.find(query, sort=sort, limit=limit - len(live))
+        docs = live + archived
+        return _sort_docs(docs, sort) if sort else docs
+
+    async def move_batch(self, query, target, batch_size):
+        """Move at most ``batch_size`` documents matching ``query`` into
+        ``target`` and return how many were moved. Only documents confirmed
+        present in ``target`` are deleted here, so a failed or concurrent
+        run never loses data and re-running is safe."""
+        docs = await self.collection.find(query, limit=batch_size)
+        if not docs:
+            return 0
+        ids = [doc["id"] for doc in docs]
+        existing = await target.existing_ids(ids)
+        try:
+            await target.collection.insert_many([doc for doc in docs if doc["id"] not in existing])
+        except (BulkWriteError, DuplicateKeyError):
+            pass  # another worker moved some of them first
+        moved = await target.existing_ids(ids)
+        return await self.collection.delete_many({"id": {"$in": list(moved)}})
+
+    async def delete_batch(self, query, batch_size):
+        """Delete at most ``batch_size`` documents matching ``query`` and
+        return how many were deleted, so large deletions can yield between
+        batches instead of holding one long delete_many."""
+        docs = await self.collection.find(query, limit=batch_size, projection=["id"])
+        if not docs:
+            return 0
+        return await self.collection.delete_many({"id": {"$in": [doc["id"] for doc in docs]}})
+
+    async def normalize_dates(self, batch_size=1000):
+        """Rewrite date strings stored with another offset (or none) as UTC,
+        which the string range queries on them assume, and return how many
+        documents changed. Unparseable values are left alone."""
+        changed = 0
+        query = {}
+        while batch := await self.collection.find(
+            query, sort=[("id", 1)], limit=batch_size, projection=["id", *self.date_fields],
+        ):
+            operations = []
+            for doc in batch:
+                for field in self.date_fields:
+                    stored = doc.get(field)
+                    if not isinstance(stored, str):
+                        continue
+                    try:
+                        utc = encode_dates(decode_dates({field: stored}, (field,)), (field,))[field]
+                    except ValueError:
+                        continue
+                    if utc != stored:
+                        # Guarded on the stored value, so a concurrent update wins
+                        operations.append(("update_one", {"id": doc["id"], field: stored}, {"$set": {field: utc}}))
+            changed += await self.collection.bulk_write(operations)
+            query = {"id": {"$gt": batch[-1]["id"]}}
+        return changed
+
+    async def search(self, q, limit):
+        docs = await self.collection.text_search(q, self.text_weights, limit, self.search_projection)
+        return [self.decode(doc) for doc in docs]
+
+    async def count_matches(self, q):
+        return await self.collection.text_count(q, self.text_weights)
+
+    async def facet_counts(self, base, facets, selection):
+        return await self.collection.facet_counts(base, facets, selection)
+
+
+class UserRepository(Repository):
+    collection_name = "users"
+    date_fields = ("created_at",)
+    indexes = [index("email")]
+
+    async def get_by_email(self, email):
+        return self.decode(await self.collection.find_one({"email": email}))
+
+
+class EventRepository(Repository):
+    collection_name = "events"
+    date_fields = ("start_date", "end_date", "created_at", "archived_at")
+    indexes = [index(f) for f in ("is_featured", "event_type", "city", "country", "start_date", "ticket_price")] + [
+        # Lifecycle transitions select by status and a date range; both also
+        # serve plain ?status= filters.
+        index("status", "start_date"),
+        index("status", "end_date"),
+    ]
+    text_weights = {"title": 10, "event_type": 5, "agenda": 3, "description": 1}
+    search_projection = ["id", "title", "event_type", "start_date", "city", "country", "is_featured"]
+
+    async def adjust_seats(self, event_id, delta):
+        return await self.collection.update_one({"id": event_id}, {"$inc": {"available_seats": delta}})
+
+    async def reserve_seat(self, event_id):
+        """Take one seat if any is left. The check and the decrement are one
+        conditional update, so concurrent registrations cannot oversell."""
+        return await self.collection.update_one(
+            {"id": event_id, "available_seats": {"$gt": 0}}, {"$inc": {"available_seats": -1}},
+        )
+
+    async def advance_lifecycle(self, now):
+        """Move events that have ended to ``completed`` and events that have
+        started to ``ongoing``; return ``(ongoing, completed)`` counts."""
+        now = encode_dates({"now": now}, ("now",))["now"]
+        completed = await self.collection.update_many(
+            {"status": {"$in": ["upcoming", "ongoing"]}, "end_date": {"$lte": now}},
+            {"$set": {"status": "completed"}},
+        )
+        ongoing = await self.collection.update_many(
+            {"status": "upcoming", "start_date": {"$lte": now}},
+            {"$set": {"status": "ongoing"}},
+        )
+        return ongoing, completed
+
+    async def sell_through(self, status, limit, projection=None):
+        """The ``limit`` events of ``status`` with the smallest share of
+        seats left, i.e. the best sold first."""
+        docs = await self.collection.lowest_ratio(
+            {"status": status}, "available_seats", "capacity", limit, projection,
+        )
+        return [self.decode(doc) for doc in docs]
+
+
+class RegistrationRepository(Repository):
+    collection_name = "registrations"
+    date_fields = ("registration_date",)
+    unique_key = ("event_id", "user_id")
+    # Unique: concurrent registrations by one user (say, a burst of admissions
+    # from a waiting room) cannot both get in past the exists() check. Built
+    # last, so the other indexes exist even when it cannot be built.
+    indexes = [index("user_id"), index(*unique_key, unique=True)]
+
+    async def ensure_indexes(self):
+        try:
+            await super().ensure_indexes()
+        except DuplicateKeyError:
+            # Registrations from before the index may repeat a pair; refusing to
+            # start would only put the API in a restart loop
+            logger.error(
+                "%s holds duplicate (event_id, user_id) pairs, so its unique index was not built "
+                "and concurrent duplicate registrations are not prevented; run `python cleanup.py` "
+                "to remove them, then restart", self.collection_name,
+            )
+
+    async def duplicates(self):
+        """Ids of the registrations sharing each repeated (event, user) pair."""
+        return await self.collection.duplicate_groups(self.unique_key)
+
+
+class RegistrationArchiveRepository(RegistrationRepository):
+    """Registrations of completed events, moved out of the live collection."""
+    collection_name = "registrations_archive"
+
+
+class AwardRepository(Repository):
+    collection_name = "awards"
+    date_fields = ("nomination_start", "nomination_end", "created_at", "archived_at")
+    indexes = [index("status", "nomination_end"), index("year")]
+    text_weights = {"title": 10, "category": 5, "description": 1}
+    search_projection = ["id", "title", "category", "year", "status"]
+
+    async def close_nominations(self, now):
+        """Close open awards whose nomination window has ended."""
+        now = encode_dates({"now": now}, ("now",))["now"]
+        return await self.collection.update_many(
+            {"status": "open", "nomination_end": {"$lte": now}},
+            {"$set": {"status": "closed"}},
+        )
+
+
+class NominationRepository(Repository):
+    collection_name = "nominations"
+    date_fields = ("created_at",)
+    indexes = [
+        index("award_id", "is_duplicate", "cluster_id"),
+        index("award_id", "created_at"),
+        index("nominated_by_user_id"),
+        # Duplicate detection: candidate blocks and cluster members
+        index("dedupe_keys", "award_id"),
+        index("cluster_id"),
+    ]
+
+    async def cluster_sizes(self, award_id):
+        """``{cluster_id: duplicates}`` for the award's clusters that have
+        at least one duplicate."""
+        return await self.collection.count_by("cluster_id", {"award_id": award_id, "is_duplicate": True})
+
+
+class NominationArchiveRepository(NominationRepository):
+    """Nominations of announced awards, moved out of the live collection."""
+    collection_name = "nominations_archive"
+
+
+class SpeakerRepository(Repository):
+    collection_name = "speakers"
+    date_fields = ("created_at",)
+    indexes = [index("is_featured"), index("expertise"), index("organization")]
+    text_weights = {"name": 10, "expertise": 5, "title": 3, "organization": 2, "bio": 1}
+    search_projection = ["id", "name", "title", "organization", "expertise", "image_url"]
+
+
+class SessionRepository(Repository):
+    collection_name = "sessions"
+    date_fields = ("start_time", "end_time", "created_at")
+    indexes = [index("event_id", "start_time")]
+    text_weights = {"title": 10, "session_type": 3, "description": 1}
+    search_projection = ["id", "event_id", "title", "session_type", "start_time", "room"]
+
+
+class InquiryRepository(Repository):
+    collection_name = "inquiries"
+    date_fields = ("created_at",)
+    native_date_fields = ("resolved_at",)
+
+    def __init__(self, collection, retention_days=None):
+        super().__init__(collection)
+        self.indexes = [index("created_at")]
+        if retention_days:
+            # MongoDB's TTL monitor deletes resolved inquiries retention_days
+            # after resolution; open ones have no resolved_at and never expire.
+            self.indexes.append(index(
+                "resolved_at",
+                expireAfterSeconds=int(retention_days * 86400),
+                partialFilterExpression={"status": "resolved"},
+            ))
+
+    @staticmethod
+    def status_update(status, now):
+        """Stamp ``resolved_at`` on resolution (which starts the TTL clock)
+        and clear it on reopening."""
+        if status == "resolved":
+            return {"$set": {"status": status, "resolved_at": _utc(now)}}
+        return {"$set": {"status": status}, "$unset": {"resolved_at": ""}}
+
+    async def set_status(self, inquiry_id, status, now):
+        update = self.status_update(status, now)
+        return self.decode(await self.collection.find_one_and_update({"id": inquiry_id}, update))
+
+
+class IdempotencyRepository(Repository):
+    """First responses to POSTs carrying an ``Idempotency-Key``, one document
+    per (user, key). The unique index doubles as the lock: whoever inserts
+    the key executes the request."""
+    collection_name = "idempotency_keys"
+    native_date_fields = ("created_at", "locked_at")
+
+    def __init__(self, collection, ttl_hours=24):
+        super().__init__(collection)
+        self.indexes = [
+            index("user_id", "key", unique=True),
+            index("created_at", expireAfterSeconds=int(ttl_hours * 3600)),
+        ]
+
+    async def claim(self, user_id, key, route, fingerprint, now):
+        """Insert an in-progress record; False if the key already exists."""
+        try:
+            await self.insert({
+                "id": str(uuid.uuid4()), "user_id": user_id, "key": key, "route": route,
+                "fingerprint": fingerprint, "state": "in_progress", "created_at": now, "locked_at": now,
+            })
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def lookup(self, user_id, key):
+        return self.decode(await self.collection.find_one({"user_id": user_id, "key": key}))
+
+    async def take_over(self, user_id, key, stale_before, now):
+        """Claim an in-progress record locked before ``stale_before``, whose
+        owner has presumably died mid-request."""
+        return await self.collection.update_one(
+            {"user_id": user_id, "key": key, "state": "in_progress", "locked_at": {"$lt": _utc(stale_before)}},
+            {"$set": {"locked_at": _utc(now)}},
+        )
+
+    async def complete(self, user_id, key, status_code, body):
+        await self.collection.update_one(
+            {"user_id": user_id, "key": key},
+            {"$set": {"state": "completed", "status_code": status_code, "body": body}},
+        )
+
+    async def release(self, user_id, key):
+        await self.collection.delete_one({"user_id": user_id, "key": key, "state": "in_progress"})
+
+
+class RegistrationRollupRepository(Repository):
+    """Registration counts and booked revenue per day, event, ticket type and
+    event-day, incremented on every registration (see ``analytics``)."""
+    collection_name = "registration_rollups"
+    indexes = [index("kind", "day"), index("kind", "event_id", "day"), index("kind", "revenue")]
+
+    async def record(self, registration):
+        """Add one registration to each of its rollups in one round-trip."""
+        await self.collection.bulk_write([
+            ("upsert_one", {"id": rollup_id}, {
+                "$setOnInsert": {"kind": kind, **keys},
+                "$inc": {"registrations": count, "revenue": revenue},
+            })
+            for rollup_id, kind, keys, count, revenue in analytics.increments(registration)
+        ])
+
+    async def daily(self, start, end, event_id=None):
+        """Rollups for each day in ``[start, end]`` (ISO dates) that had
+        registrations, overall or for one event."""
+        query = {"kind": "event_day", "event_id": event_id} if event_id else {"kind": "day"}
+        query["day"] = {"$gte": start, "$lte": end}
+        return await self.find(query, sort=[("day", 1)], limit=None)
+
+    async def top(self, kind, limit):
+        return await self.find({"kind": kind}, sort=[("revenue", -1)], limit=limit)
+
+    async def rebuild(self, sources, batch_size=1000):
+        """Recompute every rollup from the registration repositories in
+        ``sources`` (live and archive) and return how many were written.
+        Rollups nothing contributes to any more are deleted. Registrations
+        made while a rebuild runs may be counted once too few or too many
+        until the next rebuild, so run it off-peak."""
+        generation = str(uuid.uuid4())
+        written = 0
+        for kind, fields in analytics.ROLLUP_KINDS.items():
+            totals = {}
+            for source in sources:
+                async for row in source.collection.group_rollups(kind):
+                    keys = {field: row[field] for field in fields}
+                    rollup = totals.setdefault(
+                        analytics.rollup_id(kind, keys), {"kind": kind, **keys, "registrations": 0, "revenue": 0},
+                    )
+                    rollup["registrations"] += row["registrations"]
+                    rollup["revenue"] += row["revenue"]
+            operations = [
+                ("upsert_one", {"id": rollup_id}, {"$set": {**rollup, "generation": generation}})
+                for rollup_id, rollup in totals.items()
+            ]
+            for start in range(0, len(operations), batch_size):
+                await self.collection.bulk_write(operations[start:start + batch_size])
+            written += len(operations)
+        await self.collection.delete_many({"generation": {"$ne": generation}})
+        return written
+
+
+class OutboxRepository(Repository):
+    """Messages written together with the document that caused them and
+    delivered by ``outbox.OutboxWorker``."""
+    collection_name = "outbox"
+    native_date_fields = ("created_at", "available_at", "locked_at", "finished_at")
+
+    def __init__(self, collection, retention_hours=72):
+        super().__init__(collection)
+        self.indexes = [
+            index("state", "available_at"),
+            index("state", "locked_at"),
+            index(
+                "finished_at", expireAfterSeconds=int(retention_hours * 3600),
+                partialFilterExpression={"state": "sent"},
+            ),
+        ]
+
+    async def claim(self, now, lock_timeout):
+        """Lock the oldest due message, or one whose worker died, and count
+        the attempt."""
+        now = _utc(now)
+        update = {"$set": {"state": "processing", "locked_at": now}, "$inc": {"attempts": 1}}
+        message = await self.collection.find_one_and_update(
+            {"state": "pending", "available_at": {"$lte": now}}, update, sort=[("available_at", 1)],
+        )
+        if message is None:
+            message = await self.collection.find_one_and_update(
+                {"state": "processing", "locked_at": {"$lt": now - lock_timeout}}, update,
+            )
+        return self.decode(message)
+
+    async def _release(self, message, fields, unset=None):
+        # Guarded by our lock, so a worker whose lock went stale cannot
+        # overwrite the outcome of the worker that reclaimed the message
+        update = {"$set": fields}
+        if unset:
+            update["$unset"] = dict.fromkeys(unset, "")
+        return await self.collection.update_one(
+            {"id": message["id"], "state": "processing", "locked_at": _utc(message["locked_at"])}, update,
+        )
+
+    async def finish(self, message, state, error=None):
+        fields = {"state": state, "finished_at": datetime.now(timezone.utc)}
+        if error:
+            fields["last_error"] = error
+        return await self._release(message, fields, unset=["locked_at"])
+
+    async def retry_later(self, message, available_at, error):
+        return await self._release(
+            message, {"state": "pending", "available_at": _utc(available_at), "last_error": error}, unset=["locked_at"],
+        )
+
+    async def requeue(self, message_id, now):
+        """Give a dead message a fresh set of attempts."""
+        return self.decode(await self.collection.find_one_and_update(
+            {"id": message_id, "state": "dead"},
+            {"$set": {"state": "pending", "available_at": _utc(now), "attempts": 0}, "$unset": {"finished_at": ""}},
+        ))
+
+    async def state_counts(self):
+        return await self.collection.count_by("state", {})
+
+
+class WaitingRoomRepository(Repository):
+    """One document per event with a waiting room (``id`` is the event id):
+    the position counter and the admission anchor (see ``waiting_room``)."""
+    collection_name = "waiting_rooms"
+    native_date_fields = ("anchor_at", "updated_at")
+
+    async def save(self, event_id, fields):
+        await self.collection.update_one(
+            {"id": event_id}, {"$set": self.encode(dict(fields)), "$setOnInsert": {"issued": 0}}, upsert=True,
+        )
+        return await self.get(event_id)
+
+    async def next_position(self, event_id):
+        """Issue the next queue position; returns the room with ``issued``
+        equal to that position."""
+        return self.decode(await self.collection.find_one_and_update({"id": event_id}, {"$inc": {"issued": 1}}))
+
+    async def reanchor(self, room, position, now):
+        """Admit from ``position`` at ``now``. Of concurrent joins that all
+        found the queue empty, the lowest position wins."""
+        epoch = room.get("anchor_epoch", 0)
+        if await self.collection.update_one(
+            {"id": room["id"], "anchor_epoch": epoch},
+            {"$set": {"anchor_epoch": epoch + 1, "anchor_at": _utc(now), "anchor_admitted": position}},
+        ):
+            return
+        await self.collection.update_one(
+            {"id": room["id"], "anchor_epoch": epoch + 1, "anchor_admitted": {"$gt": position}},
+            {"$set": {"anchor_admitted": position}},
+        )
+
+
+class WaitingRoomEntryRepository(Repository):
+    collection_name = "waiting_room_entries"
+    native_date_fields = ("joined_at",)
+    indexes = [index("event_id", "user_id", unique=True)]
+
+    async def lookup(self, event_id, user_id):
+        return self.decode(await self.collection.find_one({"event_id": event_id, "user_id": user_id}))
+
+
+REPOSITORY_CLASSES = [
+    UserRepository, EventRepository, RegistrationRepository, AwardRepository,
+    NominationRepository, SpeakerRepository, SessionRepository, InquiryRepository,
+    RegistrationArchiveRepository, NominationArchiveRepository, IdempotencyRepository,
+    RegistrationRollupRepository, OutboxRepository, WaitingRoomRepository, WaitingRoomEntryRepository,
+]
+
+DEFAULT_INQUIRY_RETENTION_DAYS = 180
+DEFAULT_IDEMPOTENCY_TTL_HOURS = 24
+DEFAULT_OUTBOX_RETENTION_HOURS = 72
+
+
+class Repositories:
+    """One repository per collection, built over a backend factory that maps
+    a collection name to a MotorCollection or MemoryCollection."""
+
+    def __init__(self, collection_factory, inquiry_retention_days=DEFAULT_INQUIRY_RETENTION_DAYS,
+                 idempotency_ttl_hours=DEFAULT_IDEMPOTENCY_TTL_HOURS,
+                 outbox_retention_hours=DEFAULT_OUTBOX_RETENTION_HOURS):
+        self.users = UserRepository(collection_factory("users"))
+        self.events = EventRepository(collection_factory("events"))
+        self.registrations = RegistrationRepository(collection_factory("registrations"))
+        self.awards = AwardRepository(collection_factory("awards"))
+        self.nominations = NominationRepository(collection_factory("nominations"))
+        self.speakers = SpeakerRepository(collection_factory("speakers"))
+        self.sessions = SessionRepository(collection_factory("sessions"))
+        self.inquiries = InquiryRepository(collection_factory("inquiries"), inquiry_retention_days)
+        self.registrations_archive = RegistrationArchiveRepository(collection_factory("registrations_archive"))
+        self.nominations_archive = NominationArchiveRepository(collection_factory("nominations_archive"))
+        self.registrations.archive = self.registrations_archive
+        self.nominations.archive = self.nominations_archive
+        self.idempotency = IdempotencyRepository(collection_factory("idempotency_keys"), idempotency_ttl_hours)
+        self.registration_rollups = RegistrationRollupRepository(collection_factory("registration_rollups"))
+        self.outbox = OutboxRepository(collection_factory("outbox"), outbox_retention_hours)
+        self.waiting_rooms = WaitingRoomRepository(collection_factory("waiting_rooms"))
+        self.waiting_room_entries = WaitingRoomEntryRepository(collection_factory("waiting_room_entries"))
+
+    def all(self):
+        return [value for value in vars(self).values() if isinstance(value, Repository)]
+
+    def by_collection(self, name):
+        for repo in self.all():
+            if repo.collection_name == name:
+                return repo
+        raise KeyError(name)
+
+    async def ensure_indexes(self):
+        for repo in self.all():
+            await repo.ensure_indexes()
+
+
+def motor_repositories(db, transactions=True, **options):
+    return Repositories(lambda name: MotorCollection(db[name], transactions), **options)
+
+
+def memory_repositories(**options):
+    """In-process repositories. TTL indexes are accepted but documents never
+    expire."""
+    return Repositories(MemoryCollection, **options)
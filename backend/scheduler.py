@@ -0,0 +1,96 @@
+"""
+Background maintenance of event and award lifecycle status.
+
+``Event.status`` and ``Award.status`` are stored fields so that list filters
+and the nomination check stay plain indexed lookups. This scheduler keeps them
+in step with the calendar: every ``interval_seconds`` it moves events to
+``ongoing``/``completed`` and closes awards whose nomination window has ended,
+with one indexed ``update_many`` per transition, and reports which
+collections changed so cached read results can be dropped.
+
+Deadlines are compared as UTC ISO-8601 strings. Documents written before
+dates were normalized (say with a ``-05:00`` offset) would compare wrongly,
+so each scheduler first rewrites any such dates on events and awards to UTC.
+
+Transitions only move forward and are idempotent, so it is safe for every
+API worker to run its own scheduler.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """Runs ``run_once()`` in a background task every ``interval_seconds``,
+    starting immediately. Failures are logged and retried next interval."""
+
+    name = "Periodic job"
+
+    def __init__(self, interval_seconds):
+        self.interval_seconds = interval_seconds
+        self._task = None
+
+    async def run_once(self):
+        raise NotImplementedError
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("%s failed; retrying in %ss", self.name, self.interval_seconds)
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class LifecycleScheduler(PeriodicJob):
+    name = "Lifecycle update"
+
+    def __init__(self, repos, interval_seconds=60.0, on_change=None):
+        super().__init__(interval_seconds)
+        self.repos = repos
+        # Called with the names of the collections that were modified
+        self.on_change = on_change
+        self._dates_normalized = False
+
+    async def normalize_dates(self):
+        for repo in (self.repos.events, self.repos.awards):
+            changed = await repo.normalize_dates()
+            if changed:
+                logger.info("Rewrote dates of %d %s as UTC", changed, repo.collection_name)
+        self._dates_normalized = True
+
+    async def run_once(self, now=None):
+        now = now or datetime.now(timezone.utc)
+        if not self._dates_normalized:
+            await self.normalize_dates()
+        ongoing, completed = await self.repos.events.advance_lifecycle(now)
+        closed = await self.repos.awards.close_nominations(now)
+
+        changed = []
+        if ongoing or completed:
+            changed.append(self.repos.events.collection_name)
+        if closed:
+            changed.append(self.repos.awards.collection_name)
+        if changed:
+            logger.info(
+                "Lifecycle: %d event(s) ongoing, %d completed, %d award(s) closed",
+                ongoing, completed, closed,
+            )
+            if self.on_change:
+                self.on_change(changed)
+        return {"events_ongoing": ongoing, "events_completed": completed, "awards_closed": closed}
@@ -0,0 +1,53 @@
+"""
+Full-text search across the public catalog collections.
+
+Each searchable repository declares a weighted text index (see
+``Repository.text_weights``); a search queries the requested collections
+concurrently, merges the per-collection rankings by text score and returns
+one projected, paginated page of hits.
+"""
+import asyncio
+import heapq
+
+# collection -> (hit type, field used as the hit title)
+SEARCHABLE = {
+    "events": ("event", "title"),
+    "speakers": ("speaker", "name"),
+    "sessions": ("session", "title"),
+    "awards": ("award", "title"),
+}
+
+SEARCH_TYPES = list(SEARCHABLE)
+
+
+async def _search_collection(repo, q, limit):
+    hit_type, title_field = SEARCHABLE[repo.collection_name]
+    hits = []
+    for doc in await repo.search(q, limit):
+        score = doc.pop("score")
+        hits.append({
+            "type": hit_type,
+            "id": doc["id"],
+            "title": doc.get(title_field, ""),
+            "score": score,
+            "data": doc,
+        })
+    return hits
+
+
+async def search_catalog(repos, q, types, skip, limit):
+    """Return ``(hits, counts)`` for one page of ranked results.
+
+    Every collection contributes at most ``skip + limit`` candidates, which is
+    all the merge can ever need for the requested page.
+    """
+    window = skip + limit
+    targets = [repos.by_collection(collection) for collection in types]
+    searches = [_search_collection(repo, q, window) for repo in targets]
+    counts = [repo.count_matches(q) for repo in targets]
+    results = await asyncio.gather(*searches, *counts)
+
+    rankings, totals = results[:len(types)], results[len(types):]
+    merged = heapq.merge(*rankings, key=lambda hit: -hit["score"])
+    hits = [hit for _, hit in zip(range(window), merged)][skip:]
+    return hits, dict(zip(types, totals))
@@ -1,191 +1,536 @@
 """
-Seed script to populate the TCPWorld database with sample data
+Synthetic data generator for the TCPWorld database.
+
+Produces deterministic, referentially consistent data at any scale (events,
+users, registrations, speakers, sessions, awards and nominations) and streams
+it into MongoDB through concurrent insert_many batches with a bounded number
+of writes in flight.
+
+Examples:
+    python seed_data.py                                   # small demo dataset
+    python seed_data.py --events 10000 --users 2000000 --registrations 20000000
+    python seed_data.py --only users --users 50000        # bulk-create users only
 """
+import argparse
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
+import hashlib
+import itertools
 import os
-from dotenv import load_dotenv
-from pathlib import Path
+import random
+import time
 import uuid
 from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from passlib.context import CryptContext
+
+from dedupe import ClusterIndex
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-async def seed_database():
-    mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[os.environ['DB_NAME']]
-    
-    print("🌱 Seeding TCPWorld database...")
-    
-    # Sample Events
-    events = [
-        {
-            "id": str(uuid.uuid4()),
-            "title": "CyberSecurity Summit 2025",
-            "description": "Join the world's leading cybersecurity experts for three days of intensive learning, networking, and innovation. Explore the latest trends in threat intelligence, zero-trust architecture, and AI-powered security solutions.",
-            "event_type": "conference",
-            "start_date": (datetime.now(timezone.utc) + timedelta(days=30)).isoformat(),
-            "end_date": (datetime.now(timezone.utc) + timedelta(days=32)).isoformat(),
-            "venue": "San Francisco Convention Center",
-            "city": "San Francisco",
-            "country": "USA",
-            "capacity": 500,
-            "available_seats": 500,
-            "ticket_price": 999.0,
-            "image_url": "https://images.pexels.com/photos/35335992/pexels-photo-35335992.jpeg",
-            "agenda": "Day 1: Keynote & Threat Intelligence\nDay 2: Zero-Trust & Cloud Security\nDay 3: AI/ML in Cybersecurity",
-            "is_featured": True,
-            "status": "upcoming",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "title": "AI Innovation Conference",
-            "description": "Discover the future of artificial intelligence with thought leaders from top tech companies. Learn about GPT-5, autonomous systems, and ethical AI development.",
-            "event_type": "conference",
-            "start_date": (datetime.now(timezone.utc) + timedelta(days=60)).isoformat(),
-            "end_date": (datetime.now(timezone.utc) + timedelta(days=61)).isoformat(),
-            "venue": "Tech Hub Center",
-            "city": "Boston",
-            "country": "USA",
-            "capacity": 300,
-            "available_seats": 300,
-            "ticket_price": 1299.0,
-            "image_url": "https://images.pexels.com/photos/35335989/pexels-photo-35335989.jpeg",
-            "agenda": "AI Ethics, Large Language Models, Computer Vision, Autonomous Systems",
-            "is_featured": True,
-            "status": "upcoming",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Cloud Security Workshop",
-            "description": "Hands-on workshop focusing on securing cloud infrastructure across AWS, Azure, and GCP. Learn best practices for IAM, encryption, and compliance.",
-            "event_type": "workshop",
-            "start_date": (datetime.now(timezone.utc) + timedelta(days=45)).isoformat(),
-            "end_date": (datetime.now(timezone.utc) + timedelta(days=45)).isoformat(),
-            "venue": "CloudTech Training Center",
-            "city": "Seattle",
-            "country": "USA",
-            "capacity": 100,
-            "available_seats": 100,
-            "ticket_price": 499.0,
-            "image_url": "https://images.unsplash.com/photo-1762968269894-1d7e1ce8894e",
-            "agenda": "Cloud Security Fundamentals, IAM Best Practices, Encryption Strategies",
-            "is_featured": False,
-            "status": "upcoming",
-            "created_at": datetime.now(timezone.utc).isoformat()
+COLLECTIONS = ["users", "speakers", "events", "sessions", "registrations", "awards", "nominations"]
+
+# ==================== HELPERS ====================
+
+def _table(choices):
+    values, weights = zip(*choices)
+    return values, list(itertools.accumulate(weights))
+
+
+def _weighted(rng, table):
+    values, cum_weights = table
+    return rng.choices(values, cum_weights=cum_weights)[0]
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+# ==================== VOCABULARY ====================
+
+CITIES = [
+    ("San Francisco", "USA"), ("New York", "USA"), ("Boston", "USA"), ("Seattle", "USA"),
+    ("Austin", "USA"), ("Chicago", "USA"), ("Toronto", "Canada"), ("London", "UK"),
+    ("Berlin", "Germany"), ("Munich", "Germany"), ("Paris", "France"), ("Amsterdam", "Netherlands"),
+    ("Dublin", "Ireland"), ("Stockholm", "Sweden"), ("Zurich", "Switzerland"), ("Tel Aviv", "Israel"),
+    ("Dubai", "UAE"), ("Bangalore", "India"), ("Hyderabad", "India"), ("Singapore", "Singapore"),
+    ("Tokyo", "Japan"), ("Seoul", "South Korea"), ("Sydney", "Australia"), ("Sao Paulo", "Brazil"),
+]
+
+VENUES = ["Convention Center", "Expo Hall", "Tech Hub", "Conference Centre", "Innovation Campus", "Grand Hotel"]
+
+EVENT_TYPES = _table([("conference", 5), ("workshop", 3), ("webinar", 2)])
+
+TOPICS = [
+    "Zero Trust", "Threat Intelligence", "Cloud Security", "AI Safety", "Machine Learning",
+    "Large Language Models", "DNS Security", "Network Automation", "Identity and Access",
+    "Ransomware Defense", "Application Security", "DevSecOps", "Data Privacy",
+    "Incident Response", "Quantum Cryptography", "Computer Vision", "AI Governance",
+    "Security Operations", "IoT Security", "Autonomous Systems",
+]
+
+TITLE_PREFIXES = ["Global", "Annual", "International", "Future of", "Applied", "Enterprise", "Next-Gen", "Executive"]
+
+TITLE_SUFFIXES = {"conference": ["Summit", "Conference", "Forum"], "workshop": ["Workshop", "Bootcamp", "Lab"], "webinar": ["Webinar", "Briefing", "Live"]}
+
+SENTENCES = [
+    "Join leading practitioners for an in-depth look at {topic}.",
+    "Explore real-world case studies on {topic} and {other}.",
+    "Hands-on sessions cover {topic} architecture, tooling and operations.",
+    "Hear from CISOs and research leads on where {topic} is heading next.",
+    "Network with peers building {other} programs at scale.",
+    "Learn practical strategies to apply {topic} in regulated industries.",
+]
+
+FIRST_NAMES = [
+    "Sarah", "Michael", "Jennifer", "David", "Priya", "Wei", "Carlos", "Aisha", "Lukas", "Emma",
+    "Hiroshi", "Fatima", "Olivia", "Noah", "Arjun", "Sofia", "Mateo", "Chloe", "Daniel", "Yuki",
+    "Amara", "Ethan", "Leila", "Ravi", "Grace", "Omar", "Anna", "Jonas", "Mei", "Isabel",
+]
+
+LAST_NAMES = [
+    "Chen", "Rodriguez", "Lee", "Patel", "Smith", "Kim", "Garcia", "Nguyen", "Muller", "Rossi",
+    "Tanaka", "Haddad", "Johnson", "Kowalski", "Singh", "Silva", "Dubois", "Novak", "Cohen", "Okafor",
+    "Andersson", "Ivanova", "Brown", "Sato", "Khan", "Martin", "Lopez", "Wilson", "Yamamoto", "Fischer",
+]
+
+ORGANIZATIONS = [
+    "TechCorp Global", "Innovation Labs", "CloudScale Inc", "TCPWave", "SecureNet", "DataForge",
+    "Quantum Shield", "NeuralWorks", "CipherPoint", "Sentinel Systems", "Northwind Security", "Blue Harbor AI",
+]
+
+JOB_TITLES = [
+    "Chief Security Officer", "Head of AI Research", "VP of Cloud Architecture", "Principal Engineer",
+    "Director of Threat Intelligence", "CTO", "Security Architect", "ML Platform Lead",
+]
+
+EMAIL_DOMAINS = ["example.com", "example.org", "example.net"]
+
+SESSION_TYPES = _table([("keynote", 1), ("panel", 3), ("workshop", 3), ("networking", 1)])
+
+AWARD_CATEGORIES = ["cybersecurity", "ai", "innovation", "leadership"]
+
+AWARD_TITLES = ["Leader of the Year", "Innovation Excellence", "Rising Star", "Lifetime Achievement", "Breakthrough of the Year"]
+
+TICKET_TYPES = _table([("standard", 70), ("vip", 10), ("student", 15), ("virtual", 5)])
+
+TICKET_MULTIPLIERS = {"standard": 1.0, "vip": 2.5, "student": 0.5, "virtual": 0.3}
+
+PAYMENT_STATUSES = _table([("completed", 85), ("pending", 12), ("failed", 3)])
+
+NOMINATION_STATUSES = _table([("pending", 70), ("approved", 20), ("rejected", 10)])
+
+PRICES = [0.0, 49.0, 99.0, 199.0, 299.0, 499.0, 799.0, 999.0, 1299.0, 1999.0]
+
+
+class SyntheticData:
+    """Deterministic document factory. Every document is a pure function of
+    (seed, kind, index), so references can be rebuilt without holding the
+    referenced collection in memory."""
+
+    def __init__(self, args):
+        self.seed = args.seed
+        self.anchor = args.anchor
+        self.counts = {
+            "users": args.users,
+            "speakers": args.speakers,
+            "events": args.events,
+            "awards": args.awards,
         }
-    ]
-    
-    await db.events.insert_many(events)
-    print(f"✅ Added {len(events)} events")
-    
-    # Sample Awards
-    awards = [
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Cybersecurity Leader of the Year",
-            "category": "cybersecurity",
-            "description": "Recognizing exceptional leadership in advancing cybersecurity practices and protecting organizations from evolving threats.",
-            "year": 2025,
-            "nomination_start": datetime.now(timezone.utc).isoformat(),
-            "nomination_end": (datetime.now(timezone.utc) + timedelta(days=90)).isoformat(),
-            "winner_id": None,
-            "winner_name": None,
-            "status": "open",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "title": "AI Innovation Excellence",
-            "category": "ai",
-            "description": "Celebrating groundbreaking innovations in artificial intelligence that push the boundaries of what's possible.",
-            "year": 2025,
-            "nomination_start": datetime.now(timezone.utc).isoformat(),
-            "nomination_end": (datetime.now(timezone.utc) + timedelta(days=90)).isoformat(),
-            "winner_id": None,
-            "winner_name": None,
-            "status": "open",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Technology Leadership Award",
-            "category": "leadership",
-            "description": "Honoring visionary leaders who have transformed their organizations through technology innovation.",
-            "year": 2025,
-            "nomination_start": datetime.now(timezone.utc).isoformat(),
-            "nomination_end": (datetime.now(timezone.utc) + timedelta(days=90)).isoformat(),
+        self.registrations = args.registrations
+        self.sessions_per_event = args.sessions_per_event
+        self.nominations = args.nominations
+        self.hashed_password = None
+
+        # Registration counts per event follow a heavy-tailed distribution so a
+        # handful of flagship events sell most tickets, like production.
+        self.registrations_per_event = self._allocate(self.registrations, args.events, "registrations")
+        self.nominations_per_award = self._allocate(self.nominations, args.awards, "nominations")
+
+    def _rng(self, kind, index):
+        return random.Random(f"{self.seed}:{kind}:{index}")
+
+    def _id(self, kind, index):
+        digest = hashlib.blake2b(f"{self.seed}:{kind}:{index}".encode(), digest_size=16).digest()
+        return str(uuid.UUID(bytes=digest, version=4))
+
+    def _allocate(self, total, buckets, kind):
+        if buckets == 0 or total == 0:
+            return [0] * buckets
+        rng = self._rng(f"allocate-{kind}", 0)
+        weights = [rng.paretovariate(1.2) for _ in range(buckets)]
+        scale = total / sum(weights)
+        cap = self.counts["users"] if kind == "registrations" else total
+        allocation = [min(cap, int(w * scale)) for w in weights]
+        # Hand out the rounding remainder (and anything clipped by the cap) round-robin.
+        remainder = total - sum(allocation)
+        index = 0
+        while remainder > 0:
+            if allocation[index % buckets] < cap:
+                allocation[index % buckets] += 1
+                remainder -= 1
+            index += 1
+        return allocation
+
+    # ---------- users ----------
+
+    def user_identity(self, i):
+        digest = hashlib.blake2b(f"{self.seed}:user:{i}".encode(), digest_size=20).digest()
+        first = FIRST_NAMES[digest[16] % len(FIRST_NAMES)]
+        last = LAST_NAMES[digest[17] % len(LAST_NAMES)]
+        domain = EMAIL_DOMAINS[digest[18] % len(EMAIL_DOMAINS)]
+        return (
+            str(uuid.UUID(bytes=digest[:16], version=4)),
+            f"{first} {last}",
+            f"{first}.{last}.{i}@{domain}".lower(),
+        )
+
+    def users(self):
+        for i in range(self.counts["users"]):
+            user_id, full_name, email = self.user_identity(i)
+            yield {
+                "id": user_id,
+                "email": email,
+                "full_name": full_name,
+                "role": "attendee",
+                "organization": ORGANIZATIONS[i % len(ORGANIZATIONS)],
+                "phone": None,
+                "bio": None,
+                "hashed_password": self.hashed_password,
+                "created_at": (self.anchor - timedelta(minutes=i % 1_051_200)).isoformat(),
+            }
+
+    # ---------- speakers ----------
+
+    def speakers(self):
+        for i in range(self.counts["speakers"]):
+            rng = self._rng("speaker", i)
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            expertise = rng.sample(TOPICS, rng.randint(2, 5))
+            organization = rng.choice(ORGANIZATIONS)
+            yield {
+                "id": self._id("speaker", i),
+                "name": name,
+                "title": rng.choice(JOB_TITLES),
+                "organization": organization,
+                "bio": (
+                    f"{name} works on {expertise[0]} and {expertise[1]} at {organization}, "
+                    f"with {rng.randint(5, 30)} years of industry experience."
+                ),
+                "expertise": expertise,
+                "image_url": None,
+                "linkedin_url": "https://linkedin.com",
+                "twitter_url": "https://twitter.com" if rng.random() < 0.5 else None,
+                "is_featured": rng.random() < 0.1,
+                "created_at": (self.anchor - timedelta(days=rng.randint(0, 720))).isoformat(),
+            }
+
+    # ---------- events, sessions & registrations ----------
+
+    def event(self, i):
+        rng = self._rng("event", i)
+        event_type = _weighted(rng, EVENT_TYPES)
+        start = self.anchor + timedelta(days=rng.randint(-540, 365), hours=rng.choice([8, 9, 10, 13]))
+        end = start + timedelta(days=rng.randint(0, 2) if event_type == "conference" else 0, hours=8)
+        topic, other = rng.sample(TOPICS, 2)
+        city, country = rng.choice(CITIES)
+        sold = self.registrations_per_event[i]
+        capacity = max(sold, 20) + rng.randint(0, max(sold, 20) // 4 + 50)
+        if end <= self.anchor:
+            event_status = "completed"
+        elif start <= self.anchor:
+            event_status = "ongoing"
+        else:
+            event_status = "upcoming"
+        return {
+            "id": self._id("event", i),
+            "title": f"{rng.choice(TITLE_PREFIXES)} {topic} {rng.choice(TITLE_SUFFIXES[event_type])} {start.year}",
+            "description": " ".join(s.format(topic=topic, other=other) for s in rng.sample(SENTENCES, 3)),
+            "event_type": event_type,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "venue": "Online" if event_type == "webinar" else f"{city} {rng.choice(VENUES)}",
+            "city": city,
+            "country": country,
+            "capacity": capacity,
+            "available_seats": capacity - sold,
+            "ticket_price": rng.choice(PRICES),
+            "image_url": None,
+            "agenda": f"{topic}, {other}, Networking",
+            "is_featured": rng.random() < 0.05,
+            "status": event_status,
+            "created_at": (start - timedelta(days=rng.randint(30, 300))).isoformat(),
+        }
+
+    def events(self):
+        for i in range(self.counts["events"]):
+            yield self.event(i)
+
+    def sessions(self):
+        speakers = self.counts["speakers"]
+        for i in range(self.counts["events"]):
+            event = self.event(i)
+            start = datetime.fromisoformat(event["start_date"])
+            end = datetime.fromisoformat(event["end_date"])
+            for j in range(self.sessions_per_event):
+                rng = self._rng("session", f"{i}:{j}")
+                slot = start + timedelta(hours=j % 8)
+                topic = rng.choice(TOPICS)
+                session_type = _weighted(rng, SESSION_TYPES)
+                panel_size = min(3 if session_type == "panel" else 1, speakers)
+                yield {
+                    "id": self._id("session", f"{i}:{j}"),
+                    "event_id": event["id"],
+                    "title": f"{topic}: {rng.choice(['Lessons Learned', 'State of the Art', 'Deep Dive', 'Roadmap', 'Ask Me Anything'])}",
+                    "description": rng.choice(SENTENCES).format(topic=topic, other=rng.choice(TOPICS)),
+                    "speaker_ids": [self._id("speaker", s) for s in rng.sample(range(speakers), panel_size)],
+                    "start_time": slot.isoformat(),
+                    "end_time": max(min(slot + timedelta(minutes=45), end), slot).isoformat(),
+                    "room": f"Room {rng.randint(1, 12)}",
+                    "session_type": session_type,
+                    "created_at": (start - timedelta(days=rng.randint(7, 90))).isoformat(),
+                }
+
+    def registrations_stream(self):
+        for i, sold in enumerate(self.registrations_per_event):
+            if sold == 0:
+                continue
+            event = self.event(i)
+            start = datetime.fromisoformat(event["start_date"])
+            rng = self._rng("registrations", i)
+            # Sampling distinct user indices keeps (event_id, user_id) unique,
+            # matching the "already registered" rule in create_registration.
+            for n, u in enumerate(rng.sample(range(self.counts["users"]), sold)):
+                user_id, full_name, email = self.user_identity(u)
+                ticket_type = _weighted(rng, TICKET_TYPES)
+                yield {
+                    "id": self._id("registration", f"{i}:{n}"),
+                    "event_id": event["id"],
+                    "user_id": user_id,
+                    "user_name": full_name,
+                    "user_email": email,
+                    "ticket_type": ticket_type,
+                    "payment_status": _weighted(rng, PAYMENT_STATUSES),
+                    "payment_amount": round(event["ticket_price"] * TICKET_MULTIPLIERS[ticket_type], 2),
+                    "registration_date": (start - timedelta(minutes=rng.randint(60, 180 * 24 * 60))).isoformat(),
+                }
+
+    # ---------- awards & nominations ----------
+
+    def award(self, i):
+        rng = self._rng("award", i)
+        category = rng.choice(AWARD_CATEGORIES)
+        nomination_start = self.anchor + timedelta(days=rng.randint(-400, 0))
+        nomination_end = nomination_start + timedelta(days=rng.choice([60, 90, 120]))
+        if nomination_end > self.anchor:
+            award_status = "open"
+        elif nomination_end > self.anchor - timedelta(days=60):
+            award_status = "closed"
+        else:
+            award_status = "announced"
+        return {
+            "id": self._id("award", i),
+            "title": f"{category.capitalize() if category != 'ai' else 'AI'} {rng.choice(AWARD_TITLES)}",
+            "category": category,
+            "description": f"Recognizing outstanding contributions to {rng.choice(TOPICS)} and the wider {category} community.",
+            "year": nomination_end.year,
+            "nomination_start": nomination_start.isoformat(),
+            "nomination_end": nomination_end.isoformat(),
             "winner_id": None,
             "winner_name": None,
-            "status": "open",
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "status": award_status,
+            "created_at": (nomination_start - timedelta(days=rng.randint(1, 30))).isoformat(),
         }
-    ]
-    
-    await db.awards.insert_many(awards)
-    print(f"✅ Added {len(awards)} awards")
-    
-    # Sample Speakers
-    speakers = [
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Dr. Sarah Chen",
-            "title": "Chief Security Officer",
-            "organization": "TechCorp Global",
-            "bio": "Dr. Chen is a renowned cybersecurity expert with over 20 years of experience in protecting enterprise infrastructure. She has led security initiatives for Fortune 500 companies and is a frequent keynote speaker at international conferences.",
-            "expertise": ["Cybersecurity", "Threat Intelligence", "Zero Trust", "Cloud Security"],
-            "image_url": "https://images.unsplash.com/photo-1594938384824-022767a58e11",
-            "linkedin_url": "https://linkedin.com",
-            "twitter_url": "https://twitter.com",
-            "is_featured": True,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Michael Rodriguez",
-            "title": "Head of AI Research",
-            "organization": "Innovation Labs",
-            "bio": "Michael leads cutting-edge AI research focusing on large language models and ethical AI development. His work has been published in top-tier conferences including NeurIPS and ICML.",
-            "expertise": ["Artificial Intelligence", "Machine Learning", "NLP", "Ethics in AI"],
-            "image_url": "https://images.pexels.com/photos/1181317/pexels-photo-1181317.jpeg",
-            "linkedin_url": "https://linkedin.com",
-            "twitter_url": "https://twitter.com",
-            "is_featured": True,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Jennifer Lee",
-            "title": "VP of Cloud Architecture",
-            "organization": "CloudScale Inc",
-            "bio": "Jennifer is a cloud architecture specialist with expertise in designing scalable, secure cloud solutions. She has helped numerous organizations migrate to the cloud while maintaining robust security postures.",
-            "expertise": ["Cloud Computing", "AWS", "Azure", "DevSecOps"],
-            "image_url": "https://images.pexels.com/photos/1181317/pexels-photo-1181317.jpeg",
-            "linkedin_url": "https://linkedin.com",
-            "twitter_url": None,
-            "is_featured": False,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-    ]
-    
-    await db.speakers.insert_many(speakers)
-    print(f"✅ Added {len(speakers)} speakers")
-    
+
+    def awards(self):
+        for i in range(self.counts["awards"]):
+            yield self.award(i)
+
+    def nominations_stream(self):
+        users = self.counts["users"]
+        for i, total in enumerate(self.nominations_per_award):
+            if total == 0:
+                continue
+            award = self.award(i)
+            opened = datetime.fromisoformat(award["nomination_start"])
+            window = max(int((min(datetime.fromisoformat(award["nomination_end"]), self.anchor) - opened).total_seconds()), 1)
+            rng = self._rng("nominations", i)
+            nominations = []
+            for n in range(total):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                organization = rng.choice(ORGANIZATIONS)
+                nominations.append({
+                    "id": self._id("nomination", f"{i}:{n}"),
+                    "award_id": award["id"],
+                    "nominee_name": f"{first} {last}",
+                    "nominee_email": f"{first}.{last}@{organization.replace(' ', '').lower()}.com".lower(),
+                    "nominee_organization": organization,
+                    "nomination_statement": (
+                        f"{first} {last} has led {rng.choice(TOPICS)} initiatives at {organization} "
+                        f"with measurable impact on {rng.choice(TOPICS)}."
+                    ),
+                    "nominated_by_user_id": self.user_identity(rng.randrange(users))[0],
+                    "status": _weighted(rng, NOMINATION_STATUSES),
+                    "created_at": (opened + timedelta(seconds=rng.randrange(window))).isoformat(),
+                })
+            # Clustered in submission order, as if each had gone through POST /nominations
+            index = ClusterIndex()
+            for nomination in sorted(nominations, key=lambda doc: (doc["created_at"], doc["id"])):
+                nomination.update(index.assign(nomination))
+            yield from nominations
+
+    def stream(self, collection):
+        return {
+            "users": self.users,
+            "speakers": self.speakers,
+            "events": self.events,
+            "sessions": self.sessions,
+            "registrations": self.registrations_stream,
+            "awards": self.awards,
+            "nominations": self.nominations_stream,
+        }[collection]()
+
+    def expected(self, collection):
+        if collection == "sessions":
+            return self.counts["events"] * self.sessions_per_event
+        if collection == "registrations":
+            return self.registrations
+        if collection == "nominations":
+            return self.nominations
+        return self.counts[collection]
+
+
+# ==================== WRITER ====================
+
+async def insert_stream(collection, docs, batch_size, in_flight, expected):
+    """Insert ``docs`` in unordered batches, keeping at most ``in_flight``
+    insert_many calls outstanding. Returns the number of documents written;
+    a failed batch stops further batches and its error is raised once the
+    batches in flight have finished."""
+    semaphore = asyncio.Semaphore(in_flight)
+    tasks = set()
+    failures = []
+    written = 0
+    started = time.perf_counter()
+    last_report = started
+
+    async def write(batch):
+        nonlocal written
+        try:
+            await collection.insert_many(batch, ordered=False)
+            written += len(batch)
+        finally:
+            semaphore.release()
+
+    def finished(task):
+        tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            failures.append(task.exception())
+
+    for batch in _batched(docs, batch_size):
+        await semaphore.acquire()
+        if failures:
+            # Stop queueing batches once one has failed
+            semaphore.release()
+            break
+        task = asyncio.create_task(write(batch))
+        tasks.add(task)
+        task.add_done_callback(finished)
+
+        now = time.perf_counter()
+        if now - last_report >= 5:
+            last_report = now
+            rate = written / (now - started)
+            print(f"   … {collection.name}: {written:,}/{expected:,} ({rate:,.0f} docs/s)")
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    if failures:
+        raise failures[0]
+    return written
+
+
+async def seed_database(args):
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, maxPoolSize=max(args.concurrency, 10))
+    db = client[os.environ['DB_NAME']]
+
+    data = SyntheticData(args)
+    targets = args.only or COLLECTIONS
+
+    print(f"🌱 Seeding TCPWorld database (seed={args.seed}, anchor={args.anchor.date()})...")
+
+    if "users" in targets and args.users:
+        # bcrypt is deliberately slow (~0.25s per hash); hashing millions of
+        # users individually would take days, so every synthetic user shares
+        # one precomputed hash of --password.
+        data.hashed_password = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(args.password)
+
+    summary = []
+    total_started = time.perf_counter()
+    for name in targets:
+        expected = data.expected(name)
+        if expected == 0:
+            continue
+        if args.drop:
+            await db[name].drop()
+        started = time.perf_counter()
+        written = await insert_stream(db[name], data.stream(name), args.batch_size, args.concurrency, expected)
+        elapsed = time.perf_counter() - started
+        summary.append((name, written, elapsed))
+        print(f"✅ Added {written:,} {name} in {elapsed:.1f}s ({written / elapsed:,.0f} docs/s)")
+
+    total_elapsed = time.perf_counter() - total_started
+    total_written = sum(written for _, written, _ in summary)
+
     print("\n🎉 Database seeding completed successfully!")
     print("\n📊 Summary:")
-    print(f"   - Events: {len(events)}")
-    print(f"   - Awards: {len(awards)}")
-    print(f"   - Speakers: {len(speakers)}")
-    print("\n💡 You can now explore the platform with sample data!")
-    print("\n🔐 Admin Login:")
-    print("   Email: admin@tcpworld.ai")
-    print("   Password: admin123")
-    
+    for name, written, _ in summary:
+        print(f"   - {name.capitalize()}: {written:,}")
+    if total_elapsed > 0:
+        print(f"   - Throughput: {total_written:,} docs in {total_elapsed:.1f}s ({total_written / total_elapsed:,.0f} docs/s)")
+    if "users" in targets and args.users:
+        print(f"\n🔐 Synthetic users log in with password: {args.password}")
+    print("   Run create_admin.py for the admin account.")
+
     client.close()
 
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic TCPWorld data.")
+    parser.add_argument("--seed", type=int, default=42, help="random seed; the same seed and anchor produce identical data")
+    parser.add_argument("--anchor", type=lambda s: datetime.fromisoformat(s).replace(tzinfo=timezone.utc),
+                        default=datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0),
+                        help="reference date (YYYY-MM-DD) event and award dates are spread around; defaults to today")
+    parser.add_argument("--events", type=int, default=12)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--registrations", type=int, default=1000)
+    parser.add_argument("--speakers", type=int, default=24)
+    parser.add_argument("--sessions-per-event", type=int, default=4)
+    parser.add_argument("--awards", type=int, default=6)
+    parser.add_argument("--nominations", type=int, default=120)
+    parser.add_argument("--password", default="password123", help="password shared by all synthetic users")
+    parser.add_argument("--batch-size", type=int, default=1000, help="documents per insert_many call")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum insert_many calls in flight")
+    parser.add_argument("--only", nargs="+", choices=COLLECTIONS, help="only generate these collections")
+    parser.add_argument("--drop", action="store_true", help="drop each target collection before inserting")
+    args = parser.parse_args(argv)
+
+    if args.registrations > args.users * args.events:
+        parser.error("--registrations cannot exceed --users × --events (registrations are unique per user and event)")
+    if args.users == 0 and (args.registrations or args.nominations):
+        parser.error("registrations and nominations reference users; --users must be positive")
+    if args.speakers == 0 and args.sessions_per_event:
+        parser.error("sessions reference speakers; --speakers must be positive")
+    if args.batch_size <= 0 or args.concurrency <= 0:
+        parser.error("--batch-size and --concurrency must be positive")
+    return args
+
+
 if __name__ == "__main__":
-    asyncio.run(seed_database())
+    asyncio.run(seed_database(parse_args()))
@@ -1,38 +1,231 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Body
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
+from functools import lru_cache
 import os
+import json
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 import uuid
-from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
-from jose import JWTError, jwt
-from icalendar import Calendar, Event as ICalEvent
-from io import BytesIO
+from datetime import date, datetime, timezone, timedelta
+from pymongo.errors import DuplicateKeyError
+from search import SEARCH_TYPES, search_catalog
+from facets import EVENT_FACETS, SPEAKER_FACETS, build_query, parse_selection
+from cache import MISSING, QueryCache
+from coalesce import SingleFlight
+from repositories import Repositories, memory_repositories, motor_repositories
+from database import MongoSettings, create_client, database_handles, warm_up
+from scheduler import LifecycleScheduler
+from cleanup import CascadeCleaner
+from archive import Archiver
+from idempotency import IdempotencyGuard
+from dedupe import assign_cluster
+from moderation import ModerationError, set_inquiry_statuses, set_nomination_statuses
+from analytics import rollup_id
+from calendars import calendar_filename, event_calendar
+from mailer import DEFAULT_SENDER, sink_from_env
+from outbox import OutboxWorker, registration_messages
+import startup
+import waiting_room
+import writebehind
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Data backend: "mongo" (default) or "memory" for running without MongoDB
+DATA_BACKEND = os.environ.get("DATA_BACKEND", "mongo")
 
 # Security setup
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.environ.get("SECRET_KEY", "tcpworld-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
 security = HTTPBearer()
 
+# Derived read results (facet counts); invalidated by the write endpoints
+query_cache = QueryCache(ttl_seconds=float(os.environ.get("FACET_CACHE_TTL_SECONDS", "60")))
+
+# Identical concurrent catalog reads share one in-flight database call
+COALESCE_READS = os.environ.get("COALESCE_READS", "true").lower() in ("1", "true", "yes")
+single_flight = SingleFlight()
+
+# Seconds between event/award lifecycle status updates; 0 disables the scheduler
+LIFECYCLE_INTERVAL_SECONDS = float(os.environ.get("LIFECYCLE_INTERVAL_SECONDS", "60"))
+
+# Dependents of a deleted event are removed in the background, this many at a time
+CASCADE_BATCH_SIZE = int(os.environ.get("CASCADE_BATCH_SIZE", "1000"))
+
+# Registrations/nominations of events/awards finished ARCHIVE_GRACE_DAYS ago move to
+# archive collections every ARCHIVE_INTERVAL_SECONDS (0 disables)
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_GRACE_DAYS = int(os.environ.get("ARCHIVE_GRACE_DAYS", "30"))
+
+# Resolved inquiries expire via a TTL index this many days after resolution (0 keeps them)
+INQUIRY_RETENTION_DAYS = float(os.environ.get("INQUIRY_RETENTION_DAYS", "180"))
+
+# Responses to POSTs with an Idempotency-Key are replayed to retries for this long
+IDEMPOTENCY_TTL_HOURS = float(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24"))
+idempotency_guard = IdempotencyGuard(
+    lock_timeout_seconds=float(os.environ.get("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", "30")),
+)
+
+# Registration emails go through an outbox written with the registration and are
+# delivered by OUTBOX_WORKERS background tasks (0: run `python outbox.py` instead),
+# through the sink MAIL_BACKEND selects; unset, nothing is delivered
+OUTBOX_WORKERS = int(os.environ.get("OUTBOX_WORKERS", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETENTION_HOURS = float(os.environ.get("OUTBOX_RETENTION_HOURS", "72"))
+# Write a registration and its outbox messages in one transaction (needs a replica set)
+OUTBOX_TRANSACTIONS = os.environ.get("OUTBOX_TRANSACTIONS", "true").lower() in ("1", "true", "yes")
+MAIL_FROM = os.environ.get("MAIL_FROM", DEFAULT_SENDER)
+
+# Opt-in write-behind batching of inquiry and nomination inserts: "durable" acks after
+# the batch is written, "async" as soon as it is buffered; unset inserts one by one
+WRITE_BEHIND = os.environ.get("WRITE_BEHIND", "")
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get("WRITE_BEHIND_MAX_BATCH", "500"))
+WRITE_BEHIND_MAX_DELAY_MS = float(os.environ.get("WRITE_BEHIND_MAX_DELAY_MS", "2"))
+
+# Startup phases (indexes, pool warm-up, cache priming) are retried this many times,
+# backing off from STARTUP_BACKOFF_SECONDS, before /api/health fails too
+STARTUP_MAX_ATTEMPTS = int(os.environ.get("STARTUP_MAX_ATTEMPTS", "8"))
+STARTUP_BACKOFF_SECONDS = float(os.environ.get("STARTUP_BACKOFF_SECONDS", "0.5"))
+
+# Admission tokens from an event's waiting room are valid this long; signed with a
+# key of their own so they can never pass as access tokens
+admission_tokens = waiting_room.AdmissionTokens(
+    SECRET_KEY + ":admission", ALGORITHM,
+    ttl_seconds=int(os.environ.get("ADMISSION_TOKEN_TTL_SECONDS", "600")),
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def prime(app, client, settings):
+    """Build indexes, warm the connection pool, prime the facet cache and
+    load deferred modules, then mark the app ready."""
+    readiness = app.state.readiness
+    try:
+        await readiness.phase("indexes", app.state.repos.ensure_indexes)
+        if client is not None:
+            await readiness.phase("pool_warm_up", lambda: warm_up(client, settings))
+            logger.info(
+                "MongoDB pool warmed up (minPoolSize=%d, maxPoolSize=%d, catalog reads=%s)",
+                settings.min_pool_size, settings.max_pool_size, settings.catalog_read_preference,
+            )
+        await readiness.phase("caches", lambda: prime_caches(app.state.catalog_repos))
+        await readiness.phase("imports", lambda: startup.preload(startup.DEFERRED_IMPORTS))
+    except Exception as e:
+        # Out of retries: fail liveness too, so the process gets restarted
+        logger.exception("Startup priming failed")
+        readiness.mark_failed(e)
+        return
+    readiness.mark_ready()
+
+
+async def prime_caches(repos):
+    """Unfiltered event and speaker facet counts, which back the catalog
+    landing pages."""
+    event_base, event_selection = event_filters()
+    speaker_base, speaker_selection = speaker_filters()
+    await asyncio.gather(
+        cached_facet_counts(repos.events, event_base, EVENT_FACETS, event_selection),
+        cached_facet_counts(repos.speakers, speaker_base, SPEAKER_FACETS, speaker_selection),
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    client = settings = None
+    # Configuration errors fail startup before any background task is running
+    if WRITE_BEHIND and WRITE_BEHIND not in writebehind.MODES:
+        raise ValueError(f"Unknown WRITE_BEHIND {WRITE_BEHIND!r}; expected one of {', '.join(writebehind.MODES)}")
+    mail_sink = sink_from_env(ROOT_DIR) if OUTBOX_WORKERS > 0 else None
+    
+    app.state.readiness = startup.Readiness(
+        max_attempts=STARTUP_MAX_ATTEMPTS, base_backoff_seconds=STARTUP_BACKOFF_SECONDS,
+    )
+    options = {
+        "inquiry_retention_days": INQUIRY_RETENTION_DAYS,
+        "idempotency_ttl_hours": IDEMPOTENCY_TTL_HOURS,
+        "outbox_retention_hours": OUTBOX_RETENTION_HOURS,
+    }
+    if DATA_BACKEND == "memory":
+        app.state.repos = app.state.catalog_repos = memory_repositories(**options)
+    else:
+        settings = MongoSettings.from_env()
+        client = create_client(settings)
+        db, catalog_db = database_handles(client, settings)
+        app.state.repos = motor_repositories(db, transactions=OUTBOX_TRANSACTIONS, **options)
+        # Anonymous catalog reads may be served by secondaries
+        app.state.catalog_repos = motor_repositories(catalog_db, **options)
+    
+    # Serve /api/health right away; /api/ready turns green once this finishes
+    priming = asyncio.create_task(prime(app, client, settings))
+    
+    scheduler = None
+    if LIFECYCLE_INTERVAL_SECONDS > 0:
+        scheduler = LifecycleScheduler(
+            app.state.repos, LIFECYCLE_INTERVAL_SECONDS,
+            on_change=lambda collections: query_cache.invalidate(*collections),
+        )
+        scheduler.start()
+    
+    app.state.cascade = CascadeCleaner(app.state.repos, batch_size=CASCADE_BATCH_SIZE)
+    app.state.cascade.start()
+    
+    archiver = None
+    if ARCHIVE_INTERVAL_SECONDS > 0:
+        archiver = Archiver(app.state.repos, ARCHIVE_INTERVAL_SECONDS, grace_days=ARCHIVE_GRACE_DAYS)
+        archiver.start()
+    
+    app.state.write_buffers = {}
+    if WRITE_BEHIND:
+        for repo in (app.state.repos.inquiries, app.state.repos.nominations):
+            buffer = writebehind.WriteBehindBuffer(
+                repo, durable=WRITE_BEHIND == "durable",
+                max_batch=WRITE_BEHIND_MAX_BATCH, max_delay_seconds=WRITE_BEHIND_MAX_DELAY_MS / 1000,
+            )
+            buffer.start()
+            app.state.write_buffers[repo.collection_name] = buffer
+    
+    app.state.outbox_worker = None
+    if OUTBOX_WORKERS > 0 and mail_sink is None:
+        logger.warning("MAIL_BACKEND is not set; registration emails stay queued in the outbox")
+    elif OUTBOX_WORKERS > 0:
+        app.state.outbox_worker = OutboxWorker(
+            app.state.repos, mail_sink, MAIL_FROM,
+            concurrency=OUTBOX_WORKERS, max_attempts=OUTBOX_MAX_ATTEMPTS,
+        )
+        app.state.outbox_worker.start()
+    
+    try:
+        yield
+    finally:
+        app.state.readiness.ready = False
+        priming.cancel()
+        await asyncio.gather(priming, return_exceptions=True)
+        # Drain buffered inserts before anything they depend on goes away
+        for buffer in app.state.write_buffers.values():
+            await buffer.stop()
+        if app.state.outbox_worker is not None:
+            await app.state.outbox_worker.stop()
+        if archiver is not None:
+            await archiver.stop()
+        await app.state.cascade.stop()
+        if scheduler is not None:
+            await scheduler.stop()
+        if client is not None:
+            client.close()
+
+
 # Create the main app without a prefix
-app = FastAPI(title="TCPWorld API")
+app = FastAPI(title="TCPWorld API", lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -98,6 +291,7 @@ class Event(BaseModel):
     agenda: Optional[str] = None
     is_featured: bool = False
     status: str = "upcoming"  # upcoming, ongoing, completed
+    waiting_room: bool = False  # registration requires a waiting-room admission token
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
@@ -153,6 +347,9 @@ class Nomination(BaseModel):
     nomination_statement: str
     nominated_by_user_id: str
     status: str = "pending"  # pending, approved, rejected, winner
+    # Nominations of the same nominee for an award share a cluster_id (the first one's id)
+    cluster_id: Optional[str] = None
+    is_duplicate: bool = False
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
@@ -247,6 +444,7 @@ class Inquiry(BaseModel):
     message: str
     status: str = "new"  # new, in_progress, resolved
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    resolved_at: Optional[datetime] = None
 
 
 class InquiryCreate(BaseModel):
@@ -256,17 +454,229 @@ class InquiryCreate(BaseModel):
     message: str
 
 
+class InquiryStatusUpdate(BaseModel):
+    status: Literal["new", "in_progress", "resolved"]
+
+
+MAX_BULK_CHANGES = 1000
+
+
+class InquiryStatusChange(InquiryStatusUpdate):
+    id: str
+
+
+class InquiryBulkStatus(BaseModel):
+    changes: List[InquiryStatusChange] = Field(..., min_length=1, max_length=MAX_BULK_CHANGES)
+
+
+class NominationStatusChange(BaseModel):
+    id: str
+    status: Literal["pending", "approved", "rejected", "winner"]
+
+
+class NominationBulkStatus(BaseModel):
+    changes: List[NominationStatusChange] = Field(..., min_length=1, max_length=MAX_BULK_CHANGES)
+
+
+class BulkItemResult(BaseModel):
+    id: str
+    status: str
+    result: str  # updated, unchanged, not_found, conflict
+
+
+class BulkStatusResult(BaseModel):
+    requested: int
+    updated: int
+    results: List[BulkItemResult]
+
+
+class WaitingRoomConfig(BaseModel):
+    enabled: bool = True
+    admit_per_second: float = Field(10.0, gt=0, le=10_000)
+
+
+class WaitingRoom(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    event_id: str
+    enabled: bool
+    admit_per_second: float
+    issued: int
+    admitted_through: int
+    waiting: int
+
+
+class WaitingRoomStatus(BaseModel):
+    event_id: str
+    open: bool
+    position: int
+    admitted_through: int
+    ahead: int
+    estimated_wait_seconds: float
+    poll_after_seconds: float
+    admission_token: Optional[str] = None
+    token_expires_at: Optional[datetime] = None
+
+
+class SearchHit(BaseModel):
+    type: str  # event, speaker, session, award
+    id: str
+    title: str
+    score: float
+    data: Dict[str, Any]
+
+
+class SearchResults(BaseModel):
+    query: str
+    page: int
+    page_size: int
+    total: int
+    counts: Dict[str, int]
+    hits: List[SearchHit]
+
+
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+
+class FacetCounts(BaseModel):
+    total: int
+    facets: Dict[str, List[FacetValue]]
+
+
+class DailyRegistrations(BaseModel):
+    day: str
+    registrations: int
+    revenue: float
+
+
+class EventAnalytics(BaseModel):
+    event_id: str
+    title: Optional[str] = None
+    status: Optional[str] = None
+    registrations: int = 0
+    revenue: float = 0
+    capacity: Optional[int] = None
+    available_seats: Optional[int] = None
+    sell_through: Optional[float] = None  # share of capacity sold
+
+
+class TicketTypeRevenue(BaseModel):
+    ticket_type: str
+    registrations: int
+    revenue: float
+
+
+class NominationCluster(BaseModel):
+    cluster_id: str
+    size: int
+    nominations: List[Nomination]
+
+
+class NominationClusters(BaseModel):
+    award_id: str
+    total_clusters: int
+    duplicates: int
+    page: int
+    page_size: int
+    clusters: List[NominationCluster]
+
+
 # ==================== HELPER FUNCTIONS ====================
 
+def get_repositories(request: Request) -> Repositories:
+    """Primary-backed repositories: auth, registrations and all writes."""
+    return request.app.state.repos
+
+
+def get_catalog_repositories(request: Request) -> Repositories:
+    """Repositories for anonymous catalog reads, which tolerate bounded
+    staleness and may be routed to secondaries."""
+    return request.app.state.catalog_repos
+
+
+def get_cascade(request: Request) -> CascadeCleaner:
+    return request.app.state.cascade
+
+
+def get_write_buffers(request: Request) -> Dict[str, writebehind.WriteBehindBuffer]:
+    """Write-behind buffers by collection; empty unless WRITE_BEHIND is set."""
+    return request.app.state.write_buffers
+
+
+def get_outbox_worker(request: Request) -> Optional[OutboxWorker]:
+    """The in-process outbox worker, or None when delivery runs elsewhere."""
+    return request.app.state.outbox_worker
+
+
+@lru_cache(maxsize=None)
+def password_context():
+    """passlib and bcrypt load on the first sign-up or login, not at boot."""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_context().hash(password)
+
+
+def parse_facet_selection(facets, params):
+    try:
+        return parse_selection(facets, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def coalesced(route, params, fetch):
+    """Run ``fetch()`` once for all concurrent callers with the same route and
+    parameters. Callers share the decoded result, so it must not be mutated."""
+    if not COALESCE_READS:
+        return await fetch()
+    return await single_flight.do(route, json.dumps(params, sort_keys=True, default=str), fetch)
+
+
+async def cached_facet_counts(repo, base, facets, selection):
+    key = (tuple(sorted(base.items())), tuple(sorted((k, tuple(v)) for k, v in selection.items())))
+    counts = query_cache.get(repo.collection_name, key)
+    if counts is MISSING:
+        generation = query_cache.generation(repo.collection_name)
+        # A cache miss under load would otherwise run one aggregation per caller.
+        # Keyed on the generation too, so no caller joins a query that started
+        # before a write.
+        counts = await coalesced(
+            f"{repo.collection_name}/facets", [base, selection, generation],
+            lambda: repo.facet_counts(base, facets, selection),
+        )
+        query_cache.set(repo.collection_name, key, counts, generation)
+    return counts
+
+
+async def idempotent(repos, user, key, route, payload, execute, authorize=None):
+    """Run ``execute()`` once per ``Idempotency-Key``; without a key it
+    simply runs. ``authorize()`` is skipped when a stored response is
+    replayed."""
+    if not key:
+        if authorize is not None:
+            authorize()
+        return await execute()
+    return await idempotency_guard.run(repos.idempotency, user.id, key, route, payload, execute, authorize)
+
+
+def bulk_status_result(changes, results):
+    return BulkStatusResult(
+        requested=len(changes),
+        updated=sum(1 for result in results.values() if result == "updated"),
+        results=[BulkItemResult(id=c["id"], status=c["status"], result=results[c["id"]]) for c in changes]
+    )
 
 
 def create_access_token(data: dict):
+    from jose import jwt  # deferred: see startup.DEFERRED_IMPORTS
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
@@ -274,12 +684,16 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    repos: Repositories = Depends(get_repositories),
+) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    from jose import JWTError, jwt  # deferred: see startup.DEFERRED_IMPORTS
     try:
         token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -289,13 +703,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
-    user_doc = await db.users.find_one({"id": user_id}, {"_id": 0})
+    user_doc = await repos.users.get(user_id)
     if user_doc is None:
         raise credentials_exception
     
-    if isinstance(user_doc.get('created_at'), str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
-    
     return User(**user_doc)
 
 
@@ -308,10 +719,9 @@ async def get_admin_user(current_user: User = Depends(get_current_user)) -> User
 # ==================== AUTH ENDPOINTS ====================
 
 @api_router.post("/auth/register", response_model=Token)
-async def register(user_data: UserCreate):
+async def register(user_data: UserCreate, repos: Repositories = Depends(get_repositories)):
     # Check if user exists
-    existing_user = await db.users.find_one({"email": user_data.email})
-    if existing_user:
+    if await repos.users.exists({"email": user_data.email}):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user
@@ -326,9 +736,8 @@ async def register(user_data: UserCreate):
     
     user_doc = user.model_dump()
     user_doc['hashed_password'] = hashed_password
-    user_doc['created_at'] = user_doc['created_at'].isoformat()
     
-    await db.users.insert_one(user_doc)
+    await repos.users.insert(user_doc)
     
     # Create token
     access_token = create_access_token(data={"sub": user.id})
@@ -337,17 +746,14 @@ async def register(user_data: UserCreate):
 
 
 @api_router.post("/auth/login", response_model=Token)
-async def login(credentials: UserLogin):
-    user_doc = await db.users.find_one({"email": credentials.email}, {"_id": 0})
+async def login(credentials: UserLogin, repos: Repositories = Depends(get_repositories)):
+    user_doc = await repos.users.get_by_email(credentials.email)
     if not user_doc:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     if not verify_password(credentials.password, user_doc.get('hashed_password', '')):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    if isinstance(user_doc.get('created_at'), str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
-    
     user = User(**user_doc)
     access_token = create_access_token(data={"sub": user.id})
     
@@ -361,101 +767,127 @@ async def get_me(current_user: User = Depends(get_current_user)):
 
 # ==================== EVENTS ENDPOINTS ====================
 
-@api_router.get("/events", response_model=List[Event])
-async def get_events(status: Optional[str] = None, featured: Optional[bool] = None):
-    query = {}
+def event_filters(
+    status: Optional[str] = None,
+    featured: Optional[bool] = None,
+    event_type: Optional[str] = None,
+    city: Optional[str] = None,
+    country: Optional[str] = None,
+    month: Optional[str] = None,
+    price_band: Optional[str] = None,
+):
+    """Shared query parameters for /events and /events/facets. Facet
+    parameters take comma-separated values, e.g. ``city=Boston,Seattle``."""
+    base = {}
     if status:
-        query['status'] = status
+        base['status'] = status
     if featured is not None:
-        query['is_featured'] = featured
-    
-    events = await db.events.find(query, {"_id": 0}).sort("start_date", -1).to_list(1000)
-    
-    for event in events:
-        for date_field in ['start_date', 'end_date', 'created_at']:
-            if isinstance(event.get(date_field), str):
-                event[date_field] = datetime.fromisoformat(event[date_field])
+        base['is_featured'] = featured
+    selection = parse_facet_selection(EVENT_FACETS, {
+        "event_type": event_type,
+        "city": city,
+        "country": country,
+        "month": month,
+        "price_band": price_band,
+    })
+    return base, selection
+
+
+@api_router.get("/events", response_model=List[Event])
+async def get_events(filters: tuple = Depends(event_filters), repos: Repositories = Depends(get_catalog_repositories)):
+    base, selection = filters
+    query = build_query(base, EVENT_FACETS, selection)
     
-    return events
+    return await coalesced("events", query, lambda: repos.events.find(query, sort=[("start_date", -1)]))
+
+
+@api_router.get("/events/facets", response_model=FacetCounts)
+async def get_event_facets(filters: tuple = Depends(event_filters), repos: Repositories = Depends(get_catalog_repositories)):
+    base, selection = filters
+    return await cached_facet_counts(repos.events, base, EVENT_FACETS, selection)
 
 
 @api_router.get("/events/{event_id}", response_model=Event)
-async def get_event(event_id: str):
-    event_doc = await db.events.find_one({"id": event_id}, {"_id": 0})
+async def get_event(event_id: str, repos: Repositories = Depends(get_catalog_repositories)):
+    event_doc = await coalesced("events/{id}", event_id, lambda: repos.events.get(event_id))
     if not event_doc:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    for date_field in ['start_date', 'end_date', 'created_at']:
-        if isinstance(event_doc.get(date_field), str):
-            event_doc[date_field] = datetime.fromisoformat(event_doc[date_field])
-    
     return Event(**event_doc)
 
 
 @api_router.post("/events", response_model=Event)
-async def create_event(event_data: EventCreate, admin: User = Depends(get_admin_user)):
+async def create_event(event_data: EventCreate, admin: User = Depends(get_admin_user),
+                       repos: Repositories = Depends(get_repositories)):
     event = Event(
         **event_data.model_dump(),
         available_seats=event_data.capacity
     )
     
-    event_doc = event.model_dump()
-    for date_field in ['start_date', 'end_date', 'created_at']:
-        event_doc[date_field] = event_doc[date_field].isoformat()
-    
-    await db.events.insert_one(event_doc)
+    await repos.events.insert(event.model_dump())
+    query_cache.invalidate("events")
     return event
 
 
 @api_router.put("/events/{event_id}", response_model=Event)
-async def update_event(event_id: str, event_data: EventCreate, admin: User = Depends(get_admin_user)):
-    existing_event = await db.events.find_one({"id": event_id})
-    if not existing_event:
+async def update_event(event_id: str, event_data: EventCreate, admin: User = Depends(get_admin_user),
+                       repos: Repositories = Depends(get_repositories)):
+    updated_event = await repos.events.update(event_id, event_data.model_dump())
+    if not updated_event:
         raise HTTPException(status_code=404, detail="Event not found")
-    
-    update_data = event_data.model_dump()
-    for date_field in ['start_date', 'end_date']:
-        if date_field in update_data:
-            update_data[date_field] = update_data[date_field].isoformat()
-    
-    await db.events.update_one({"id": event_id}, {"$set": update_data})
-    
-    updated_event = await db.events.find_one({"id": event_id}, {"_id": 0})
-    for date_field in ['start_date', 'end_date', 'created_at']:
-        if isinstance(updated_event.get(date_field), str):
-            updated_event[date_field] = datetime.fromisoformat(updated_event[date_field])
+    query_cache.invalidate("events")
     
     return Event(**updated_event)
 
 
 @api_router.delete("/events/{event_id}")
-async def delete_event(event_id: str, admin: User = Depends(get_admin_user)):
-    result = await db.events.delete_one({"id": event_id})
-    if result.deleted_count == 0:
+async def delete_event(event_id: str, admin: User = Depends(get_admin_user),
+                       repos: Repositories = Depends(get_repositories),
+                       cascade: CascadeCleaner = Depends(get_cascade)):
+    if not await repos.events.delete(event_id):
         raise HTTPException(status_code=404, detail="Event not found")
+    query_cache.invalidate("events")
+    # Registrations and sessions are removed in batches after we respond
+    cascade.enqueue("events", event_id)
     return {"message": "Event deleted successfully"}
 
 
 # ==================== REGISTRATIONS ENDPOINTS ====================
 
 @api_router.post("/registrations", response_model=Registration)
-async def create_registration(reg_data: RegistrationCreate, current_user: User = Depends(get_current_user)):
-    # Check event exists and has available seats
-    event = await db.events.find_one({"id": reg_data.event_id})
+async def create_registration(reg_data: RegistrationCreate, current_user: User = Depends(get_current_user),
+                              repos: Repositories = Depends(get_repositories),
+                              outbox_worker: Optional[OutboxWorker] = Depends(get_outbox_worker),
+                              idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+                              admission_token: Optional[str] = Header(None, alias="Admission-Token")):
+    # The one read of the event, the hottest document during a flash sale
+    event = await repos.events.get(reg_data.event_id, projection=["id", "ticket_price", "waiting_room"])
+
+    def authorize():
+        if event and event.get('waiting_room'):
+            admission_tokens.verify(admission_token, current_user.id, reg_data.event_id)
+
+    # The token is left out of the fingerprint: every waiting-room poll issues a
+    # new one, so a retry after a lost response usually carries a different (or
+    # expired) token and must still replay the registration
+    return await idempotent(
+        repos, current_user, idempotency_key, "POST /registrations", reg_data.model_dump(),
+        lambda: _register(reg_data, event, current_user, repos, outbox_worker), authorize,
+    )
+
+
+async def _register(reg_data: RegistrationCreate, event: Optional[dict], current_user: User, repos: Repositories,
+                    outbox_worker: Optional[OutboxWorker] = None):
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    if event['available_seats'] <= 0:
-        raise HTTPException(status_code=400, detail="No seats available")
-    
     # Check if already registered
-    existing_reg = await db.registrations.find_one({
-        "event_id": reg_data.event_id,
-        "user_id": current_user.id
-    })
-    if existing_reg:
+    if await repos.registrations.exists({"event_id": reg_data.event_id, "user_id": current_user.id}):
         raise HTTPException(status_code=400, detail="Already registered for this event")
     
+    if not await repos.events.reserve_seat(reg_data.event_id):
+        raise HTTPException(status_code=400, detail="No seats available")
+    
     registration = Registration(
         event_id=reg_data.event_id,
         user_id=current_user.id,
@@ -465,104 +897,162 @@ async def create_registration(reg_data: RegistrationCreate, current_user: User =
         payment_amount=event['ticket_price']
     )
     
-    reg_doc = registration.model_dump()
-    reg_doc['registration_date'] = reg_doc['registration_date'].isoformat()
-    
-    await db.registrations.insert_one(reg_doc)
+    # Confirmation and receipt emails are sent by the outbox worker
+    doc = registration.model_dump()
+    try:
+        await repos.registrations.insert_with(
+            doc, repos.outbox, registration_messages(doc, registration.registration_date),
+        )
+    except DuplicateKeyError:
+        # A concurrent request by the same user registered first
+        await repos.events.adjust_seats(reg_data.event_id, 1)
+        raise HTTPException(status_code=400, detail="Already registered for this event")
+    except BaseException:
+        await repos.events.adjust_seats(reg_data.event_id, 1)
+        raise
+    if outbox_worker is not None:
+        outbox_worker.notify()
     
-    # Update available seats
-    await db.events.update_one(
-        {"id": reg_data.event_id},
-        {"$inc": {"available_seats": -1}}
-    )
+    try:
+        await repos.registration_rollups.record(registration.model_dump())
+    except Exception:
+        # The registration is committed; `python analytics.py rebuild` repairs the drift
+        logger.exception("Failed to update registration rollups for %s", registration.id)
     
     return registration
 
 
 @api_router.get("/registrations/my", response_model=List[Registration])
-async def get_my_registrations(current_user: User = Depends(get_current_user)):
-    registrations = await db.registrations.find(
-        {"user_id": current_user.id},
-        {"_id": 0}
-    ).to_list(1000)
-    
-    for reg in registrations:
-        if isinstance(reg.get('registration_date'), str):
-            reg['registration_date'] = datetime.fromisoformat(reg['registration_date'])
-    
-    return registrations
+async def get_my_registrations(include_archived: bool = False, current_user: User = Depends(get_current_user),
+                               repos: Repositories = Depends(get_repositories)):
+    query = {"user_id": current_user.id}
+    if include_archived:
+        return await repos.registrations.find_with_archive(query, sort=[("registration_date", -1)])
+    return await repos.registrations.find(query)
 
 
 @api_router.get("/registrations", response_model=List[Registration])
-async def get_all_registrations(admin: User = Depends(get_admin_user)):
-    registrations = await db.registrations.find({}, {"_id": 0}).to_list(1000)
-    
-    for reg in registrations:
-        if isinstance(reg.get('registration_date'), str):
-            reg['registration_date'] = datetime.fromisoformat(reg['registration_date'])
-    
-    return registrations
+async def get_all_registrations(event_id: Optional[str] = None, include_archived: bool = False,
+                                admin: User = Depends(get_admin_user),
+                                repos: Repositories = Depends(get_repositories)):
+    query = {}
+    if event_id:
+        query['event_id'] = event_id
+    if include_archived:
+        return await repos.registrations.find_with_archive(query)
+    return await repos.registrations.find(query)
+
+
+# ==================== WAITING ROOM ENDPOINTS ====================
+
+def waiting_room_summary(room, now):
+    admitted = waiting_room.admitted_through(room, now)
+    return WaitingRoom(
+        event_id=room["id"], enabled=room["enabled"], admit_per_second=room["admit_per_second"],
+        issued=room["issued"], admitted_through=admitted, waiting=room["issued"] - admitted,
+    )
+
+
+@api_router.put("/events/{event_id}/waiting-room", response_model=WaitingRoom)
+async def configure_waiting_room(event_id: str, config: WaitingRoomConfig, admin: User = Depends(get_admin_user),
+                                 repos: Repositories = Depends(get_repositories)):
+    """Open, close or change the admission rate of an event's waiting room.
+    While open, registering for the event requires an admission token."""
+    if not await repos.events.exists({"id": event_id}):
+        raise HTTPException(status_code=404, detail="Event not found")
+    now = datetime.now(timezone.utc)
+    room = await waiting_room.configure(repos, event_id, config.enabled, config.admit_per_second, now)
+    await repos.events.update(event_id, {"waiting_room": config.enabled})
+    query_cache.invalidate("events")
+    return waiting_room_summary(room, now)
+
+
+@api_router.get("/events/{event_id}/waiting-room/summary", response_model=WaitingRoom)
+async def get_waiting_room_summary(event_id: str, admin: User = Depends(get_admin_user),
+                                   repos: Repositories = Depends(get_repositories)):
+    room = await repos.waiting_rooms.get(event_id)
+    if not room:
+        raise HTTPException(status_code=404, detail="Waiting room not found")
+    return waiting_room_summary(room, datetime.now(timezone.utc))
+
+
+@api_router.post("/events/{event_id}/waiting-room", response_model=WaitingRoomStatus)
+async def join_waiting_room(event_id: str, current_user: User = Depends(get_current_user),
+                            repos: Repositories = Depends(get_repositories)):
+    """Take a place in the queue (joining twice keeps the first place)."""
+    room = await repos.waiting_rooms.get(event_id)
+    if not room or not room["enabled"]:
+        raise HTTPException(status_code=404, detail="This event has no open waiting room")
+    now = datetime.now(timezone.utc)
+    entry = await waiting_room.join(repos, room, current_user.id, now)
+    room = await repos.waiting_rooms.get(event_id)
+    return waiting_room.room_status(room, entry, admission_tokens, now)
+
+
+@api_router.get("/events/{event_id}/waiting-room", response_model=WaitingRoomStatus)
+async def get_waiting_room_status(event_id: str, current_user: User = Depends(get_current_user),
+                                  repos: Repositories = Depends(get_repositories)):
+    """Queue position; includes an admission token once admitted. Poll again
+    after ``poll_after_seconds``."""
+    room, entry = await asyncio.gather(
+        repos.waiting_rooms.get(event_id),
+        repos.waiting_room_entries.lookup(event_id, current_user.id),
+    )
+    if not room or not entry:
+        raise HTTPException(status_code=404, detail="Not in this event's waiting room")
+    return waiting_room.room_status(room, entry, admission_tokens, datetime.now(timezone.utc))
 
 
 # ==================== AWARDS ENDPOINTS ====================
 
 @api_router.get("/awards", response_model=List[Award])
-async def get_awards(status: Optional[str] = None, year: Optional[int] = None):
+async def get_awards(status: Optional[str] = None, year: Optional[int] = None,
+                     repos: Repositories = Depends(get_catalog_repositories)):
     query = {}
     if status:
         query['status'] = status
     if year:
         query['year'] = year
     
-    awards = await db.awards.find(query, {"_id": 0}).sort("year", -1).to_list(1000)
-    
-    for award in awards:
-        for date_field in ['nomination_start', 'nomination_end', 'created_at']:
-            if isinstance(award.get(date_field), str):
-                award[date_field] = datetime.fromisoformat(award[date_field])
-    
-    return awards
+    return await coalesced("awards", query, lambda: repos.awards.find(query, sort=[("year", -1)]))
 
 
 @api_router.post("/awards", response_model=Award)
-async def create_award(award_data: AwardCreate, admin: User = Depends(get_admin_user)):
+async def create_award(award_data: AwardCreate, admin: User = Depends(get_admin_user),
+                       repos: Repositories = Depends(get_repositories)):
     award = Award(**award_data.model_dump())
     
-    award_doc = award.model_dump()
-    for date_field in ['nomination_start', 'nomination_end', 'created_at']:
-        award_doc[date_field] = award_doc[date_field].isoformat()
-    
-    await db.awards.insert_one(award_doc)
+    await repos.awards.insert(award.model_dump())
     return award
 
 
 @api_router.put("/awards/{award_id}", response_model=Award)
-async def update_award(award_id: str, award_data: AwardCreate, admin: User = Depends(get_admin_user)):
-    existing_award = await db.awards.find_one({"id": award_id})
-    if not existing_award:
+async def update_award(award_id: str, award_data: AwardCreate, admin: User = Depends(get_admin_user),
+                       repos: Repositories = Depends(get_repositories)):
+    updated_award = await repos.awards.update(award_id, award_data.model_dump())
+    if not updated_award:
         raise HTTPException(status_code=404, detail="Award not found")
     
-    update_data = award_data.model_dump()
-    for date_field in ['nomination_start', 'nomination_end']:
-        if date_field in update_data:
-            update_data[date_field] = update_data[date_field].isoformat()
-    
-    await db.awards.update_one({"id": award_id}, {"$set": update_data})
-    
-    updated_award = await db.awards.find_one({"id": award_id}, {"_id": 0})
-    for date_field in ['nomination_start', 'nomination_end', 'created_at']:
-        if isinstance(updated_award.get(date_field), str):
-            updated_award[date_field] = datetime.fromisoformat(updated_award[date_field])
-    
     return Award(**updated_award)
 
 
 # ==================== NOMINATIONS ENDPOINTS ====================
 
 @api_router.post("/nominations", response_model=Nomination)
-async def create_nomination(nom_data: NominationCreate, current_user: User = Depends(get_current_user)):
+async def create_nomination(nom_data: NominationCreate, current_user: User = Depends(get_current_user),
+                            repos: Repositories = Depends(get_repositories),
+                            write_buffers: Dict[str, writebehind.WriteBehindBuffer] = Depends(get_write_buffers),
+                            idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    return await idempotent(
+        repos, current_user, idempotency_key, "POST /nominations", nom_data,
+        lambda: _nominate(nom_data, current_user, repos, write_buffers),
+    )
+
+
+async def _nominate(nom_data: NominationCreate, current_user: User, repos: Repositories,
+                    write_buffers: Optional[Dict[str, writebehind.WriteBehindBuffer]] = None):
     # Check award exists and is open
-    award = await db.awards.find_one({"id": nom_data.award_id})
+    award = await repos.awards.get(nom_data.award_id, projection=["id", "status"])
     if not award:
         raise HTTPException(status_code=404, detail="Award not found")
     
@@ -574,94 +1064,137 @@ async def create_nomination(nom_data: NominationCreate, current_user: User = Dep
         nominated_by_user_id=current_user.id
     )
     
-    nom_doc = nomination.model_dump()
-    nom_doc['created_at'] = nom_doc['created_at'].isoformat()
-    
-    await db.nominations.insert_one(nom_doc)
-    return nomination
+    # Group with earlier nominations of the same nominee for this award
+    doc = await assign_cluster(repos.nominations, nomination.model_dump())
+    await writebehind.insert(write_buffers or {}, repos.nominations, doc)
+    return Nomination(**doc)
 
 
 @api_router.get("/nominations", response_model=List[Nomination])
-async def get_nominations(award_id: Optional[str] = None, admin: User = Depends(get_admin_user)):
+async def get_nominations(award_id: Optional[str] = None, include_archived: bool = False,
+                          exclude_duplicates: bool = False,
+                          admin: User = Depends(get_admin_user),
+                          repos: Repositories = Depends(get_repositories)):
     query = {}
     if award_id:
         query['award_id'] = award_id
+    if exclude_duplicates:
+        query['is_duplicate'] = {"$ne": True}
     
-    nominations = await db.nominations.find(query, {"_id": 0}).to_list(1000)
-    
-    for nom in nominations:
-        if isinstance(nom.get('created_at'), str):
-            nom['created_at'] = datetime.fromisoformat(nom['created_at'])
-    
-    return nominations
+    if include_archived:
+        return await repos.nominations.find_with_archive(query)
+    return await repos.nominations.find(query)
+
+
+@api_router.post("/nominations/bulk-status", response_model=BulkStatusResult)
+async def bulk_update_nomination_status(payload: NominationBulkStatus, admin: User = Depends(get_admin_user),
+                                        repos: Repositories = Depends(get_repositories)):
+    changes = [change.model_dump() for change in payload.changes]
+    try:
+        results = await set_nomination_statuses(repos, changes)
+    except ModerationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return bulk_status_result(changes, results)
+
+
+@api_router.get("/nominations/clusters", response_model=NominationClusters)
+async def get_nomination_clusters(
+    award_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    max_members: int = Query(20, ge=1, le=200),
+    admin: User = Depends(get_admin_user),
+    repos: Repositories = Depends(get_repositories),
+):
+    """Groups of nominations that look like the same nominee, largest first."""
+    sizes = await repos.nominations.cluster_sizes(award_id)
+    ranked = sorted(sizes.items(), key=lambda item: (-item[1], item[0]))
+    page_ids = [cluster_id for cluster_id, _ in ranked[(page - 1) * page_size:page * page_size]]
+    
+    members = await asyncio.gather(*(
+        repos.nominations.find({"cluster_id": cluster_id}, sort=[("created_at", 1)], limit=max_members)
+        for cluster_id in page_ids
+    ))
+    
+    return NominationClusters(
+        award_id=award_id,
+        total_clusters=len(sizes),
+        duplicates=sum(sizes.values()),
+        page=page,
+        page_size=page_size,
+        clusters=[
+            NominationCluster(cluster_id=cluster_id, size=sizes[cluster_id] + 1, nominations=docs)
+            for cluster_id, docs in zip(page_ids, members)
+        ]
+    )
 
 
 @api_router.get("/nominations/my", response_model=List[Nomination])
-async def get_my_nominations(current_user: User = Depends(get_current_user)):
-    nominations = await db.nominations.find(
-        {"nominated_by_user_id": current_user.id},
-        {"_id": 0}
-    ).to_list(1000)
-    
-    for nom in nominations:
-        if isinstance(nom.get('created_at'), str):
-            nom['created_at'] = datetime.fromisoformat(nom['created_at'])
-    
-    return nominations
+async def get_my_nominations(include_archived: bool = False, current_user: User = Depends(get_current_user),
+                             repos: Repositories = Depends(get_repositories)):
+    query = {"nominated_by_user_id": current_user.id}
+    if include_archived:
+        return await repos.nominations.find_with_archive(query, sort=[("created_at", -1)])
+    return await repos.nominations.find(query)
 
 
 # ==================== SPEAKERS ENDPOINTS ====================
 
-@api_router.get("/speakers", response_model=List[Speaker])
-async def get_speakers(featured: Optional[bool] = None):
-    query = {}
+def speaker_filters(
+    featured: Optional[bool] = None,
+    expertise: Optional[str] = None,
+    organization: Optional[str] = None,
+):
+    base = {}
     if featured is not None:
-        query['is_featured'] = featured
-    
-    speakers = await db.speakers.find(query, {"_id": 0}).to_list(1000)
-    
-    for speaker in speakers:
-        if isinstance(speaker.get('created_at'), str):
-            speaker['created_at'] = datetime.fromisoformat(speaker['created_at'])
+        base['is_featured'] = featured
+    selection = parse_facet_selection(SPEAKER_FACETS, {
+        "expertise": expertise,
+        "organization": organization,
+    })
+    return base, selection
+
+
+@api_router.get("/speakers", response_model=List[Speaker])
+async def get_speakers(filters: tuple = Depends(speaker_filters), repos: Repositories = Depends(get_catalog_repositories)):
+    base, selection = filters
+    query = build_query(base, SPEAKER_FACETS, selection)
     
-    return speakers
+    return await coalesced("speakers", query, lambda: repos.speakers.find(query))
+
+
+@api_router.get("/speakers/facets", response_model=FacetCounts)
+async def get_speaker_facets(filters: tuple = Depends(speaker_filters), repos: Repositories = Depends(get_catalog_repositories)):
+    base, selection = filters
+    return await cached_facet_counts(repos.speakers, base, SPEAKER_FACETS, selection)
 
 
 @api_router.get("/speakers/{speaker_id}", response_model=Speaker)
-async def get_speaker(speaker_id: str):
-    speaker_doc = await db.speakers.find_one({"id": speaker_id}, {"_id": 0})
+async def get_speaker(speaker_id: str, repos: Repositories = Depends(get_catalog_repositories)):
+    speaker_doc = await coalesced("speakers/{id}", speaker_id, lambda: repos.speakers.get(speaker_id))
     if not speaker_doc:
         raise HTTPException(status_code=404, detail="Speaker not found")
     
-    if isinstance(speaker_doc.get('created_at'), str):
-        speaker_doc['created_at'] = datetime.fromisoformat(speaker_doc['created_at'])
-    
     return Speaker(**speaker_doc)
 
 
 @api_router.post("/speakers", response_model=Speaker)
-async def create_speaker(speaker_data: SpeakerCreate, admin: User = Depends(get_admin_user)):
+async def create_speaker(speaker_data: SpeakerCreate, admin: User = Depends(get_admin_user),
+                         repos: Repositories = Depends(get_repositories)):
     speaker = Speaker(**speaker_data.model_dump())
     
-    speaker_doc = speaker.model_dump()
-    speaker_doc['created_at'] = speaker_doc['created_at'].isoformat()
-    
-    await db.speakers.insert_one(speaker_doc)
+    await repos.speakers.insert(speaker.model_dump())
+    query_cache.invalidate("speakers")
     return speaker
 
 
 @api_router.put("/speakers/{speaker_id}", response_model=Speaker)
-async def update_speaker(speaker_id: str, speaker_data: SpeakerCreate, admin: User = Depends(get_admin_user)):
-    existing_speaker = await db.speakers.find_one({"id": speaker_id})
-    if not existing_speaker:
+async def update_speaker(speaker_id: str, speaker_data: SpeakerCreate, admin: User = Depends(get_admin_user),
+                         repos: Repositories = Depends(get_repositories)):
+    updated_speaker = await repos.speakers.update(speaker_id, speaker_data.model_dump())
+    if not updated_speaker:
         raise HTTPException(status_code=404, detail="Speaker not found")
-    
-    update_data = speaker_data.model_dump()
-    await db.speakers.update_one({"id": speaker_id}, {"$set": update_data})
-    
-    updated_speaker = await db.speakers.find_one({"id": speaker_id}, {"_id": 0})
-    if isinstance(updated_speaker.get('created_at'), str):
-        updated_speaker['created_at'] = datetime.fromisoformat(updated_speaker['created_at'])
+    query_cache.invalidate("speakers")
     
     return Speaker(**updated_speaker)
 
@@ -669,103 +1202,145 @@ async def update_speaker(speaker_id: str, speaker_data: SpeakerCreate, admin: Us
 # ==================== SESSIONS ENDPOINTS ====================
 
 @api_router.get("/sessions", response_model=List[Session])
-async def get_sessions(event_id: Optional[str] = None):
+async def get_sessions(event_id: Optional[str] = None, repos: Repositories = Depends(get_catalog_repositories)):
     query = {}
     if event_id:
         query['event_id'] = event_id
     
-    sessions = await db.sessions.find(query, {"_id": 0}).sort("start_time", 1).to_list(1000)
-    
-    for session in sessions:
-        for date_field in ['start_time', 'end_time', 'created_at']:
-            if isinstance(session.get(date_field), str):
-                session[date_field] = datetime.fromisoformat(session[date_field])
-    
-    return sessions
+    return await coalesced("sessions", query, lambda: repos.sessions.find(query, sort=[("start_time", 1)]))
 
 
 @api_router.post("/sessions", response_model=Session)
-async def create_session(session_data: SessionCreate, admin: User = Depends(get_admin_user)):
+async def create_session(session_data: SessionCreate, admin: User = Depends(get_admin_user),
+                         repos: Repositories = Depends(get_repositories)):
     session = Session(**session_data.model_dump())
     
-    session_doc = session.model_dump()
-    for date_field in ['start_time', 'end_time', 'created_at']:
-        session_doc[date_field] = session_doc[date_field].isoformat()
-    
-    await db.sessions.insert_one(session_doc)
+    await repos.sessions.insert(session.model_dump())
     return session
 
 
 # ==================== INQUIRIES ENDPOINTS ====================
 
 @api_router.post("/inquiries", response_model=Inquiry)
-async def create_inquiry(inquiry_data: InquiryCreate):
+async def create_inquiry(inquiry_data: InquiryCreate, repos: Repositories = Depends(get_repositories),
+                         write_buffers: Dict[str, writebehind.WriteBehindBuffer] = Depends(get_write_buffers)):
     inquiry = Inquiry(**inquiry_data.model_dump())
     
-    inquiry_doc = inquiry.model_dump()
-    inquiry_doc['created_at'] = inquiry_doc['created_at'].isoformat()
-    
-    await db.inquiries.insert_one(inquiry_doc)
+    await writebehind.insert(write_buffers, repos.inquiries, inquiry.model_dump())
     return inquiry
 
 
 @api_router.get("/inquiries", response_model=List[Inquiry])
-async def get_inquiries(admin: User = Depends(get_admin_user)):
-    inquiries = await db.inquiries.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+async def get_inquiries(admin: User = Depends(get_admin_user), repos: Repositories = Depends(get_repositories)):
+    return await repos.inquiries.find(sort=[("created_at", -1)])
+
+
+@api_router.post("/inquiries/bulk-status", response_model=BulkStatusResult)
+async def bulk_update_inquiry_status(payload: InquiryBulkStatus, admin: User = Depends(get_admin_user),
+                                     repos: Repositories = Depends(get_repositories)):
+    changes = [change.model_dump() for change in payload.changes]
+    try:
+        results = await set_inquiry_statuses(repos, changes, datetime.now(timezone.utc))
+    except ModerationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    for inquiry in inquiries:
-        if isinstance(inquiry.get('created_at'), str):
-            inquiry['created_at'] = datetime.fromisoformat(inquiry['created_at'])
+    return bulk_status_result(changes, results)
+
+
+@api_router.put("/inquiries/{inquiry_id}/status", response_model=Inquiry)
+async def update_inquiry_status(inquiry_id: str, update: InquiryStatusUpdate, admin: User = Depends(get_admin_user),
+                                repos: Repositories = Depends(get_repositories)):
+    inquiry = await repos.inquiries.set_status(inquiry_id, update.status, datetime.now(timezone.utc))
+    if not inquiry:
+        raise HTTPException(status_code=404, detail="Inquiry not found")
     
-    return inquiries
+    return Inquiry(**inquiry)
 
 
 # ==================== CALENDAR EXPORT ====================
 
 @api_router.get("/events/{event_id}/calendar")
-async def export_event_calendar(event_id: str):
-    event_doc = await db.events.find_one({"id": event_id}, {"_id": 0})
+async def export_event_calendar(event_id: str, repos: Repositories = Depends(get_catalog_repositories)):
+    event_doc = await coalesced("events/{id}", event_id, lambda: repos.events.get(event_id))
     if not event_doc:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    # Parse dates
-    for date_field in ['start_date', 'end_date']:
-        if isinstance(event_doc.get(date_field), str):
-            event_doc[date_field] = datetime.fromisoformat(event_doc[date_field])
-    
-    # Create calendar
-    cal = Calendar()
-    cal.add('prodid', '-//TCPWorld Conference//tcpworld.ai//')
-    cal.add('version', '2.0')
-    
-    # Create event
-    ical_event = ICalEvent()
-    ical_event.add('summary', event_doc['title'])
-    ical_event.add('dtstart', event_doc['start_date'])
-    ical_event.add('dtend', event_doc['end_date'])
-    ical_event.add('description', event_doc['description'])
-    ical_event.add('location', f"{event_doc['venue']}, {event_doc['city']}, {event_doc['country']}")
-    ical_event.add('uid', event_id)
-    
-    cal.add_component(ical_event)
-    
     return {
-        "calendar_data": cal.to_ical().decode('utf-8'),
-        "filename": f"{event_doc['title'].replace(' ', '_')}.ics"
+        "calendar_data": event_calendar(event_doc).decode('utf-8'),
+        "filename": calendar_filename(event_doc)
     }
 
 
+# ==================== SEARCH ENDPOINTS ====================
+
+MAX_SEARCH_PAGE = 20  # deep pages would make every collection return page * page_size candidates
+
+
+@api_router.get("/search", response_model=SearchResults)
+async def search(
+    q: str = Query(..., min_length=2, max_length=200),
+    types: Optional[str] = None,
+    page: int = Query(1, ge=1, le=MAX_SEARCH_PAGE),
+    page_size: int = Query(20, ge=1, le=50),
+    repos: Repositories = Depends(get_catalog_repositories),
+):
+    requested = SEARCH_TYPES
+    if types:
+        requested = list(dict.fromkeys(t.strip() for t in types.split(',') if t.strip()))
+        unknown = [t for t in requested if t not in SEARCH_TYPES]
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown search types: {', '.join(unknown)}. Allowed: {', '.join(SEARCH_TYPES)}"
+            )
+    
+    skip = (page - 1) * page_size
+    hits, counts = await coalesced(
+        "search", [q, requested, skip, page_size],
+        lambda: search_catalog(repos, q, requested, skip, page_size),
+    )
+    
+    return SearchResults(
+        query=q,
+        page=page,
+        page_size=page_size,
+        total=sum(counts.values()),
+        counts=counts,
+        hits=hits
+    )
+
+
+# ==================== OUTBOX ENDPOINTS ====================
+
+@api_router.get("/outbox/stats")
+async def get_outbox_stats(admin: User = Depends(get_admin_user), repos: Repositories = Depends(get_repositories)):
+    """Outbox messages per state (pending, processing, sent, discarded, dead)."""
+    return {"workers": OUTBOX_WORKERS, "states": await repos.outbox.state_counts()}
+
+
+@api_router.post("/outbox/{message_id}/retry")
+async def retry_outbox_message(message_id: str, admin: User = Depends(get_admin_user),
+                               repos: Repositories = Depends(get_repositories),
+                               outbox_worker: Optional[OutboxWorker] = Depends(get_outbox_worker)):
+    message = await repos.outbox.requeue(message_id, datetime.now(timezone.utc))
+    if not message:
+        raise HTTPException(status_code=404, detail="Dead outbox message not found")
+    if outbox_worker is not None:
+        outbox_worker.notify()
+    return {"message": "Message requeued", "id": message_id}
+
+
 # ==================== STATISTICS ENDPOINTS ====================
 
 @api_router.get("/stats/overview")
-async def get_overview_stats(admin: User = Depends(get_admin_user)):
-    total_events = await db.events.count_documents({})
-    upcoming_events = await db.events.count_documents({"status": "upcoming"})
-    total_registrations = await db.registrations.count_documents({})
-    total_users = await db.users.count_documents({})
-    total_speakers = await db.speakers.count_documents({})
-    total_awards = await db.awards.count_documents({})
-    total_nominations = await db.nominations.count_documents({})
+async def get_overview_stats(admin: User = Depends(get_admin_user), repos: Repositories = Depends(get_repositories)):
+    total_events = await repos.events.count()
+    upcoming_events = await repos.events.count({"status": "upcoming"})
+    total_registrations = await repos.registrations.count()
+    total_users = await repos.users.count()
+    total_speakers = await repos.speakers.count()
+    total_awards = await repos.awards.count()
+    total_nominations = await repos.nominations.count()
     
     return {
         "total_events": total_events,
@@ -778,6 +1353,117 @@ async def get_overview_stats(admin: User = Depends(get_admin_user)):
     }
 
 
+@api_router.get("/stats/write-behind")
+async def get_write_behind_stats(admin: User = Depends(get_admin_user),
+                                 write_buffers: Dict[str, writebehind.WriteBehindBuffer] = Depends(get_write_buffers)):
+    """Documents and batches written by each write-behind buffer."""
+    return {"mode": WRITE_BEHIND or "off", "collections": {name: buffer.stats for name, buffer in write_buffers.items()}}
+
+
+@api_router.get("/stats/coalescing")
+async def get_coalescing_stats(top: int = Query(20, ge=1, le=200), admin: User = Depends(get_admin_user)):
+    """How many catalog reads were collapsed onto another caller's query,
+    per route and for the most-collapsed keys."""
+    return {"enabled": COALESCE_READS, **single_flight.metrics(top)}
+
+
+# ==================== ANALYTICS ENDPOINTS ====================
+
+# Longest range /analytics/registrations/daily will fill
+MAX_ANALYTICS_DAYS = 3660
+
+
+def event_analytics(event_id, event, rollup):
+    """Join an event's seats with its registration rollup; either may be missing."""
+    result = EventAnalytics(event_id=event_id)
+    if rollup:
+        result.registrations, result.revenue = rollup["registrations"], round(rollup["revenue"], 2)
+    if event:
+        result.title, result.status = event["title"], event["status"]
+        result.capacity, result.available_seats = event["capacity"], event["available_seats"]
+        if event["capacity"] > 0:
+            result.sell_through = round((event["capacity"] - event["available_seats"]) / event["capacity"], 4)
+    return result
+
+
+@api_router.get("/analytics/registrations/daily", response_model=List[DailyRegistrations])
+async def get_daily_registrations(start: Optional[date] = None, end: Optional[date] = None,
+                                  event_id: Optional[str] = None, admin: User = Depends(get_admin_user),
+                                  repos: Repositories = Depends(get_repositories)):
+    """Registrations and booked revenue per UTC day, zero-filled; the last
+    30 days by default."""
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    days = (end - start).days + 1
+    if days < 1 or days > MAX_ANALYTICS_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must cover 1 to {MAX_ANALYTICS_DAYS} days")
+    
+    rollups = await repos.registration_rollups.daily(start.isoformat(), end.isoformat(), event_id)
+    by_day = {doc["day"]: doc for doc in rollups}
+    series = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        doc = by_day.get(day, {"registrations": 0, "revenue": 0})
+        series.append(DailyRegistrations(day=day, registrations=doc["registrations"], revenue=round(doc["revenue"], 2)))
+    return series
+
+
+@api_router.get("/analytics/revenue/events", response_model=List[EventAnalytics])
+async def get_event_revenue(limit: int = Query(20, ge=1, le=500), admin: User = Depends(get_admin_user),
+                            repos: Repositories = Depends(get_repositories)):
+    """Events with the most booked revenue, with their sell-through."""
+    rollups = await repos.registration_rollups.top("event", limit)
+    events = await repos.events.find(
+        {"id": {"$in": [doc["event_id"] for doc in rollups]}}, limit=len(rollups),
+        projection=["id", "title", "status", "capacity", "available_seats"],
+    )
+    by_id = {event["id"]: event for event in events}
+    return [event_analytics(doc["event_id"], by_id.get(doc["event_id"]), doc) for doc in rollups]
+
+
+@api_router.get("/analytics/revenue/ticket-types", response_model=List[TicketTypeRevenue])
+async def get_ticket_type_revenue(admin: User = Depends(get_admin_user),
+                                  repos: Repositories = Depends(get_repositories)):
+    rollups = await repos.registration_rollups.top("ticket_type", None)
+    return [
+        TicketTypeRevenue(ticket_type=doc["ticket_type"], registrations=doc["registrations"], revenue=round(doc["revenue"], 2))
+        for doc in rollups
+    ]
+
+
+@api_router.get("/analytics/sell-through", response_model=List[EventAnalytics])
+async def get_sell_through(event_status: str = Query("upcoming", alias="status"),
+                           limit: int = Query(50, ge=1, le=1000), admin: User = Depends(get_admin_user),
+                           repos: Repositories = Depends(get_repositories)):
+    """Events of one status ordered by the share of their capacity sold."""
+    events = await repos.events.sell_through(
+        event_status, limit, projection=["id", "title", "status", "capacity", "available_seats"],
+    )
+    rollups = await repos.registration_rollups.find(
+        {"id": {"$in": [rollup_id("event", {"event_id": event["id"]}) for event in events]}}, limit=len(events),
+    )
+    by_event = {doc["event_id"]: doc for doc in rollups}
+    return [event_analytics(event["id"], event, by_event.get(event["id"])) for event in events]
+
+
+# ==================== HEALTH ENDPOINTS ====================
+
+@api_router.get("/health")
+async def health(request: Request):
+    """Liveness: the process is up and serving, and startup has not given up."""
+    readiness = request.app.state.readiness
+    if readiness.failed:
+        return JSONResponse({"status": "failed", "error": readiness.error}, status_code=503)
+    return {"status": "ok"}
+
+
+@api_router.get("/ready")
+async def ready(request: Request):
+    """Readiness: indexes built, connection pool warm and caches primed."""
+    readiness = request.app.state.readiness
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+
 # ==================== ROOT ENDPOINT ====================
 
 @api_router.get("/")
@@ -801,8 +1487,12 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+
+if __name__ == "__main__":
+    args = startup.parse_args()
+    if args.profile_startup:
+        startup.print_import_profile("server", args.top)
+    else:
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port)
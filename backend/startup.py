@@ -0,0 +1,143 @@
+"""
+Startup readiness and import-time profiling.
+
+The API starts serving as soon as its modules are imported; index builds,
+connection pool warm-up and cache priming then run in the background and are
+recorded on a ``Readiness``. ``GET /api/health`` answers as soon as the process
+is up (and fails only if startup gave up), ``GET /api/ready`` only once every
+phase has finished, so load balancers and rolling restarts send traffic to warm
+workers only.
+
+Where boot time goes, per module:
+    python server.py --profile-startup
+"""
+import argparse
+import asyncio
+import importlib
+import logging
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+
+logger = logging.getLogger(__name__)
+
+# Used by every authenticated request but slow to import (``jose.jwt`` loads all
+# of its key backends): imported where used, and preloaded before ready.
+# Calendar export (icalendar) and password hashing (passlib) are rare enough to
+# load on first use only. motor is imported when the Mongo client is created.
+DEFERRED_IMPORTS = ("jose.jwt",)
+
+
+class Readiness:
+    """Progress of the startup phases that must finish before serving traffic.
+
+    A failing phase (say MongoDB is briefly unreachable during a deploy) is
+    retried with exponential backoff. After ``max_attempts`` the process is
+    marked failed, which also fails the liveness check so the orchestrator
+    restarts it instead of leaving it unready forever.
+    """
+
+    def __init__(self, max_attempts=8, base_backoff_seconds=0.5, max_backoff_seconds=30.0):
+        self.max_attempts = max_attempts
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.ready = False
+        self.failed = False
+        self.error = None
+        self.phases = {}    # name -> seconds taken, None while running
+        self._started = time.monotonic()
+
+    def backoff(self, attempt):
+        return min(self.base_backoff_seconds * 2 ** (attempt - 1), self.max_backoff_seconds)
+
+    async def phase(self, name, step):
+        """Run ``step()`` until it succeeds, at most ``max_attempts`` times;
+        the last failure is raised."""
+        self.phases[name] = None
+        started = time.monotonic()
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                result = await step()
+                break
+            except Exception as e:
+                self.error = f"{name}: {type(e).__name__}: {e}"
+                if attempt == self.max_attempts:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(
+                    "Startup phase %s failed (attempt %d of %d), retrying in %.1fs: %s",
+                    name, attempt, self.max_attempts, delay, e,
+                )
+                await asyncio.sleep(delay)
+        self.error = None
+        self.phases[name] = round(time.monotonic() - started, 3)
+        logger.info("Startup phase %s done in %.3fs", name, self.phases[name])
+        return result
+
+    def mark_ready(self):
+        self.ready = True
+        logger.info("Ready %.3fs after startup", time.monotonic() - self._started)
+
+    def mark_failed(self, error):
+        self.failed = True
+        self.error = f"{type(error).__name__}: {error}"
+
+    def status(self):
+        return {"ready": self.ready, "failed": self.failed, "phases": dict(self.phases), "error": self.error}
+
+
+async def preload(modules):
+    """Import ``modules`` in a worker thread, keeping the event loop free."""
+    for module in modules:
+        await asyncio.to_thread(importlib.import_module, module)
+
+
+# ==================== IMPORT PROFILE ====================
+
+def import_times(module="server"):
+    """Import ``module`` in a fresh interpreter with ``-X importtime`` and
+    return ``(name, self_us, cumulative_us)`` rows in import order."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def print_import_profile(module="server", top=30):
+    rows = import_times(module)
+    total = next((cumulative for name, _, cumulative in rows if name == module), 0)
+    print(f"import {module}: {total / 1000:.1f} ms")
+    print(f"\nSlowest {top} by cumulative time (includes submodules)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[2])[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+    # Time spent in each top-level package, wherever it was first imported from
+    packages = {}
+    for name, self_us, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"\nSlowest {top} top-level packages by self time")
+    print(f"{'self ms':>14}  package")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{self_us / 1000:>14.1f}  {package}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the TCPWorld API or profile its startup.")
+    parser.add_argument("--profile-startup", action="store_true", help="report import time per module and exit")
+    parser.add_argument("--top", type=int, default=30, help="rows per profile table")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    return parser.parse_args(argv)
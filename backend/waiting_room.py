@@ -0,0 +1,120 @@
+"""
+Virtual waiting room for flash-sale registrations.
+
+With a waiting room open on an event, users first join a FIFO queue and take
+the next position from a per-event counter. Positions are admitted at
+``admit_per_second``, and admitted users get a short-lived signed admission
+token which ``POST /registrations`` requires for that event. The registration
+path therefore sees at most the admission rate, however many users are
+queued.
+
+Admission is computed, not written: a room stores an anchor (``anchor_at``,
+``anchor_admitted``) and everyone up to
+``anchor_admitted + (now - anchor_at) * admit_per_second`` is admitted. So
+polling is read-only and every API worker agrees on the same answer. A join
+that would be admitted on arrival re-anchors the room at its own position, so
+admission capacity does not pile up while nobody is waiting.
+"""
+import uuid
+from datetime import timedelta
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+
+def admitted_through(room, now):
+    """Highest admitted position at ``now``, never beyond those issued."""
+    elapsed = max((now - room["anchor_at"]).total_seconds(), 0.0)
+    admitted = room["anchor_admitted"] + int(elapsed * room["admit_per_second"])
+    return min(admitted, room["issued"])
+
+
+async def configure(repos, event_id, enabled, admit_per_second, now):
+    """Open, close or re-rate a room. Positions admitted so far stay
+    admitted; a new rate applies from ``now``."""
+    room = await repos.waiting_rooms.get(event_id)
+    return await repos.waiting_rooms.save(event_id, {
+        "enabled": enabled,
+        "admit_per_second": admit_per_second,
+        "anchor_at": now,
+        "anchor_admitted": admitted_through(room, now) if room else 0,
+        "anchor_epoch": room.get("anchor_epoch", 0) + 1 if room else 0,
+        "updated_at": now,
+    })
+
+
+async def join(repos, room, user_id, now):
+    """Queue ``user_id`` in ``room`` (once) and return their entry."""
+    entry = await repos.waiting_room_entries.lookup(room["id"], user_id)
+    if entry is not None:
+        return entry
+    room = await repos.waiting_rooms.next_position(room["id"])
+    entry = {
+        "id": str(uuid.uuid4()), "event_id": room["id"], "user_id": user_id,
+        "position": room["issued"], "joined_at": now,
+    }
+    try:
+        await repos.waiting_room_entries.insert(dict(entry))
+    except DuplicateKeyError:
+        # A concurrent join by the same user won; its position stands
+        return await repos.waiting_room_entries.lookup(room["id"], user_id)
+    if admitted_through(room, now) >= entry["position"]:
+        # Admitted on arrival: the queue was idle and capacity piled up. Admit
+        # this position now and those after it at the room's rate from here.
+        await repos.waiting_rooms.reanchor(room, entry["position"], now)
+    return entry
+
+
+class AdmissionTokens:
+    """JWTs admitting one user to register for one event."""
+
+    def __init__(self, secret_key, algorithm="HS256", ttl_seconds=600):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.ttl_seconds = ttl_seconds
+
+    def issue(self, user_id, event_id, position, now):
+        from jose import jwt  # deferred: see startup.DEFERRED_IMPORTS
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+        token = jwt.encode(
+            {"sub": user_id, "event_id": event_id, "position": position, "exp": expires_at},
+            self.secret_key, algorithm=self.algorithm,
+        )
+        return token, expires_at
+
+    def verify(self, token, user_id, event_id):
+        from jose import JWTError, jwt
+        if not token:
+            raise HTTPException(
+                status_code=403, detail="This event has a waiting room; join it for an admission token",
+            )
+        try:
+            claims = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except JWTError:
+            raise HTTPException(status_code=403, detail="Invalid or expired admission token")
+        if claims.get("sub") != user_id or claims.get("event_id") != event_id:
+            raise HTTPException(status_code=403, detail="Admission token is for another user or event")
+        return claims
+
+
+def room_status(room, entry, tokens, now):
+    """Queue position, admission state and, once admitted, a token."""
+    admitted = admitted_through(room, now)
+    ahead = max(entry["position"] - admitted, 0)
+    status = {
+        "event_id": room["id"],
+        "open": room["enabled"],
+        "position": entry["position"],
+        "admitted_through": admitted,
+        "ahead": ahead,
+        "estimated_wait_seconds": round(ahead / room["admit_per_second"], 1),
+        # Poll less often the further back in the queue
+        "poll_after_seconds": min(max(ahead / room["admit_per_second"] / 2, 1.0), 30.0),
+        "admission_token": None,
+        "token_expires_at": None,
+    }
+    if ahead == 0:
+        status["admission_token"], status["token_expires_at"] = tokens.issue(
+            entry["user_id"], room["id"], entry["position"], now,
+        )
+    return status
@@ -0,0 +1,133 @@
+"""
+Write-behind batching for high-volume public inserts.
+
+During award campaigns and after keynotes, inquiries and nominations arrive in
+bursts of thousands per minute, each costing one ``insert_one`` round-trip. A
+``WriteBehindBuffer`` collects validated documents and writes them with one
+``insert_many`` once ``max_batch`` are waiting or ``max_delay_seconds`` has
+passed, whichever comes first.
+
+Durability modes:
+    durable   the request waits until its batch is written (flush-before-ack);
+              the caller sees insert errors exactly as before
+    async     the request returns once the document is buffered, so it may
+              not be readable for up to one flush; documents still buffered
+              when the process dies are lost, and insert errors are only
+              logged
+
+Buffers are drained on shutdown. Opt in with ``WRITE_BEHIND=durable|async``.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODES = ("durable", "async")
+
+
+class WriteBehindBuffer:
+    def __init__(self, repo, durable=True, max_batch=500, max_delay_seconds=0.002, max_pending=10_000):
+        self.repo = repo
+        self.durable = durable
+        self.max_batch = max_batch
+        self.max_delay_seconds = max_delay_seconds
+        # In async mode, adding beyond this many buffered documents waits for a flush
+        self.max_pending = max_pending
+        self._pending = []      # [(doc, future or None)]
+        self._queued = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = None
+        self._closed = False
+        self.stats = {"documents": 0, "batches": 0, "errors": 0, "largest_batch": 0}
+
+    async def add(self, doc):
+        """Buffer ``doc`` for insertion; in durable mode, return once it is
+        written (raising its insert error, if any)."""
+        if self._closed:
+            await self.repo.insert(doc)
+            return
+        future = asyncio.get_running_loop().create_future() if self.durable else None
+        self._pending.append((dict(doc), future))
+        self._queued.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        if future is not None:
+            await future
+        elif len(self._pending) >= self.max_pending:
+            await self.flush()
+
+    async def flush(self):
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            await self._write(batch)
+
+    async def _write(self, batch):
+        errors = {}
+        try:
+            await self.repo.insert_many([doc for doc, _ in batch])
+        except Exception:
+            # Retry one by one to find out which documents failed
+            for i, (doc, _) in enumerate(batch):
+                doc.pop("_id", None)
+                try:
+                    if not await self.repo.exists({"id": doc["id"]}):
+                        await self.repo.insert(doc)
+                except Exception as e:
+                    errors[i] = e
+        self.stats["documents"] += len(batch) - len(errors)
+        self.stats["batches"] += 1
+        self.stats["errors"] += len(errors)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        if errors and not self.durable:
+            logger.error(
+                "Write-behind failed to insert %d %s: %s",
+                len(errors), self.repo.collection_name, next(iter(errors.values())),
+            )
+        for i, (_, future) in enumerate(batch):
+            if future is None or future.done():
+                continue
+            if i in errors:
+                future.set_exception(errors[i])
+            else:
+                future.set_result(None)
+
+    async def _run(self):
+        while not self._closed:
+            await self._queued.wait()
+            # The first buffered document waits at most max_delay_seconds
+            if len(self._pending) < self.max_batch and not self._closed:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            self._queued.clear()
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Write-behind flush of %s failed", self.repo.collection_name)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still buffered; later
+        adds are inserted directly."""
+        self._closed = True
+        if self._task is not None:
+            # Let a flush in progress finish rather than cancelling it mid-batch
+            self._queued.set()
+            self._full.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+async def insert(buffers, repo, doc):
+    """Insert ``doc`` through ``repo``'s buffer if it has one, else directly."""
+    buffer = buffers.get(repo.collection_name)
+    if buffer is None:
+        await repo.insert(doc)
+    else:
+        await buffer.add(doc)
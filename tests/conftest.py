@@ -0,0 +1,101 @@
+"""
+Shared fixtures. Everything runs against the in-memory backend, so the suite
+needs no MongoDB:
+    pip install -r backend/requirements-dev.txt
+    pytest
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Background jobs are driven explicitly by the tests that need them
+os.environ.update({
+    "DATA_BACKEND": "memory",
+    "LIFECYCLE_INTERVAL_SECONDS": "0",
+    "ARCHIVE_INTERVAL_SECONDS": "0",
+    "OUTBOX_WORKERS": "0",
+})
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from repositories import memory_repositories  # noqa: E402
+
+
+@pytest.fixture
+def repos():
+    repos = memory_repositories()
+    asyncio.run(repos.ensure_indexes())
+    return repos
+
+
+EVENT = {
+    "title": "Zero Trust Summit", "description": "All about zero trust", "event_type": "conference",
+    "start_date": "2030-03-01T09:00:00Z", "end_date": "2030-03-02T17:00:00Z",
+    "venue": "Hall A", "city": "Boston", "country": "USA", "capacity": 5, "ticket_price": 100,
+}
+
+AWARD = {
+    "title": "AI Leader", "category": "ai", "description": "Leadership in AI", "year": 2030,
+    "nomination_start": "2020-01-01T00:00:00Z", "nomination_end": "2030-12-01T00:00:00Z",
+}
+
+
+class Api:
+    """A ``TestClient`` over a freshly started app, with helpers for the
+    users and fixtures most tests need."""
+
+    def __init__(self, client, server):
+        self.client = client
+        self.server = server
+        self.repos = client.app.state.repos
+
+    def call(self, fn, *args):
+        """Run a coroutine function on the app's event loop."""
+        return self.client.portal.call(fn, *args)
+
+    def sign_up(self, email, admin=False):
+        response = self.client.post(
+            "/api/auth/register", json={"email": email, "password": "secret", "full_name": email.split("@")[0]},
+        )
+        assert response.status_code == 200, response.text
+        body = response.json()
+        if admin:
+            self.call(self.repos.users.collection.update_one, {"id": body["user"]["id"]}, {"$set": {"role": "admin"}})
+        return {"Authorization": f"Bearer {body['access_token']}"}
+
+    def create(self, path, headers, payload):
+        response = self.client.post(path, headers=headers, json=payload)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    def event(self, headers, **fields):
+        return self.create("/api/events", headers, {**EVENT, **fields})
+
+    def award(self, headers, **fields):
+        return self.create("/api/awards", headers, {**AWARD, **fields})
+
+
+@pytest.fixture
+def api():
+    import server
+
+    server.query_cache.invalidate(*[repo.collection_name for repo in memory_repositories().all()])
+    server.single_flight.reset()
+    with TestClient(server.app) as client:
+        yield Api(client, server)
+
+
+@pytest.fixture
+def admin(api):
+    return api.sign_up("admin@example.com", admin=True)
+
+
+@pytest.fixture
+def user(api):
+    return api.sign_up("user@example.com")
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+from archive import Archiver
+
+NOW = datetime(2030, 6, 1, tzinfo=timezone.utc)
+
+
+def registration(n, event_id):
+    return {"id": f"{event_id}-r{n}", "event_id": event_id, "user_id": f"u{n}", "registration_date": NOW}
+
+
+def nomination(n, award_id):
+    return {"id": f"{award_id}-n{n}", "award_id": award_id, "nominee_name": f"Nominee {n}", "created_at": NOW}
+
+
+def test_archiver_moves_finished_parents_once(repos):
+    async def scenario():
+        await repos.events.insert({"id": "old", "status": "completed", "end_date": NOW - timedelta(days=40)})
+        await repos.events.insert({"id": "recent", "status": "completed", "end_date": NOW - timedelta(days=5)})
+        await repos.registrations.insert_many(
+            [registration(n, "old") for n in range(5)] + [registration(n, "recent") for n in range(2)],
+        )
+        archiver = Archiver(repos, grace_days=30, batch_size=2)
+        first = await archiver.run_once(NOW)
+        second = await archiver.run_once(NOW)
+        history = await repos.registrations.find_with_archive({"event_id": "old"})
+        return first, second, await repos.registrations.count(), len(history)
+
+    first, second, live, history = asyncio.run(scenario())
+    assert first["registrations"] == 5
+    assert second["registrations"] == 0
+    assert live == 2
+    # Archived registrations stay readable
+    assert history == 5
+
+
+def test_nominations_of_announced_awards_are_archived(repos):
+    async def scenario():
+        ended = NOW - timedelta(days=40)
+        await repos.awards.insert({"id": "announced", "status": "announced", "nomination_end": ended})
+        await repos.awards.insert({"id": "closed", "status": "closed", "nomination_end": ended})
+        await repos.nominations.insert_many(
+            [nomination(n, "announced") for n in range(3)] + [nomination(n, "closed") for n in range(2)],
+        )
+        totals = await Archiver(repos, grace_days=30).run_once(NOW)
+        announced = await repos.awards.get("announced")
+        return totals, announced, await repos.nominations.distinct("award_id"), await repos.nominations_archive.count()
+
+    totals, announced, live, archived = asyncio.run(scenario())
+    assert totals["nominations"] == archived == 3
+    # Awards not yet announced keep their nominations live
+    assert live == ["closed"]
+    assert announced["archived_at"] == NOW
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from cleanup import CascadeCleaner, remove_duplicate_registrations, sweep_orphans
+from repositories import memory_repositories
+
+NOW = datetime(2030, 6, 1, tzinfo=timezone.utc)
+
+
+def registration(n, event_id):
+    return {"id": f"{event_id}-r{n}", "event_id": event_id, "user_id": f"u{n}", "registration_date": NOW}
+
+
+def nomination(n, award_id):
+    return {"id": f"{award_id}-n{n}", "award_id": award_id, "nominee_name": f"Nominee {n}", "created_at": NOW}
+
+
+def test_cascade_removes_dependents_in_batches(repos):
+    async def scenario():
+        await repos.events.insert({"id": "e1"})
+        await repos.events.insert({"id": "e2"})
+        await repos.registrations.insert_many([registration(n, "e1") for n in range(25)])
+        await repos.registrations.insert_many([registration(n, "e2") for n in range(3)])
+        await repos.sessions.insert({"id": "s1", "event_id": "e1"})
+        cleaner = CascadeCleaner(repos, batch_size=10)
+        cleaner.start()
+        await repos.events.delete("e1")
+        cleaner.enqueue("events", "e1")
+        await cleaner.join()
+        await cleaner.stop()
+        return await repos.registrations.count(), await repos.sessions.count()
+
+    # Only the deleted event's dependents are gone
+    assert asyncio.run(scenario()) == (3, 0)
+
+
+def test_sweeper_removes_orphans(repos):
+    async def scenario():
+        await repos.awards.insert({"id": "a1"})
+        await repos.nominations.insert_many([nomination(n, "a1") for n in range(2)] + [nomination(0, "gone")])
+        await repos.registrations.insert(registration(0, "gone"))
+        dry_run = await sweep_orphans(repos, dry_run=True)
+        deleted = await sweep_orphans(repos)
+        return dry_run, deleted, await repos.nominations.count(), await repos.registrations.count()
+
+    dry_run, deleted, nominations, registrations = asyncio.run(scenario())
+    assert dry_run["nominations"] == deleted["nominations"] == 1
+    assert dry_run["registrations"] == deleted["registrations"] == 1
+    assert (nominations, registrations) == (2, 0)
+
+
+def test_duplicate_registrations_are_removed_so_the_unique_index_builds(caplog):
+    repos = memory_repositories()
+
+    async def scenario():
+        # Written before the unique index existed
+        await repos.events.insert({"id": "e1", "available_seats": 7})
+        await repos.registrations.insert_many([
+            {**registration(0, "e1"), "id": f"r{n}", "registration_date": NOW.replace(minute=n)} for n in range(3)
+        ] + [registration(1, "e1")])
+        with caplog.at_level(logging.ERROR):
+            await repos.ensure_indexes()
+        found = await remove_duplicate_registrations(repos, dry_run=True)
+        deleted = await remove_duplicate_registrations(repos)
+        kept = [doc["id"] for doc in await repos.registrations.find({"user_id": "u0"})]
+        await repos.registrations.ensure_indexes()
+        with pytest.raises(DuplicateKeyError):
+            await repos.registrations.insert({**registration(0, "e1"), "id": "again"})
+        return found, deleted, kept, (await repos.events.get("e1"))["available_seats"]
+
+    found, deleted, kept, seats = asyncio.run(scenario())
+    # Startup logged the problem instead of failing
+    assert "python cleanup.py" in caplog.text
+    assert found["registrations"] == deleted["registrations"] == 2
+    assert kept == ["r0"]
+    assert seats == 9
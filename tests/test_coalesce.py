@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from coalesce import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": "e1"}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("events/{id}", "e1", fetch) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [{"id": "e1"}] * 10
+    assert flight.metrics()["routes"]["events/{id}"] == {"calls": 10, "executions": 1, "collapsed": 9, "errors": 0}
+
+
+def test_nothing_is_cached_after_completion():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def scenario():
+        return [await flight.do("r", "k", fetch), await flight.do("r", "k", fetch)]
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database down")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("r", "k", fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.metrics()["routes"]["r"]["errors"] == 3
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("r", "k", fetch))
+        second = asyncio.ensure_future(flight.do("r", "k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
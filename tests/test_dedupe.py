@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+import dedupe
+from dedupe import annotate, assign_cluster, rebuild_clusters, similarity, DUPLICATE_THRESHOLD
+
+
+def nominee(name, email, organization="TechCorp"):
+    return annotate({"nominee_name": name, "nominee_email": email, "nominee_organization": organization})["normalized"]
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Michael Chen", "Michelle Chen"),
+    ("Daniel Lee", "Danielle Lee"),
+    ("Ann Kim", "Anna Kim"),
+    ("John Smith", "Joan Smith"),
+])
+def test_similar_names_at_the_same_organization_are_different_people(a, b):
+    first = nominee(a, f"{a.split()[0].lower()}@techcorp.com")
+    second = nominee(b, f"{b.split()[0].lower()}@techcorp.com")
+    assert similarity(first, second) < DUPLICATE_THRESHOLD
+
+
+@pytest.mark.parametrize("a, b", [
+    (("Dr. Jane Doe", "jane.doe@techcorp.com", "TechCorp Inc."), ("jane doe", "jdoe@techcorp.com", "TechCorp")),
+    (("Jane A. Doe", "jane@techcorp.com", "TechCorp"), ("Doe, Jane", "jane.doe@other.com", "TechCorp Ltd")),
+    (("José Núñez", "jose@techcorp.com", "TechCorp"), ("Jose Nunez", "jnunez@techcorp.com", "Techcorp")),
+    # The same email is the same nominee, whatever the name says
+    (("Jane Doe", "Jane.Doe+awards@techcorp.com", "TechCorp"), ("J. Doe-Smith", "jane.doe@techcorp.com", "Other")),
+])
+def test_same_nominee_is_a_duplicate(a, b):
+    assert similarity(nominee(*a), nominee(*b)) >= DUPLICATE_THRESHOLD
+
+
+def test_same_name_at_another_organization_is_not_a_duplicate():
+    first = nominee("Jane Doe", "jane@techcorp.com", "TechCorp")
+    second = nominee("Jane Doe", "jane@bank.com", "First National Bank")
+    assert similarity(first, second) < DUPLICATE_THRESHOLD
+
+
+def test_clusters_on_insert_match_a_rebuild(repos):
+    submissions = [
+        ("Michael Chen", "michael@techcorp.com"), ("Michelle Chen", "michelle@techcorp.com"),
+        ("Dr. Michael Chen", "mchen@techcorp.com"), ("Ann Kim", "ann@techcorp.com"),
+        ("Anna Kim", "anna@techcorp.com"), ("Ann Kim", "ann@techcorp.com"),
+        ("Jane A. Doe", "jane@techcorp.com"), ("Doe, Jane", "jdoe@techcorp.com"),
+    ]
+
+    async def scenario():
+        for n, (name, email) in enumerate(submissions):
+            doc = await assign_cluster(repos.nominations, {
+                "id": f"n{n}", "award_id": "a1", "nominee_name": name, "nominee_email": email,
+                "nominee_organization": "TechCorp", "created_at": f"2030-01-01T00:00:0{n}+00:00",
+            })
+            await repos.nominations.collection.insert_one(doc)
+        on_insert = {doc["id"]: doc["cluster_id"] for doc in await repos.nominations.find()}
+        await rebuild_clusters(repos.nominations, "a1")
+        rebuilt = {doc["id"]: doc["cluster_id"] for doc in await repos.nominations.find()}
+        return on_insert, rebuilt
+
+    on_insert, rebuilt = asyncio.run(scenario())
+    assert on_insert == rebuilt == {
+        "n0": "n0", "n1": "n1", "n2": "n0", "n3": "n3", "n4": "n4", "n5": "n3", "n6": "n6", "n7": "n6",
+    }
+
+
+def test_seeded_nominations_are_clustered(repos):
+    import seed_data
+
+    data = seed_data.SyntheticData(seed_data.parse_args([
+        "--events", "2", "--users", "50", "--registrations", "10", "--awards", "2", "--nominations", "400",
+    ]))
+    docs = list(data.stream("nominations"))
+    assert all(doc["dedupe_keys"] and doc["normalized"] and doc["cluster_id"] for doc in docs)
+    assert any(doc["is_duplicate"] for doc in docs)
+
+    async def scenario():
+        await repos.nominations.collection.insert_many([dict(doc) for doc in docs])
+        for award_id in {doc["award_id"] for doc in docs}:
+            await rebuild_clusters(repos.nominations, award_id)
+        return {doc["id"]: doc["cluster_id"] for doc in await repos.nominations.find(limit=None)}
+
+    assert asyncio.run(scenario()) == {doc["id"]: doc["cluster_id"] for doc in docs}
+
+
+@pytest.mark.parametrize("a, b", [
+    (("Jon Smith", "jon@gmail.com", "TechCorp"), ("John Smith", "john.smith@techcorp.com", "TechCorp Inc.")),
+    (("Katherine Johnson", "kj@nasa.gov", "NASA"), ("Kathrine Johnson", "katherine.johnson@gmail.com", "NASA")),
+    (("Mohammed Al-Rashid", "mo@acme.com", "Acme"), ("Mohamed Al Rashid", "rashid@gmail.com", "Acme Ltd")),
+])
+def test_variant_spellings_are_duplicates(a, b):
+    assert similarity(nominee(*a), nominee(*b)) >= DUPLICATE_THRESHOLD
+
+
+def test_variant_spellings_at_other_organizations_are_not_duplicates():
+    first = nominee("Jon Smith", "jon@gmail.com", "TechCorp")
+    second = nominee("John Smith", "john@bank.com", "First National Bank")
+    assert similarity(first, second) < DUPLICATE_THRESHOLD
+
+
+def test_a_crowded_block_does_not_hide_a_match(repos, monkeypatch):
+    monkeypatch.setattr(dedupe, "MAX_CANDIDATES", 20)
+    # Many earlier M. Chens share the surname-and-initial block
+    submissions = [(f"Max{n} Chen", f"max{n}@corp{n}.com") for n in range(30)]
+    submissions += [("Michael Chen", "michael@techcorp.com"), ("Michael Chen", "michael.chen@gmail.com")]
+
+    async def scenario():
+        for n, (name, email) in enumerate(submissions):
+            doc = await assign_cluster(repos.nominations, {
+                "id": f"n{n}", "award_id": "a1", "nominee_name": name, "nominee_email": email,
+                "nominee_organization": "TechCorp", "created_at": f"2030-01-01T00:{n // 60:02d}:{n % 60:02d}+00:00",
+            })
+            await repos.nominations.collection.insert_one(doc)
+        return await repos.nominations.get("n31")
+
+    assert asyncio.run(scenario())["cluster_id"] == "n30"
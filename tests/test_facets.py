@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+from cache import QueryCache
+from facets import EVENT_FACETS, _facet_pipeline, parse_selection
+
+
+def event(n, city, price, month):
+    return {
+        "id": f"e{n}", "event_type": "conference", "city": city, "country": "USA",
+        "ticket_price": price, "start_date": datetime(2030, month, 1, tzinfo=timezone.utc), "status": "upcoming",
+    }
+
+
+EVENTS = [
+    event(1, "Boston", 0, 3), event(2, "Boston", 120, 3), event(3, "Seattle", 400, 4), event(4, "Austin", 2500, 4),
+]
+
+
+def counts(repos, selection):
+    async def scenario():
+        await repos.events.insert_many([dict(doc) for doc in EVENTS])
+        return await repos.events.facet_counts({"status": "upcoming"}, EVENT_FACETS, selection)
+    result = asyncio.run(scenario())
+    return result["total"], {name: {b["value"]: b["count"] for b in buckets} for name, buckets in result["facets"].items()}
+
+
+def test_counts_per_bucket(repos):
+    total, facets = counts(repos, {})
+    assert total == 4
+    assert facets["city"] == {"Boston": 2, "Seattle": 1, "Austin": 1}
+    assert facets["month"] == {"2030-03": 2, "2030-04": 2}
+    assert facets["price_band"] == {"free": 1, "under_250": 1, "250_to_1000": 1, "over_1000": 1}
+
+
+def test_counts_are_disjunctive(repos):
+    total, facets = counts(repos, {"city": ["Boston"]})
+    assert total == 2
+    # The selected facet still offers its other values
+    assert facets["city"] == {"Boston": 2, "Seattle": 1, "Austin": 1}
+    assert facets["price_band"] == {"free": 1, "under_250": 1}
+
+
+def test_selection_is_validated():
+    assert parse_selection(EVENT_FACETS, {"city": "Boston, Seattle,Boston"}) == {"city": ["Boston", "Seattle"]}
+    for params in ({"month": "2030-13"}, {"price_band": "cheap"}):
+        with pytest.raises(ValueError):
+            parse_selection(EVENT_FACETS, params)
+
+
+def test_cached_counts_see_new_events(api, admin):
+    api.event(admin, city="Boston")
+    assert api.client.get("/api/events/facets").json()["total"] == 1
+    api.event(admin, city="Seattle")
+    facets = api.client.get("/api/events/facets").json()
+    assert facets["total"] == 2
+    assert {b["value"] for b in facets["facets"]["city"]} == {"Boston", "Seattle"}
+
+
+def test_prices_outside_every_band_are_not_counted(repos):
+    async def scenario():
+        await repos.events.insert_many([
+            event(n, "Boston", price, 3) for n, price in enumerate([2500, -5, "free", None, True])
+        ])
+        return await repos.events.facet_counts({}, EVENT_FACETS, {})
+    result = asyncio.run(scenario())
+    assert result["facets"]["price_band"] == [{"value": "over_1000", "count": 1}]
+    # The aggregation drops them before $bucket, whose default is over_1000
+    price_stages = _facet_pipeline("price_band", EVENT_FACETS["price_band"], EVENT_FACETS, {})
+    assert price_stages[0] == {"$match": {EVENT_FACETS["price_band"]["field"]: {"$gte": 0}}}
+
+
+def test_counts_computed_across_an_invalidation_are_not_cached(monkeypatch):
+    cache = QueryCache()
+    monkeypatch.setattr(server, "query_cache", cache)
+
+    class Events:
+        collection_name = "events"
+        calls = 0
+
+        async def facet_counts(self, base, facets, selection):
+            self.calls += 1
+            # A write lands while the aggregation runs
+            cache.invalidate("events")
+            return {"total": self.calls}
+
+    repo = Events()
+    first = asyncio.run(server.cached_facet_counts(repo, {}, EVENT_FACETS, {}))
+    second = asyncio.run(server.cached_facet_counts(repo, {}, EVENT_FACETS, {}))
+    assert (first, second) == ({"total": 1}, {"total": 2})
@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from idempotency import IdempotencyGuard, fingerprint
+
+
+def test_concurrent_duplicates_execute_once(repos):
+    guard = IdempotencyGuard(poll_seconds=0.01)
+    calls = 0
+
+    async def execute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def scenario():
+        return await asyncio.gather(*(
+            guard.run(repos.idempotency, "u1", "k1", "POST /x", {"a": 1}, execute) for _ in range(5)
+        ))
+
+    results = asyncio.run(scenario())
+    assert calls == 1
+    assert results[0] == {"ok": True}
+    # The others replay the stored response
+    assert all(result.headers["Idempotent-Replayed"] == "true" for result in results[1:])
+
+
+def test_client_errors_are_replayed(repos):
+    guard = IdempotencyGuard()
+    calls = 0
+
+    async def execute():
+        nonlocal calls
+        calls += 1
+        raise HTTPException(status_code=400, detail="No seats available")
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(HTTPException) as raised:
+                await guard.run(repos.idempotency, "u1", "k1", "POST /x", {}, execute)
+            assert raised.value.detail == "No seats available"
+        return raised.value
+
+    error = asyncio.run(scenario())
+    assert calls == 1
+    assert error.headers == {"Idempotent-Replayed": "true"}
+
+
+def test_failure_releases_the_key(repos):
+    guard = IdempotencyGuard()
+    outcomes = [RuntimeError("database down"), {"ok": True}]
+
+    async def execute():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await guard.run(repos.idempotency, "u1", "k1", "POST /x", {}, execute)
+        assert await repos.idempotency.lookup("u1", "k1") is None
+        return await guard.run(repos.idempotency, "u1", "k1", "POST /x", {}, execute)
+
+    assert asyncio.run(scenario()) == {"ok": True}
+
+
+def test_authorization_runs_only_before_executing(repos):
+    guard = IdempotencyGuard()
+    allowed = False
+
+    def authorize():
+        if not allowed:
+            raise HTTPException(status_code=403, detail="Not admitted yet")
+
+    async def execute():
+        return {"ok": True}
+
+    async def scenario():
+        with pytest.raises(HTTPException):
+            await guard.run(repos.idempotency, "u1", "k1", "POST /x", {}, execute, authorize)
+        # The refusal is not stored
+        assert await repos.idempotency.lookup("u1", "k1") is None
+        nonlocal allowed
+        allowed = True
+        first = await guard.run(repos.idempotency, "u1", "k1", "POST /x", {}, execute, authorize)
+        # A retry is replayed even once authorization would fail again
+        allowed = False
+        return first, await guard.run(repos.idempotency, "u1", "k1", "POST /x", {}, execute, authorize)
+
+    first, retry = asyncio.run(scenario())
+    assert first == {"ok": True}
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+def test_reusing_a_key_for_another_request_is_rejected(repos):
+    guard = IdempotencyGuard()
+
+    async def execute():
+        return {"ok": True}
+
+    async def scenario():
+        await guard.run(repos.idempotency, "u1", "k1", "POST /x", {"a": 1}, execute)
+        await guard.run(repos.idempotency, "u1", "k1", "POST /x", {"a": 2}, execute)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(scenario())
+    assert raised.value.status_code == 422
+
+
+def test_stale_claim_is_taken_over(repos):
+    guard = IdempotencyGuard(lock_timeout_seconds=30)
+    digest = fingerprint("POST /x", {})
+
+    async def execute():
+        return {"ok": True}
+
+    async def scenario():
+        # A worker claimed the key a minute ago and died
+        abandoned_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+        assert await repos.idempotency.claim("u1", "k1", "POST /x", digest, abandoned_at)
+        result = await guard.run(repos.idempotency, "u1", "k1", "POST /x", {}, execute)
+        return result, await repos.idempotency.lookup("u1", "k1")
+
+    result, record = asyncio.run(scenario())
+    assert result == {"ok": True}
+    assert record["state"] == "completed"
+
+
+def test_live_claim_makes_duplicates_wait_then_conflict(repos):
+    guard = IdempotencyGuard(wait_seconds=0.05, poll_seconds=0.01)
+    digest = fingerprint("POST /x", {})
+
+    async def execute():
+        return {"ok": True}
+
+    async def scenario():
+        assert await repos.idempotency.claim("u1", "k1", "POST /x", digest, datetime.now(timezone.utc))
+        await guard.run(repos.idempotency, "u1", "k1", "POST /x", {}, execute)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(scenario())
+    assert raised.value.status_code == 409
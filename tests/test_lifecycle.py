@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+from scheduler import LifecycleScheduler
+
+NOW = datetime(2030, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def event(event_id, starts_in, ends_in, status="upcoming"):
+    return {
+        "id": event_id, "status": status,
+        "start_date": NOW + timedelta(hours=starts_in), "end_date": NOW + timedelta(hours=ends_in),
+    }
+
+
+def test_events_and_awards_move_forward(repos):
+    changes = []
+
+    async def scenario():
+        await repos.events.insert_many([
+            event("future", 1, 2), event("started", -1, 1), event("ended", -3, -1),
+            event("cancelled", -3, -1, status="cancelled"),
+        ])
+        await repos.awards.insert_many([
+            {"id": "closing", "status": "open", "nomination_end": NOW - timedelta(minutes=1)},
+            {"id": "open", "status": "open", "nomination_end": NOW + timedelta(days=1)},
+        ])
+        scheduler = LifecycleScheduler(repos, on_change=changes.append)
+        await scheduler.run_once(NOW)
+        # A second pass finds nothing left to move
+        await scheduler.run_once(NOW)
+        events = {doc["id"]: doc["status"] for doc in await repos.events.find()}
+        awards = {doc["id"]: doc["status"] for doc in await repos.awards.find()}
+        return events, awards
+
+    events, awards = asyncio.run(scenario())
+    assert events == {"future": "upcoming", "started": "ongoing", "ended": "completed", "cancelled": "cancelled"}
+    assert awards == {"closing": "closed", "open": "open"}
+    assert changes == [["events", "awards"]]
+
+
+def test_dates_stored_with_other_offsets_compare_in_utc(repos):
+    async def scenario():
+        # Written by an older version, before dates were normalized to UTC:
+        # ends 15:00 UTC, after NOW, though "10:00" sorts before "12:00"
+        await repos.events.collection.insert_one({
+            "id": "e1", "status": "ongoing",
+            "start_date": "2030-06-01T08:00:00-05:00", "end_date": "2030-06-01T10:00:00-05:00",
+        })
+        # Closed at 08:00 UTC, before NOW, though "13:00" sorts after "12:00"
+        await repos.awards.collection.insert_one(
+            {"id": "a1", "status": "open", "nomination_end": "2030-06-01T13:00:00+05:00"},
+        )
+        await LifecycleScheduler(repos).run_once(NOW)
+        return await repos.events.get("e1"), await repos.awards.get("a1")
+
+    event, award = asyncio.run(scenario())
+    assert event["status"] == "ongoing"
+    assert event["end_date"] == datetime(2030, 6, 1, 15, tzinfo=timezone.utc)
+    assert award["status"] == "closed"
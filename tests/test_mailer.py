@@ -0,0 +1,31 @@
+import pytest
+
+from mailer import FileSink, SmtpSink, sink_from_env
+
+
+def test_no_sink_unless_mail_backend_is_set(monkeypatch, tmp_path):
+    monkeypatch.delenv("MAIL_BACKEND", raising=False)
+    assert sink_from_env(tmp_path) is None
+
+
+def test_file_sink_is_opt_in(monkeypatch, tmp_path):
+    monkeypatch.setenv("MAIL_BACKEND", "file")
+    monkeypatch.delenv("MAIL_FILE_DIR", raising=False)
+    sink = sink_from_env(tmp_path)
+    assert isinstance(sink, FileSink)
+    assert sink.directory == tmp_path / "mail"
+
+
+def test_smtp_needs_a_host(monkeypatch, tmp_path):
+    monkeypatch.setenv("MAIL_BACKEND", "smtp")
+    monkeypatch.delenv("SMTP_HOST", raising=False)
+    with pytest.raises(ValueError):
+        sink_from_env(tmp_path)
+    monkeypatch.setenv("SMTP_HOST", "smtp.example.com")
+    assert isinstance(sink_from_env(tmp_path), SmtpSink)
+
+
+def test_unknown_backend_is_rejected(monkeypatch, tmp_path):
+    monkeypatch.setenv("MAIL_BACKEND", "carrier-pigeon")
+    with pytest.raises(ValueError):
+        sink_from_env(tmp_path)
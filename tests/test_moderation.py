@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from moderation import ModerationError, set_nomination_statuses
+
+
+def seed(repos):
+    async def scenario():
+        await repos.awards.insert({"id": "a1", "status": "closed"})
+        await repos.nominations.insert_many([
+            {"id": f"n{n}", "award_id": "a1", "nominee_name": f"Nominee {n}", "status": "pending"} for n in range(3)
+        ])
+    asyncio.run(scenario())
+
+
+def apply(repos, changes):
+    async def scenario():
+        results = await set_nomination_statuses(repos, changes)
+        statuses = {doc["id"]: doc["status"] for doc in await repos.nominations.find()}
+        return results, statuses, await repos.awards.get("a1")
+    return asyncio.run(scenario())
+
+
+def test_winner_is_recorded_on_the_award(repos):
+    seed(repos)
+    results, statuses, award = apply(repos, [
+        {"id": "n0", "status": "winner"}, {"id": "n1", "status": "rejected"}, {"id": "missing", "status": "approved"},
+    ])
+    assert results == {"n0": "updated", "n1": "updated", "missing": "not_found"}
+    assert statuses == {"n0": "winner", "n1": "rejected", "n2": "pending"}
+    assert (award["status"], award["winner_id"], award["winner_name"]) == ("announced", "n0", "Nominee 0")
+
+    # A new winner demotes the previous one
+    results, statuses, award = apply(repos, [{"id": "n2", "status": "winner"}])
+    assert results == {"n2": "updated"}
+    assert statuses["n0"] == "approved"
+    assert award["winner_id"] == "n2"
+
+
+def test_invalid_batches_are_rejected(repos):
+    seed(repos)
+    for changes in ([{"id": "n0", "status": "winner"}, {"id": "n1", "status": "winner"}],
+                    [{"id": "n0", "status": "approved"}, {"id": "n0", "status": "rejected"}]):
+        with pytest.raises(ModerationError):
+            apply(repos, changes)
+
+
+def test_bulk_status_endpoint(api, admin):
+    award = api.award(admin)
+    nomination = api.create("/api/nominations", admin, {
+        "award_id": award["id"], "nominee_name": "Ada Lovelace", "nominee_email": "ada@example.com",
+        "nominee_organization": "Analytical Engines", "nomination_statement": "Pioneering work",
+    })
+    body = api.create("/api/nominations/bulk-status", admin, {"changes": [{"id": nomination["id"], "status": "winner"}]})
+    assert (body["requested"], body["updated"]) == (1, 1)
+    awards = {doc["id"]: doc for doc in api.client.get("/api/awards").json()}
+    assert (awards[award["id"]]["status"], awards[award["id"]]["winner_name"]) == ("announced", "Ada Lovelace")
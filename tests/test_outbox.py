@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+from outbox import OutboxWorker, registration_messages
+
+NOW = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+EVENT = {
+    "id": "e1", "title": "Zero Trust Summit", "description": "d", "venue": "Hall A", "city": "Boston",
+    "country": "USA", "start_date": NOW, "end_date": NOW,
+}
+
+REGISTRATION = {
+    "id": "r1", "event_id": "e1", "user_id": "u1", "user_name": "User", "user_email": "user@example.com",
+    "ticket_type": "standard", "payment_amount": 100.0, "payment_status": "pending", "registration_date": NOW,
+}
+
+
+class RecordingSink:
+    """Fails the first ``failures`` sends, then records messages."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    async def send(self, message):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("relay unavailable")
+        self.sent.append(message)
+
+
+def seed(repos, with_event=True):
+    async def scenario():
+        if with_event:
+            await repos.events.insert(dict(EVENT))
+        await repos.registrations.insert_with(
+            dict(REGISTRATION), repos.outbox, registration_messages(REGISTRATION, NOW),
+        )
+    asyncio.run(scenario())
+
+
+def drain(worker):
+    async def scenario():
+        while await worker.run_once():
+            pass
+        return await worker.repos.outbox.state_counts()
+    return asyncio.run(scenario())
+
+
+def test_messages_are_delivered_once(repos):
+    seed(repos)
+    sink = RecordingSink()
+    assert drain(OutboxWorker(repos, sink, "from@example.com")) == {"sent": 2}
+    subjects = sorted(message["Subject"] for message in sink.sent)
+    assert subjects == ["Receipt for Zero Trust Summit", "You're registered: Zero Trust Summit"]
+    confirmation = next(message for message in sink.sent if "registered" in message["Subject"])
+    assert any(part.get_content_type() == "text/calendar" for part in confirmation.iter_attachments())
+
+
+def test_failures_back_off_then_dead_letter_and_requeue(repos):
+    seed(repos)
+    sink = RecordingSink(failures=100)
+    worker = OutboxWorker(repos, sink, "from@example.com", max_attempts=2, base_backoff_seconds=0)
+
+    assert drain(worker) == {"dead": 2}
+    dead = asyncio.run(repos.outbox.find({"state": "dead"}))
+    assert all(message["attempts"] == 2 and "relay unavailable" in message["last_error"] for message in dead)
+
+    sink.failures = 0
+    for message in dead:
+        assert asyncio.run(repos.outbox.requeue(message["id"], datetime.now(timezone.utc)))
+    assert drain(worker) == {"sent": 2}
+    assert len(sink.sent) == 2
+
+
+def test_messages_for_deleted_events_are_discarded(repos):
+    seed(repos, with_event=False)
+    sink = RecordingSink()
+    assert drain(OutboxWorker(repos, sink, "from@example.com")) == {"discarded": 2}
+    assert sink.sent == []
+
+
+def test_stale_lock_is_reclaimed(repos):
+    seed(repos)
+
+    async def scenario():
+        # A worker claimed a message and died without finishing it
+        abandoned = await repos.outbox.claim(NOW, timedelta(minutes=5))
+        sink = RecordingSink()
+        worker = OutboxWorker(repos, sink, "from@example.com", lock_timeout_seconds=0)
+        while await worker.run_once():
+            pass
+        return abandoned, await repos.outbox.get(abandoned["id"]), sink
+
+    abandoned, message, sink = asyncio.run(scenario())
+    assert message["state"] == "sent"
+    assert message["attempts"] == 2
+    assert len(sink.sent) == 2
+
@@ -0,0 +1,136 @@
+import asyncio
+
+
+def register(api, headers, event_id, **extra_headers):
+    return api.client.post("/api/registrations", headers={**headers, **extra_headers}, json={"event_id": event_id})
+
+
+def test_registration_takes_a_seat_and_queues_emails(api, admin, user):
+    event = api.event(admin, capacity=2)
+    response = register(api, user, event["id"])
+    assert response.status_code == 200, response.text
+
+    assert api.client.get(f"/api/events/{event['id']}").json()["available_seats"] == 1
+    assert api.call(api.repos.outbox.state_counts) == {"pending": 2}
+    again = register(api, user, event["id"])
+    assert again.status_code == 400
+    assert again.json()["detail"] == "Already registered for this event"
+
+
+def test_concurrent_registrations_never_oversell(api, admin):
+    event = api.event(admin, capacity=3)
+    for n in range(6):
+        api.sign_up(f"u{n}@example.com")
+    server, repos = api.server, api.repos
+
+    async def scenario():
+        users = [server.User(**doc) for doc in await repos.users.find({"role": {"$ne": "admin"}})]
+
+        async def attempt(user):
+            try:
+                await server._register(server.RegistrationCreate(event_id=event["id"]), event, user, repos)
+            except server.HTTPException as e:
+                return e.status_code
+            return 200
+
+        return await asyncio.gather(*(attempt(user) for user in users))
+
+    assert sorted(api.call(scenario)) == [200, 200, 200, 400, 400, 400]
+    assert api.client.get(f"/api/events/{event['id']}").json()["available_seats"] == 0
+
+
+def test_idempotent_retry_replays_the_registration(api, admin, user):
+    event = api.event(admin)
+    first = register(api, user, event["id"], **{"Idempotency-Key": "k1"})
+    retry = register(api, user, event["id"], **{"Idempotency-Key": "k1"})
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert api.client.get(f"/api/events/{event['id']}").json()["available_seats"] == 4
+
+
+def test_rollups_match_a_rebuild(api, admin):
+    events = [api.event(admin, ticket_price=price) for price in (100, 40)]
+    for n in range(3):
+        headers = api.sign_up(f"u{n}@example.com")
+        for event in events[:n + 1]:
+            assert register(api, headers, event["id"]).status_code == 200
+
+    revenue = api.client.get("/api/analytics/revenue/events", headers=admin).json()
+    assert [(row["registrations"], row["revenue"]) for row in revenue] == [(3, 300.0), (2, 80.0)]
+
+    rollups = api.repos.registration_rollups
+
+    async def rebuild():
+        before = sorted((doc["id"], doc["registrations"], doc["revenue"]) for doc in await rollups.find(limit=None))
+        await rollups.rebuild([api.repos.registrations, api.repos.registrations_archive])
+        after = sorted((doc["id"], doc["registrations"], doc["revenue"]) for doc in await rollups.find(limit=None))
+        return before, after
+
+    before, after = api.call(rebuild)
+    assert before == after
+
+
+def test_rollup_failure_does_not_fail_the_registration(api, admin, user, monkeypatch):
+    event = api.event(admin)
+
+    async def fail(registration):
+        raise RuntimeError("rollups unavailable")
+
+    monkeypatch.setattr(api.repos.registration_rollups, "record", fail)
+    first = register(api, user, event["id"], **{"Idempotency-Key": "k1"})
+    assert first.status_code == 200, first.text
+    retry = register(api, user, event["id"], **{"Idempotency-Key": "k1"})
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+
+
+def test_concurrent_duplicate_registrations_take_one_seat(api, admin, user, monkeypatch):
+    event = api.event(admin, capacity=5)
+    server, repos = api.server, api.repos
+    reserve_seat = repos.events.reserve_seat
+
+    async def slow_reserve_seat(event_id):
+        # Let every request pass the exists() check before any inserts
+        await asyncio.sleep(0.01)
+        return await reserve_seat(event_id)
+
+    monkeypatch.setattr(repos.events, "reserve_seat", slow_reserve_seat)
+
+    async def scenario():
+        current = server.User(**await repos.users.get_by_email("user@example.com"))
+
+        async def attempt():
+            try:
+                await server._register(server.RegistrationCreate(event_id=event["id"]), event, current, repos)
+            except server.HTTPException as e:
+                return e.status_code
+            return 200
+
+        return await asyncio.gather(*(attempt() for _ in range(4)))
+
+    assert sorted(api.call(scenario)) == [200, 400, 400, 400]
+    assert api.call(repos.registrations.count) == 1
+    assert api.client.get(f"/api/events/{event['id']}").json()["available_seats"] == 4
+
+
+def test_sell_through_orders_and_limits_in_the_query(api, admin, user):
+    events = [api.event(admin, title=f"Event {n}", capacity=capacity) for n, capacity in enumerate((4, 2, 5))]
+    for event in events[:2]:
+        assert register(api, user, event["id"]).status_code == 200
+
+    rows = api.client.get("/api/analytics/sell-through", headers=admin, params={"limit": 2}).json()
+    assert [row["event_id"] for row in rows] == [events[1]["id"], events[0]["id"]]
+
+
+def test_registration_reads_the_event_once(api, admin, user, monkeypatch):
+    event = api.event(admin)
+    get, reads = api.repos.events.get, []
+
+    async def counting_get(event_id, projection=None):
+        reads.append(event_id)
+        return await get(event_id, projection=projection)
+
+    monkeypatch.setattr(api.repos.events, "get", counting_get)
+    assert register(api, user, event["id"]).status_code == 200
+    assert reads == [event["id"]]
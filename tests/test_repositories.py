@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from repositories import MemoryCollection
+
+
+def event(n):
+    return {
+        "id": f"e{n}", "title": f"Event {n}", "city": "Boston" if n % 2 else "Paris",
+        "ticket_price": n * 10, "start_date": datetime(2030, 1, n + 1, tzinfo=timezone.utc),
+    }
+
+
+def test_find_filters_sorts_and_projects(repos):
+    async def scenario():
+        await repos.events.insert_many([event(n) for n in range(5)])
+        expensive = await repos.events.find(
+            {"city": "Boston", "ticket_price": {"$gte": 10}}, sort=[("ticket_price", -1)],
+            projection=["id", "ticket_price"],
+        )
+        page = await repos.events.find({}, sort=[("start_date", 1)], skip=1, limit=2, projection=["id"])
+        return expensive, page, await repos.events.get("e1")
+
+    expensive, page, stored = asyncio.run(scenario())
+    assert expensive == [{"id": "e3", "ticket_price": 30}, {"id": "e1", "ticket_price": 10}]
+    assert page == [{"id": "e1"}, {"id": "e2"}]
+    # Dates round-trip through the stored encoding
+    assert stored["start_date"] == datetime(2030, 1, 2, tzinfo=timezone.utc)
+
+
+def test_update_and_delete(repos):
+    async def scenario():
+        await repos.events.insert(event(1))
+        updated = await repos.events.update("e1", {"title": "Renamed"})
+        deleted = await repos.events.delete("e1")
+        return updated, deleted, await repos.events.get("e1"), await repos.events.count()
+
+    updated, deleted, missing, count = asyncio.run(scenario())
+    assert updated["title"] == "Renamed"
+    assert deleted
+    assert (missing, count) == (None, 0)
+
+
+def test_unique_indexes_reject_duplicates():
+    async def scenario():
+        collection = MemoryCollection("users")
+        await collection.create_index([("email", 1)], unique=True)
+        await collection.insert_one({"id": "u1", "email": "a@example.com"})
+        with pytest.raises(DuplicateKeyError):
+            await collection.insert_one({"id": "u2", "email": "a@example.com"})
+        return await collection.count({})
+
+    assert asyncio.run(scenario()) == 1
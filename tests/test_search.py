@@ -0,0 +1,39 @@
+import asyncio
+
+from search import search_catalog
+
+
+def seed(repos):
+    async def scenario():
+        await repos.events.insert_many([
+            {"id": "e1", "title": "Zero Trust Summit", "event_type": "conference", "description": "Identity first"},
+            {"id": "e2", "title": "Cloud Expo", "event_type": "expo", "description": "Zero trust in the cloud"},
+            {"id": "e3", "title": "Data Days", "event_type": "workshop", "description": "Pipelines"},
+        ])
+        await repos.speakers.insert({"id": "s1", "name": "Ada Trust", "bio": "Security lead", "expertise": []})
+    asyncio.run(scenario())
+
+
+def test_hits_are_ranked_across_collections(repos):
+    seed(repos)
+    hits, counts = asyncio.run(search_catalog(repos, "zero trust", ["events", "speakers"], 0, 10))
+    ids = [hit["id"] for hit in hits]
+    # A title match outweighs a description match
+    assert ids[0] == "e1" and ids.index("e1") < ids.index("e2")
+    assert {hit["type"] for hit in hits} == {"event", "speaker"}
+    assert counts == {"events": 2, "speakers": 1}
+
+
+def test_no_match_and_paging(repos):
+    seed(repos)
+    hits, counts = asyncio.run(search_catalog(repos, "blockchain", ["events", "speakers"], 0, 10))
+    assert (hits, counts) == ([], {"events": 0, "speakers": 0})
+
+    page, _ = asyncio.run(search_catalog(repos, "zero trust", ["events"], 1, 1))
+    assert [hit["id"] for hit in page] == ["e2"]
+
+
+def test_unknown_types_are_rejected(api):
+    response = api.client.get("/api/search", params={"q": "zero", "types": "events,widgets"})
+    assert response.status_code == 400
+    assert "widgets" in response.json()["detail"]
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from seed_data import insert_stream
+
+
+class FlakyCollection:
+    """Fails the ``fail_on``-th insert_many call."""
+
+    name = "things"
+
+    def __init__(self, fail_on):
+        self.fail_on = fail_on
+        self.calls = 0
+        self.docs = []
+
+    async def insert_many(self, batch, ordered=True):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.calls == self.fail_on:
+            raise RuntimeError("batch rejected")
+        self.docs.extend(batch)
+
+
+def test_all_batches_are_written():
+    collection = FlakyCollection(fail_on=None)
+    written = asyncio.run(insert_stream(collection, ({"n": n} for n in range(50)), 10, 2, 50))
+    assert written == len(collection.docs) == 50
+
+
+def test_a_failed_batch_is_raised():
+    collection = FlakyCollection(fail_on=2)
+    with pytest.raises(RuntimeError, match="batch rejected"):
+        asyncio.run(insert_stream(collection, ({"n": n} for n in range(50)), 10, 2, 50))
+    # Nothing is queued after the failure is seen
+    assert collection.calls < 5
@@ -0,0 +1,92 @@
+import subprocess
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+import startup
+
+
+def wait_until_ready(client):
+    for _ in range(200):
+        response = client.get("/api/ready")
+        if response.status_code == 200:
+            return response
+        time.sleep(0.01)
+    return response
+
+
+def test_ready_once_primed(api):
+    assert api.client.get("/api/health").json() == {"status": "ok"}
+    response = wait_until_ready(api.client)
+    assert response.status_code == 200
+    assert set(response.json()["phases"]) == {"indexes", "caches", "imports"}
+    # The facet cache was primed with the unfiltered counts
+    assert api.server.query_cache.get("events", ((), ())) is not api.server.MISSING
+
+
+def test_deferred_modules_are_not_imported_at_boot():
+    check = "import sys, server; print([m for m in ('icalendar', 'passlib.context', 'jose', 'motor') if m in sys.modules])"
+    result = subprocess.run(
+        [sys.executable, "-c", check], cwd=startup.ROOT_DIR, capture_output=True, text=True,
+        env={"DATA_BACKEND": "memory", "PATH": ""},
+    )
+    assert result.stdout.strip() == "[]", result.stderr
+
+
+def test_import_profile_lists_modules():
+    rows = startup.import_times("cache")
+    assert rows[-1][0] == "cache"
+    assert all(cumulative >= self_us for _, self_us, cumulative in rows)
+
+
+def start(monkeypatch, failures, max_attempts=3):
+    """A TestClient whose index build fails ``failures`` times."""
+    monkeypatch.setattr(server, "STARTUP_MAX_ATTEMPTS", max_attempts)
+    monkeypatch.setattr(server, "STARTUP_BACKOFF_SECONDS", 0.01)
+    build = server.memory_repositories
+
+    def flaky_repositories(**options):
+        repos = build(**options)
+        ensure_indexes = repos.ensure_indexes
+        remaining = [failures]
+
+        async def flaky():
+            if remaining[0]:
+                remaining[0] -= 1
+                raise ConnectionError("no primary")
+            await ensure_indexes()
+
+        repos.ensure_indexes = flaky
+        return repos
+
+    monkeypatch.setattr(server, "memory_repositories", flaky_repositories)
+    return TestClient(server.app)
+
+
+def test_failed_phase_is_retried(monkeypatch):
+    with start(monkeypatch, failures=2) as client:
+        response = wait_until_ready(client)
+        assert response.status_code == 200
+        assert response.json()["error"] is None
+
+
+def test_giving_up_fails_liveness(monkeypatch):
+    with start(monkeypatch, failures=10) as client:
+        for _ in range(200):
+            if client.get("/api/health").status_code == 503:
+                break
+            time.sleep(0.01)
+        health = client.get("/api/health")
+        assert health.status_code == 503
+        assert "no primary" in health.json()["error"]
+        assert client.get("/api/ready").status_code == 503
+
+
+def test_invalid_write_behind_mode_fails_startup(monkeypatch):
+    monkeypatch.setattr(server, "WRITE_BEHIND", "sometimes")
+    with pytest.raises(ValueError):
+        with TestClient(server.app):
+            pass
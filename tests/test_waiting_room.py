@@ -0,0 +1,110 @@
+import asyncio
+import time
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import waiting_room
+
+NOW = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+def test_positions_are_fifo_and_admitted_at_the_rate(repos):
+    async def scenario():
+        room = await waiting_room.configure(repos, "e1", True, 2.0, NOW - timedelta(seconds=10))
+        entries = [await waiting_room.join(repos, room, f"u{n}", NOW) for n in range(10)]
+        # Joining again keeps the first place
+        again = await waiting_room.join(repos, room, "u3", NOW + timedelta(seconds=1))
+        return entries, again, await repos.waiting_rooms.get("e1")
+
+    entries, again, room = asyncio.run(scenario())
+    assert [entry["position"] for entry in entries] == list(range(1, 11))
+    assert again["position"] == 4
+    # u0 joined an idle queue and was admitted on arrival
+    assert waiting_room.admitted_through(room, NOW) == 1
+    assert waiting_room.admitted_through(room, NOW + timedelta(seconds=2)) == 5
+    # Never beyond the positions issued
+    assert waiting_room.admitted_through(room, NOW + timedelta(hours=1)) == 10
+
+
+def test_idle_capacity_does_not_pile_up(repos):
+    async def scenario():
+        room = await waiting_room.configure(repos, "e1", True, 1.0, NOW - timedelta(seconds=10))
+        await waiting_room.join(repos, room, "early", NOW)
+        # Nobody joins for an hour; then a burst arrives
+        later = NOW + timedelta(hours=1)
+        for n in range(5):
+            await waiting_room.join(repos, room, f"u{n}", later)
+        return await repos.waiting_rooms.get("e1"), later
+
+    room, later = asyncio.run(scenario())
+    assert waiting_room.admitted_through(room, later) == 2
+    assert waiting_room.admitted_through(room, later + timedelta(seconds=2)) == 4
+
+
+def test_admission_tokens_are_bound_to_user_and_event():
+    tokens = waiting_room.AdmissionTokens("secret", ttl_seconds=60)
+    token, _ = tokens.issue("u1", "e1", 1, datetime.now(timezone.utc))
+    assert tokens.verify(token, "u1", "e1")["position"] == 1
+    for user_id, event_id in [("u2", "e1"), ("u1", "e2")]:
+        with pytest.raises(HTTPException) as raised:
+            tokens.verify(token, user_id, event_id)
+        assert raised.value.status_code == 403
+    expired, _ = tokens.issue("u1", "e1", 1, datetime.now(timezone.utc) - timedelta(minutes=2))
+    with pytest.raises(HTTPException):
+        tokens.verify(expired, "u1", "e1")
+
+
+def test_registration_requires_admission(api, admin, user):
+    event = api.event(admin)
+    room = api.client.put(
+        f"/api/events/{event['id']}/waiting-room", headers=admin, json={"enabled": True, "admit_per_second": 100},
+    )
+    assert room.status_code == 200, room.text
+    time.sleep(0.05)  # let admission capacity build up for the first joiner
+
+    response = api.client.post("/api/registrations", headers=user, json={"event_id": event["id"]})
+    assert response.status_code == 403
+
+    status = api.create(f"/api/events/{event['id']}/waiting-room", user, {})
+    assert status["position"] == 1 and status["admission_token"]
+    response = api.client.post(
+        "/api/registrations", headers={**user, "Admission-Token": status["admission_token"]},
+        json={"event_id": event["id"]},
+    )
+    assert response.status_code == 200, response.text
+
+    # Another user cannot reuse the token
+    other = api.sign_up("other@example.com")
+    response = api.client.post(
+        "/api/registrations", headers={**other, "Admission-Token": status["admission_token"]},
+        json={"event_id": event["id"]},
+    )
+    assert response.status_code == 403
+
+
+def test_retry_after_admission_is_not_replayed_as_forbidden(api, admin, user):
+    event = api.event(admin)
+    api.client.put(f"/api/events/{event['id']}/waiting-room", headers=admin, json={"admit_per_second": 100})
+    keyed = {**user, "Idempotency-Key": "k1"}
+
+    response = api.client.post("/api/registrations", headers=keyed, json={"event_id": event["id"]})
+    assert response.status_code == 403
+
+    time.sleep(0.05)
+    token = api.create(f"/api/events/{event['id']}/waiting-room", user, {})["admission_token"]
+    response = api.client.post(
+        "/api/registrations", headers={**keyed, "Admission-Token": token}, json={"event_id": event["id"]},
+    )
+    assert response.status_code == 200, response.text
+    assert "Idempotent-Replayed" not in response.headers
+
+    # A retry of the admitted request replays it, whichever token it carries:
+    # polling the room again issues a new one, and the old one may have expired
+    newer = api.client.get(f"/api/events/{event['id']}/waiting-room", headers=user).json()["admission_token"]
+    for headers in ({"Admission-Token": token}, {"Admission-Token": newer}, {}):
+        retry = api.client.post("/api/registrations", headers={**keyed, **headers}, json={"event_id": event["id"]})
+        assert retry.status_code == 200, retry.text
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert retry.json() == response.json()
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from writebehind import WriteBehindBuffer
+
+
+def inquiry(n):
+    return {"id": f"i{n}", "name": "n", "email": "n@example.com", "subject": "s", "message": "m", "status": "new"}
+
+
+def test_durable_adds_are_written_in_batches(repos):
+    async def scenario():
+        buffer = WriteBehindBuffer(repos.inquiries, durable=True, max_batch=10, max_delay_seconds=0.01)
+        buffer.start()
+        await asyncio.gather(*(buffer.add(inquiry(n)) for n in range(25)))
+        # Acknowledged adds are readable
+        count = await repos.inquiries.count()
+        await buffer.stop()
+        return count, buffer.stats
+
+    count, stats = asyncio.run(scenario())
+    assert count == 25
+    assert stats["documents"] == 25
+    assert stats["batches"] == 3
+    assert stats["largest_batch"] == 10
+
+
+def test_durable_add_raises_its_own_insert_error(repos):
+    async def scenario():
+        await repos.inquiries.collection.create_index([("email", 1)], unique=True)
+        await repos.inquiries.insert(inquiry(1))
+        buffer = WriteBehindBuffer(repos.inquiries, durable=True, max_delay_seconds=0.01)
+        buffer.start()
+        results = await asyncio.gather(
+            buffer.add({**inquiry(2), "email": "other@example.com"}), buffer.add(inquiry(3)), return_exceptions=True,
+        )
+        await buffer.stop()
+        return results, await repos.inquiries.count()
+
+    results, count = asyncio.run(scenario())
+    assert results[0] is None
+    assert isinstance(results[1], DuplicateKeyError)
+    assert count == 2
+
+
+def test_stop_drains_async_buffer(repos):
+    async def scenario():
+        # A delay long enough that only stop() can flush
+        buffer = WriteBehindBuffer(repos.inquiries, durable=False, max_delay_seconds=60)
+        buffer.start()
+        for n in range(5):
+            await buffer.add(inquiry(n))
+        before = await repos.inquiries.count()
+        await buffer.stop()
+        # Adds after stop go straight to the repository
+        await buffer.add(inquiry(99))
+        return before, await repos.inquiries.count()
+
+    assert asyncio.run(scenario()) == (0, 6)
+
+
+@pytest.mark.parametrize("durable", [True, False])
+def test_full_batch_flushes_before_the_delay(repos, durable):
+    async def scenario():
+        buffer = WriteBehindBuffer(repos.inquiries, durable=durable, max_batch=5, max_delay_seconds=60)
+        buffer.start()
+        await asyncio.wait_for(asyncio.gather(*(buffer.add(inquiry(n)) for n in range(5))), 1)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        count = await repos.inquiries.count()
+        await buffer.stop()
+        return count
+
+    assert asyncio.run(scenario()) == 5